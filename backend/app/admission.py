@@ -0,0 +1,313 @@
+# Admission control untuk endpoint tulis (submit komponen, rating, register) & endpoint berat (export)
+# - Token bucket per user & per IP, aturannya per route (RULES). Bucket berisi `burst` token dan
+#   terisi kembali penuh dalam `seconds` detik; tiap request memakai 1 token. Bucket kosong: 429.
+#   Request yang ditolak salah satu bucket tidak memakai token bucket lainnya (dikembalikan).
+# - Load shedding: kalau pool koneksi DB hampir penuh (>= ADMISSION_POOL_SHED_RATIO), request
+#   tulis langsung ditolak 503 sebelum ikut antri koneksi, supaya request baca tetap kebagian.
+# - Semua penolakan membawa header Retry-After & dicatat di metrik uicode_admission_rejected_total.
+#
+# Penyimpanan bucket:
+# - Default in-process (per worker): batas efektif = batas x jumlah worker.
+# - RATE_LIMIT_DATABASE_URL diisi: bucket dibagi semua worker/instance lewat 1 tabel
+#   (rate_limit_buckets), 1 statement upsert atomik per pengecekan. Sebaiknya database terpisah
+#   dari database utama; untuk testing lokal cukup 1 file SQLite yang dipakai semua worker.
+#   Kalau database bucket error, pengecekan jatuh ke bucket in-process (tidak menolak request).
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, create_engine, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from starlette.concurrency import run_in_threadpool
+
+from . import auth, database, metrics
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+POOL_SHED_RATIO = float(os.getenv("ADMISSION_POOL_SHED_RATIO", "0.9"))
+POOL_RETRY_AFTER_SECONDS = 1
+# Pakai IP dari X-Forwarded-For (entry paling kanan = yang ditambahkan reverse proxy kita sendiri)
+TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+RATE_LIMIT_DATABASE_URL = os.getenv("RATE_LIMIT_DATABASE_URL", "")
+MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Bucket yang tidak disentuh selama ini pasti sudah penuh lagi, barisnya boleh dibuang
+PRUNE_AFTER_SECONDS = 3600
+PRUNE_EVERY = 1000
+
+logger = logging.getLogger("uicode.admission")
+
+# Default "burst/detik" per route & scope. Override lewat env RATE_LIMIT_<RULE>_<SCOPE>,
+# mis. RATE_LIMIT_CREATE_COMPONENT_USER=5/60; "off" = scope tsb tidak dibatasi.
+# Burst harus >= 1: "0" ditolak saat start (ambigu antara "tidak dibatasi" & "tolak semua").
+RULES = {
+    "create_user": {"ip": "10/60"},
+    "create_component": {"user": "20/60", "ip": "60/60"},
+    "rate_component": {"user": "60/60", "ip": "300/60"},
+    # Export men-stream seluruh katalog: cukup untuk sinkronisasi berkala, bukan untuk polling
+    "export_components": {"ip": "10/60"},
+}
+
+
+def parse_limit(value):
+    # "20/60" -> (20, 60.0); "off" / "" -> None; "0" / "0/60" -> ValueError
+    value = (value or "").strip().lower()
+    if value in ("", "off"):
+        return None
+    burst, _, seconds = value.partition("/")
+    burst, seconds = int(burst), float(seconds or "1")
+    if burst <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return burst, seconds
+
+
+def load_rules():
+    rules = {}
+    for name, scopes in RULES.items():
+        rules[name] = {}
+        for scope, default in scopes.items():
+            limit = parse_limit(os.getenv(f"RATE_LIMIT_{name.upper()}_{scope.upper()}", default))
+            if limit is not None:
+                rules[name][scope] = limit
+    return rules
+
+
+# --- 1. BUCKET IN-PROCESS ---
+
+class MemoryBuckets:
+    name = "memory"
+    blocking = False
+
+    def __init__(self, maxsize=MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> [tokens, waktu update (monotonic)]
+        self._lock = threading.Lock()
+
+    def take(self, key, burst, seconds):
+        """Ambil 1 token. Return 0 kalau boleh lewat, atau detik sampai token berikutnya tersedia."""
+        rate = burst / seconds
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(burst), now]
+                # Bucket yang paling lama tidak dipakai dibuang (sama dengan bucket penuh)
+                while len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0
+            bucket[0] = tokens
+            return (1 - tokens) / rate
+
+    def refund(self, key, burst):
+        """Kembalikan 1 token yang sudah diambil take() (request-nya ditolak bucket lain)."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(float(burst), bucket[0] + 1)
+
+    def stats(self):
+        with self._lock:
+            return {"store": self.name, "buckets": len(self._buckets)}
+
+
+# --- 2. BUCKET BERSAMA (TABEL DATABASE) ---
+
+_metadata = MetaData()
+rate_limit_buckets = Table(
+    "rate_limit_buckets",
+    _metadata,
+    Column("key", String, primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("updated_at", Float, nullable=False),  # epoch detik (time.time), sama di semua worker
+    Column("admitted", Integer, nullable=False),  # hasil pengecekan terakhir (1 = lewat)
+)
+
+
+class SQLBuckets:
+    name = "sql"
+    blocking = True  # dipanggil lewat threadpool
+
+    def __init__(self, url):
+        self.engine = create_engine(url, **database.engine_options(url))
+        _metadata.create_all(self.engine)
+        self._insert = postgresql_insert if self.engine.dialect.name == "postgresql" else sqlite_insert
+        self._calls = 0
+
+    def take(self, key, burst, seconds):
+        rate = burst / seconds
+        now = time.time()
+        table = rate_limit_buckets
+        # Isi ulang + ambil token dalam 1 statement: aman walau banyak worker bersamaan
+        refilled = table.c.tokens + (now - table.c.updated_at) * rate
+        refilled = case((refilled > burst, float(burst)), else_=refilled)
+        stmt = self._insert(table).values(key=key, tokens=float(burst - 1), updated_at=now, admitted=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "tokens": case((refilled >= 1, refilled - 1), else_=refilled),
+                "updated_at": now,
+                "admitted": case((refilled >= 1, 1), else_=0),
+            },
+        ).returning(table.c.tokens, table.c.admitted)
+        with self.engine.begin() as conn:
+            tokens, admitted = conn.execute(stmt).one()
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                conn.execute(delete(table).where(table.c.updated_at < now - PRUNE_AFTER_SECONDS))
+        return 0 if admitted else (1 - tokens) / rate
+
+    def refund(self, key, burst):
+        table = rate_limit_buckets
+        refunded = table.c.tokens + 1
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.key == key)
+                .values(tokens=case((refunded > burst, float(burst)), else_=refunded))
+            )
+
+    def stats(self):
+        with self.engine.connect() as conn:
+            count = conn.execute(select(func.count()).select_from(rate_limit_buckets)).scalar()
+        return {"store": self.name, "url": self.engine.url.render_as_string(hide_password=True), "buckets": count}
+
+
+_rules = load_rules()
+_memory = MemoryBuckets()
+# Store database dibuat saat pertama dipakai (bukan saat import), sama seperti engine utama
+_store = None if RATE_LIMIT_DATABASE_URL else _memory
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLBuckets(RATE_LIMIT_DATABASE_URL)
+    return _store
+
+
+def _take_blocking(key, burst, seconds):
+    return get_store().take(key, burst, seconds)
+
+
+async def _take(key, burst, seconds):
+    if _store is not None and not _store.blocking:
+        return _store.take(key, burst, seconds)
+    try:
+        return await run_in_threadpool(_take_blocking, key, burst, seconds)
+    except Exception:
+        logger.exception("rate limit store error, falling back to in-process buckets")
+        metrics.ADMISSION_STORE_ERRORS.inc()
+        return _memory.take(key, burst, seconds)
+
+
+def _refund_blocking(key, burst):
+    get_store().refund(key, burst)
+
+
+async def _refund(key, burst):
+    if _store is not None and not _store.blocking:
+        _store.refund(key, burst)
+        return
+    try:
+        await run_in_threadpool(_refund_blocking, key, burst)
+    except Exception:
+        # Token-nya ikut terisi lagi seiring waktu; cukup dicatat
+        logger.exception("rate limit store error, token not refunded")
+        metrics.ADMISSION_STORE_ERRORS.inc()
+        _memory.refund(key, burst)
+
+
+# --- 3. LOAD SHEDDING (POOL KONEKSI) ---
+
+def pool_saturation():
+    # Rasio koneksi primary yang sedang dipakai (0..1), None kalau pool-nya tidak punya angka
+    bind = database.async_engine.sync_engine if database.ASYNC_DB and database.async_engine else database.engine
+    if bind is None:
+        return None  # engine belum dibuat (belum ada request / lifespan belum jalan)
+    checkedout = getattr(bind.pool, "checkedout", None)
+    capacity = database.DB_POOL_SIZE + max(database.DB_MAX_OVERFLOW, 0)
+    if not callable(checkedout) or capacity <= 0:
+        return None
+    return checkedout() / capacity
+
+
+# --- 4. DEPENDENCY FASTAPI ---
+
+def client_ip(request: Request):
+    if TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _reject(rule, reason, status_code, retry_after, detail):
+    metrics.ADMISSION_REJECTED.inc(rule, reason)
+    raise HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def check(rule, request: Request, user_id=None):
+    if not ADMISSION_ENABLED:
+        return
+    saturation = pool_saturation()
+    if saturation is not None and saturation >= POOL_SHED_RATIO:
+        _reject(rule, "pool", 503, POOL_RETRY_AFTER_SECONDS, "Server is busy, please try again")
+
+    limits = _rules.get(rule, {})
+    keys = []
+    if user_id is not None and "user" in limits:
+        keys.append(("user", f"{rule}:user:{user_id}"))
+    if "ip" in limits:
+        keys.append(("ip", f"{rule}:ip:{client_ip(request)}"))
+    taken = []
+    for scope, key in keys:
+        retry_after = await _take(key, *limits[scope])
+        if retry_after:
+            # Request ditolak: token bucket yang sudah diambil (mis. user) dikembalikan, supaya
+            # banjir request dari IP yang sama tidak ikut menghabiskan jatah user-nya
+            for taken_scope, taken_key in taken:
+                await _refund(taken_key, limits[taken_scope][0])
+            _reject(rule, scope, 429, retry_after, "Too many requests, please try again later")
+        taken.append((scope, key))
+
+
+def limit(rule):
+    """Dependency untuk 1 route, mis. dependencies=[Depends(admission.limit("create_component"))].
+
+    Rule dengan scope "user" ikut memakai auth.get_current_user (hasilnya di-cache FastAPI per
+    request, jadi token tidak di-decode 2x).
+    """
+    if "user" in _rules.get(rule, {}):
+        async def dependency(request: Request, current_user=Depends(auth.get_current_user)):
+            await check(rule, request, current_user.id)
+    else:
+        async def dependency(request: Request):
+            await check(rule, request)
+    return dependency
+
+
+def stats():
+    return {
+        "enabled": ADMISSION_ENABLED,
+        "rules": {name: {scope: f"{burst}/{seconds:g}" for scope, (burst, seconds) in scopes.items()}
+                  for name, scopes in _rules.items()},
+        "pool_shed_ratio": POOL_SHED_RATIO,
+        "pool_saturation": pool_saturation(),
+        **(_store or _memory).stats(),
+    }
@@ -1,19 +1,29 @@
+import asyncio
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
 
-from . import crud, models, database
+from fastapi.concurrency import run_in_threadpool
+
+from . import crud, models, schemas, database, revocations
+from .cache import user_cache
 
 # 1. Load Config dari .env
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "rahasia_default_kalau_env_gagal") # Backup key
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Token membawa id, role & versi token user: request terautentikasi tanpa query database.
+# false = identitas tetap dibaca dari database/cache lewat email (seperti dulu).
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "true").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("uicode.auth")
 
 # 2. Setup skema token (Bearer Token)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -33,9 +43,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Isi token untuk user yang login. "sub" (email) tetap ada supaya token lama & baru sama-sama valid.
+def token_claims(user):
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "name": user.username,
+        "role": getattr(user.role, "value", user.role),
+        "tv": user.token_version or 0,
+    }
+
 # --- FUNGSI CEK USER SAAT INI (DEPENDENCY) ---
 # Fungsi ini akan dipasang di endpoint yang butuh login
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,10 +70,54 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    # Request tulis: baca berikutnya dari client ini diarahkan ke primary dulu (read-your-writes)
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        database.pin_primary(request.headers.get("authorization"))
+
+    # Token baru (punya "uid"): cek revokasi di memori (logout / ubah role / user dihapus)
+    user_id = payload.get("uid")
+    if user_id is not None:
+        if revocations.is_revoked(user_id, payload.get("tv")):
+            raise credentials_exception
+        # Jalur cepat: identitas & role langsung dari claim, tanpa database
+        if AUTH_STATELESS:
+            try:
+                return schemas.UserDisplay(id=user_id, username=payload.get("name"), email=email, role=payload.get("role"))
+            except ValueError:
+                raise credentials_exception
         
+    # Cek cache dulu, supaya tidak query DB di setiap request
+    cached = user_cache.get(email)
+    if cached is not None:
+        return cached
+
     # Cari user di database berdasarkan token tadi
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await database.run_db(db, crud.get_user_by_email, email)
     if user is None:
         raise credentials_exception
-        
-    return user
\ No newline at end of file
+
+    # Yang disimpan snapshot (id, username, email, role), bukan object ORM yang terikat session
+    current_user = schemas.UserDisplay.model_validate(user)
+    user_cache.set(email, current_user)
+    return current_user
+
+
+# --- REFRESH PETA REVOKASI TOKEN (dijalankan di lifespan) ---
+# Tiap worker memuat ulang revokasi dari worker lain secara berkala (lihat revocations.py).
+# Selalu lewat engine sync di threadpool: cuma 1 query kecil tiap beberapa detik.
+def refresh_revocations():
+    db = database.SessionLocal()
+    try:
+        return revocations.refresh(db, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    finally:
+        db.close()
+
+async def revocation_refresher():
+    while True:
+        try:
+            await run_in_threadpool(refresh_revocations)
+        except Exception as exc:
+            # Database sedang tidak bisa diakses: pakai peta terakhir, coba lagi di putaran berikutnya
+            logger.warning("Gagal refresh revokasi token: %s", exc)
+        await asyncio.sleep(revocations.REFRESH_SECONDS)
@@ -0,0 +1,131 @@
+# Penyimpanan kode HTML/CSS komponen secara content-addressed (tabel code_blobs)
+# - Key blob = sha256 dari kodenya. Komponen yang kodenya identik (copy, template bawaan,
+#   CSS reset yang sama) menunjuk ke 1 baris yang sama, jadi kodenya tersimpan sekali.
+# - Isi blob dikompresi zlib. Decompress hanya saat kodenya benar-benar dibaca
+#   (CodeBlob.text / row_code()), list summary & cek ETag tidak pernah menyentuh kolom data.
+# - refcount = jumlah kolom components.html_hash/css_hash yang menunjuk ke blob tsb. Naik lewat
+#   upsert di put()/put_many(), turun lewat release() saat komponen dihapus (delete_component,
+#   bulk delete, delete_user). Blob dengan refcount 0 langsung dihapus.
+# Tidak commit sendiri, ikut transaksi crud.
+import hashlib
+import os
+import zlib
+from collections import Counter
+
+from sqlalchemy import bindparam, delete, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+
+from . import models
+
+COMPRESS_LEVEL = int(os.getenv("CODE_BLOB_COMPRESS_LEVEL", "6"))
+
+
+# --- 1. HASH & KOMPRESI ---
+
+def digest(code):
+    return hashlib.sha256((code or "").encode()).hexdigest()
+
+
+def compress(code):
+    return zlib.compress((code or "").encode(), COMPRESS_LEVEL)
+
+
+def decompress(data):
+    return zlib.decompress(data).decode()
+
+
+def _row(code):
+    raw = (code or "").encode()
+    data = zlib.compress(raw, COMPRESS_LEVEL)
+    return {
+        "hash": hashlib.sha256(raw).hexdigest(),
+        "size": len(raw),
+        "stored_size": len(data),
+        "refcount": 1,
+        "data": data,
+    }
+
+
+def _upsert(db: Session):
+    blob = models.CodeBlob
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(blob)
+    # Blob sudah ada: isinya pasti sama (key = hash isi), cukup tambah refcount
+    return stmt.on_conflict_do_update(
+        index_elements=[blob.hash],
+        set_={"refcount": blob.refcount + stmt.excluded.refcount},
+    )
+
+
+# --- 2. SIMPAN & LEPAS ---
+
+def put(db: Session, code):
+    """Simpan 1 kode (atau tambah refcount kalau sudah ada). Return object CodeBlob."""
+    stmt = _upsert(db).values(**_row(code)).returning(models.CodeBlob)
+    return db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+
+def put_many(db: Session, codes):
+    """Simpan banyak kode sekaligus (1 statement executemany). Return list hash sesuai urutan codes."""
+    rows = {}
+    hashes = []
+    for code in codes:
+        row = _row(code)
+        if row["hash"] in rows:
+            rows[row["hash"]]["refcount"] += 1
+        else:
+            rows[row["hash"]] = row
+        hashes.append(row["hash"])
+    if rows:
+        db.execute(_upsert(db), list(rows.values()))
+    return hashes
+
+
+def release(db: Session, hashes):
+    """Kurangi refcount untuk tiap hash (boleh berulang / None), hapus blob yang tidak dipakai lagi."""
+    counts = Counter(h for h in hashes if h is not None)
+    if not counts:
+        return
+    table = models.CodeBlob.__table__
+    db.execute(
+        update(table)
+        .where(table.c.hash == bindparam("b_hash"))
+        .values(refcount=table.c.refcount - bindparam("b_count")),
+        [{"b_hash": h, "b_count": n} for h, n in counts.items()],
+    )
+    db.execute(delete(table).where(table.c.hash.in_(list(counts)), table.c.refcount <= 0))
+
+
+# --- 3. BACA KODE LEWAT QUERY TUPLE ---
+# Untuk query kolom (list, export, rebuild index): blob di-JOIN 2x (html & css).
+# Komponen yang belum dimigrasi masih membaca kolom lama html_code/css_code.
+HtmlBlob = aliased(models.CodeBlob, name="html_blob")
+CssBlob = aliased(models.CodeBlob, name="css_blob")
+CODE_COLUMNS = (
+    models.Component.legacy_html_code.label("html_raw"),
+    HtmlBlob.data.label("html_data"),
+    models.Component.legacy_css_code.label("css_raw"),
+    CssBlob.data.label("css_data"),
+)
+
+
+def join_code(query):
+    return query.outerjoin(HtmlBlob, HtmlBlob.hash == models.Component.html_hash).outerjoin(
+        CssBlob, CssBlob.hash == models.Component.css_hash
+    )
+
+
+def row_code(row):
+    # Return (html_code, css_code) dari baris yang memuat CODE_COLUMNS
+    html_code = decompress(row.html_data) if row.html_data is not None else row.html_raw
+    css_code = decompress(row.css_data) if row.css_data is not None else row.css_raw
+    return html_code, css_code
+
+
+def code_etag(html_hash, css_hash):
+    # ETag kode komponen dari hash blob-nya: bisa dicek tanpa membaca / decompress kodenya
+    if html_hash is None or css_hash is None:
+        return None
+    return '"' + hashlib.sha256(f"{html_hash}:{css_hash}".encode()).hexdigest()[:32] + '"'
@@ -0,0 +1,244 @@
+# Cache in-process sederhana: TTL + LRU (dibatasi jumlah entry)
+# Tiap worker uvicorn punya cache sendiri, jadi TTL dibuat pendek
+# supaya perubahan dari worker lain tetap kelihatan dalam waktu singkat.
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expire_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            # Tandai sebagai yang paling baru dipakai
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            # Buang yang paling lama tidak dipakai kalau sudah penuh
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# --- CACHE USER LOGIN (dipakai auth.get_current_user) ---
+# Key: email (subject token), value: snapshot schemas.UserDisplay (bukan object ORM)
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+
+
+# --- CACHE RESPONSE HTTP (katalog publik) ---
+# Menyimpan body JSON yang sudah jadi + ETag. Dibatasi total byte (LRU),
+# dan tiap entry punya "tag" (mis. "component:12", "list") supaya
+# invalidasi cukup membuang entry yang benar-benar terpengaruh.
+#
+# Response yang sedang dibangun (begin_build() ... set()) tidak disimpan kalau salah satu
+# tag-nya di-invalidasi selama build berjalan (datanya mungkin sudah basi). Generasi dicatat
+# per tag: vote ke komponen 12 hanya menggagalkan build yang memuat "component:12", halaman
+# list lain tetap tersimpan walau vote masuk terus-menerus.
+TAG_CLOCK_PRUNE = 4096
+
+
+class ResponseCache:
+    def __init__(self, maxbytes=32 * 1024 * 1024, ttl=30.0):
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expire_at, entry, tags)
+        self._tags = {}             # tag -> set(key)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Jam logis: naik setiap invalidasi. _tag_clock = jam saat tag terakhir di-invalidasi,
+        # _building = jam awal build yang sedang berjalan (untuk membuang catatan yang tidak
+        # mungkin dibandingkan lagi), _cleared_at = jam clear() terakhir.
+        self._clock = 0
+        self._tag_clock = {}
+        self._building = Counter()
+        self._cleared_at = 0
+        # Dengan read replica: setelah tag di-invalidasi, response dengan tag itu tidak
+        # disimpan selama stale_window detik (replica mungkin belum menerima perubahannya)
+        self.stale_window = 0.0
+        self._invalidated_at = {}   # tag -> waktu invalidasi terakhir
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        _expire_at, entry, tags = item
+        self._bytes -= len(entry["body"])
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def begin_build(self):
+        """Panggil sebelum membaca database. Return token untuk set() & end_build()."""
+        with self._lock:
+            self._building[self._clock] += 1
+            return self._clock
+
+    def end_build(self, token):
+        with self._lock:
+            self._building[token] -= 1
+            if not self._building[token]:
+                del self._building[token]
+            if len(self._tag_clock) > TAG_CLOCK_PRUNE:
+                # Tag yang di-invalidasi sebelum build tertua dimulai tidak akan menolak apa pun lagi
+                oldest = min(self._building, default=self._clock)
+                self._tag_clock = {tag: at for tag, at in self._tag_clock.items() if at > oldest}
+
+    def _stale(self, tags, token):
+        if token < self._cleared_at:
+            return True
+        return any(self._tag_clock.get(tag, -1) > token for tag in tags)
+
+    def set(self, key, entry, tags, token):
+        size = len(entry["body"])
+        with self._lock:
+            if size > self.maxbytes or self._stale(tags, token):
+                return
+            if self.stale_window and self._recently_invalidated(tags):
+                return
+            self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, entry, frozenset(tags))
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._bytes > self.maxbytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _recently_invalidated(self, tags):
+        now = time.monotonic()
+        return any(now - self._invalidated_at.get(tag, float("-inf")) < self.stale_window for tag in tags)
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            self._clock += 1
+            for tag in tags:
+                self._tag_clock[tag] = self._clock
+            if self.stale_window:
+                now = time.monotonic()
+                if len(self._invalidated_at) > 4096:
+                    # Buang catatan yang sudah lewat jendelanya supaya dict tidak terus membesar
+                    self._invalidated_at = {
+                        tag: at for tag, at in self._invalidated_at.items() if now - at < self.stale_window
+                    }
+                for tag in tags:
+                    self._invalidated_at[tag] = now
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._cleared_at = self._clock
+            self._data.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "bytes": self._bytes,
+                "maxbytes": self.maxbytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "building": sum(self._building.values()),
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    maxbytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "30")),
+)
+
+# Tag yang dipakai untuk invalidasi
+LIST_TAG = "list"
+# Jumlah komponen per kategori (/components/facets)
+FACETS_TAG = "facets"
+
+
+def component_tag(component_id):
+    return f"component:{component_id}"
+
+
+def invalidate_components(component_ids, lists=False, facets=False):
+    # lists=True kalau ada komponen yang baru masuk katalog (halaman mana pun bisa berubah)
+    # facets=True kalau jumlah komponen ACCEPTED per kategori berubah
+    tags = [component_tag(cid) for cid in component_ids]
+    if lists:
+        tags.append(LIST_TAG)
+    if facets:
+        tags.append(FACETS_TAG)
+    response_cache.invalidate_tags(*tags)
@@ -1,17 +1,22 @@
+import datetime
+
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from . import models, schemas
-from passlib.context import CryptContext
+from sqlalchemy import delete, func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from . import blobs, models, schemas, rankings, review_queue, revocations, serialization, similarity, search as search_index
+from .pagination import paginate, DEFAULT_PAGE_SIZE
+from .cache import user_cache, invalidate_components
+from .hashing import hash_password_sync, verify_password_sync
 
 # --- 1. SETUP KEAMANAN (HASHING) ---
-# Ini alat untuk mengubah password "rahasia123" menjadi kode acak panjang
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+# bcrypt-nya ada di hashing.py (endpoint memanggil versi async yang jalan di process pool)
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hash_password_sync(password)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_password_sync(plain_password, hashed_password)
 
 # --- 2. LOGIC USER ---
 
@@ -20,8 +25,10 @@ def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 # Fungsi untuk membuat user baru
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+# hashed_password boleh dihitung di luar (supaya bcrypt tidak jalan di dalam sesi DB)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     # Membuat object User baru
     db_user = models.User(
         username=user.username,
@@ -30,6 +37,12 @@ def create_user(db: Session, user: schemas.UserCreate):
         role=models.Role.USER # Default role adalah USER
     )
     db.add(db_user)      # Tambah ke session
+    db.flush()           # Dapatkan ID-nya dulu
+    # SQLite bisa memakai ulang ID user yang baru dihapus: mulai dari versi token minimum ID tsb,
+    # supaya token user baru tidak ikut ditolak (token user lama tetap ditolak, lihat revocations.py)
+    version = revocations.min_version(db, db_user.id)
+    if version is not None:
+        db_user.token_version = version
     db.commit()          # Simpan ke database
     db.refresh(db_user)  # Refresh untuk dapatkan ID yang baru dibuat
     return db_user
@@ -37,130 +50,594 @@ def create_user(db: Session, user: schemas.UserCreate):
 # --- 3. LOGIC COMPONENT ---
 
 # Ambil semua komponen yang statusnya ACCEPTED (Untuk Halaman Home Public)
+# Return (list baris, next_cursor). Baris berupa tuple kolom untuk serialization.component_rows
 def get_public_components(
     db: Session, 
-    skip: int = 0, 
-    limit: int = 100, 
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE, 
     search: str = None,   # Parameter Baru
-    category: str = None  # Parameter Baru
+    category: str = None, # Parameter Baru
+    summary: bool = False
 ):
-    # Mulai query dasar (Hanya yang ACCEPTED)
-    query = db.query(models.Component).filter(models.Component.status == models.Status.ACCEPTED)
+    # Mulai query dasar (Hanya yang ACCEPTED), kolom owner ikut di-JOIN biar tidak lazy load per baris
+    query = _component_query(db, summary).filter(models.Component.status == models.Status.ACCEPTED)
 
     # 1. Filter Kategori (Jika ada)
     if category and category != "All":
         query = query.filter(models.Component.category == category)
 
     # 2. Filter Search Keyword (Jika ada)
+    # Pakai full-text index (lihat search.py), bukan ILIKE '%...%' ke seluruh html_code
     if search:
-        search_fmt = f"%{search}%"
-        # Cari di dalam Category ATAU di dalam kodingan HTML-nya
-        query = query.filter(
-            or_(
-                models.Component.category.ilike(search_fmt),
-                models.Component.html_code.ilike(search_fmt)
-            )
+        hits = search_index.search_subquery(db, search)
+        if hits is None:
+            # Kata kunci tanpa kata yang bisa dicari (mis. "!!!"): tidak ada yang cocok,
+            # sama dengan matching_total 0 di /components/facets
+            return [], None
+        # Hasil search diurutkan berdasarkan relevansi, cursor-nya (rank, id)
+        query = query.join(hits, hits.c.component_id == models.Component.id).add_columns(hits.c.rank)
+        rows, next_cursor = paginate(
+            query,
+            [(hits.c.rank, True), (models.Component.id, False)],
+            cursor=cursor,
+            limit=limit,
+            row_values=lambda row: (row.rank, row.id),
         )
+        return rows, next_cursor
+
+    return _paginate_components(query, cursor, limit)
+
+# Semua list komponen dibaca sebagai tuple kolom (lihat serialization.py), bukan object ORM
+def _component_query(db: Session, summary: bool = False, *extra_columns):
+    return serialization.component_query(db, summary, *extra_columns)
+
+# Urutan standar list komponen: (created_at, id) dari yang paling lama
+def _paginate_components(query, cursor, limit):
+    return paginate(
+        query,
+        [(models.Component.created_at, False), (models.Component.id, False)],
+        cursor=cursor,
+        limit=limit,
+        row_values=lambda c: (c.created_at, c.id),
+    )
+
+# --- LEADERBOARD (TOP RATED / TRENDING) ---
+# Skor sudah tersimpan di kolom (lihat rankings.py), jadi cukup keyset pagination
+# di atas index (status, [category,] skor, id): biaya per halaman = page size, bukan ukuran katalog.
+RANKING_COLUMNS = {
+    "top": models.Component.bayes_score,
+    "trending": models.Component.trend_score,
+}
+
+def get_ranked_components(
+    db: Session,
+    ranking: str,
+    cursor: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    category: str = None,
+    summary: bool = False
+):
+    score = RANKING_COLUMNS[ranking]
+    query = _component_query(db, summary, score).filter(models.Component.status == models.Status.ACCEPTED)
+    if category and category != "All":
+        query = query.filter(models.Component.category == category)
 
-    return query.offset(skip).limit(limit).all()
+    return paginate(
+        query,
+        [(score, True), (models.Component.id, True)],
+        cursor=cursor,
+        limit=limit,
+        row_values=lambda c: (getattr(c, score.key), c.id),
+    )
 
 # Buat komponen baru (Otomatis status IN_REVIEW)
 def create_component(db: Session, component: schemas.ComponentCreate, user_id: int):
+    # Kode disimpan di code_blobs (lihat blobs.py): kode yang sudah pernah ada cukup ditambah refcount-nya
     db_component = models.Component(
         category=component.category,
-        html_code=component.html_code,
-        css_code=component.css_code,
+        html_blob=blobs.put(db, component.html_code),
+        css_blob=blobs.put(db, component.css_code),
         user_id=user_id, # <--- Pastikan ini user_id, BUKAN owner_id
-        status=models.Status.IN_REVIEW 
+        status=models.Status.IN_REVIEW,
+        **models.code_summary(component.html_code, component.css_code),
     )
     db.add(db_component)
+    db.flush()
+    # Catat komponen lama yang mirip (untuk reviewer) + masukkan ke index near-duplicate
+    similarity.index_component(db, db_component)
     db.commit()
     db.refresh(db_component)
+    invalidate_components([db_component.id])
     return db_component
 
+# --- COUNTER KATEGORI (FACET) ---
+# Jumlah komponen ACCEPTED per kategori ada di tabel category_counts. Perubahan status & hapus
+# memakai UPDATE/DELETE ... RETURNING category, jadi yang dihitung hanya baris yang benar-benar
+# berubah (aman walau 2 admin memoderasi komponen yang sama bersamaan). Tidak commit sendiri.
+def _dialect_insert(db: Session, model):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+def _apply_category_deltas(db: Session, deltas):
+    rows = [
+        {"category": category, "accepted_count": delta}
+        for category, delta in deltas.items() if category is not None and delta
+    ]
+    if not rows:
+        return
+    stmt = _dialect_insert(db, models.CategoryCount).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.CategoryCount.category],
+        set_={"accepted_count": models.CategoryCount.accepted_count + stmt.excluded.accepted_count},
+    )
+    db.execute(stmt)
+
+def _count_categories(rows, sign, deltas):
+    for (category,) in rows:
+        deltas[category] = deltas.get(category, 0) + sign
+    return deltas
+
+# Status berubah = review selesai, lease antrian ikut dilepas
+RELEASED_LEASE = {"review_claimed_by": None, "review_lease_until": None}
+
+def _set_status(db: Session, component_ids, new_status: models.Status):
+    # Ubah status banyak komponen + jaga counter kategori. Return delta per kategori.
+    component = models.Component
+    deltas = {}
+    if new_status == models.Status.ACCEPTED:
+        entering = (
+            update(component)
+            .where(component.id.in_(component_ids), component.status != models.Status.ACCEPTED)
+            .values(status=new_status, **RELEASED_LEASE)
+            .returning(component.category)
+            .execution_options(synchronize_session=False)
+        )
+        _count_categories(db.execute(entering), 1, deltas)
+    else:
+        leaving = (
+            update(component)
+            .where(component.id.in_(component_ids), component.status == models.Status.ACCEPTED)
+            .values(status=new_status, **RELEASED_LEASE)
+            .returning(component.category)
+            .execution_options(synchronize_session=False)
+        )
+        _count_categories(db.execute(leaving), -1, deltas)
+        db.execute(
+            update(component)
+            .where(component.id.in_(component_ids), component.status != new_status)
+            .values(status=new_status, **RELEASED_LEASE)
+            .execution_options(synchronize_session=False)
+        )
+    _apply_category_deltas(db, deltas)
+    return deltas
+
+# Hapus banyak komponen sekaligus (set-based, jumlah statement tetap berapa pun jumlahnya)
+# Tidak commit sendiri. Rating yang menempel ikut dihapus supaya tidak kena Foreign Key Error,
+# refcount blob kodenya diturunkan (blob yang tidak dipakai lagi ikut terhapus).
+# Return delta counter kategori (komponen ACCEPTED yang ikut terhapus).
+def _delete_components(db: Session, component_ids):
+    if not component_ids:
+        return {}
+    db.query(models.Rating).filter(models.Rating.component_id.in_(component_ids)).delete(synchronize_session=False)
+    search_index.remove_components(db, component_ids)
+    similarity.remove_components(db, component_ids)
+    removed = db.execute(
+        delete(models.Component)
+        .where(models.Component.id.in_(component_ids))
+        .returning(
+            models.Component.category, models.Component.status,
+            models.Component.html_hash, models.Component.css_hash,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    blobs.release(db, [row.html_hash for row in removed] + [row.css_hash for row in removed])
+    _record_deletions(db, component_ids)
+    deltas = _count_categories(
+        [(row.category,) for row in removed if row.status == models.Status.ACCEPTED], -1, {}
+    )
+    _apply_category_deltas(db, deltas)
+    return deltas
+
+# Tombstone untuk export incremental (export.py). ID yang dipakai ulang SQLite cukup diperbarui waktunya.
+def _record_deletions(db: Session, component_ids):
+    now = datetime.datetime.utcnow()
+    stmt = _dialect_insert(db, models.ComponentDeletion).values(
+        [{"component_id": cid, "deleted_at": now} for cid in component_ids]
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.ComponentDeletion.component_id],
+        set_={"deleted_at": stmt.excluded.deleted_at},
+    ))
+
 # (Khusus Admin) Hapus komponen
 def delete_component(db: Session, component_id: int):
-    component = db.query(models.Component).filter(models.Component.id == component_id).first()
-    if component:
-        db.delete(component)
+    # Cukup cek ID-nya ada (tanpa memuat kode komponen)
+    exists = db.query(models.Component.id).filter(models.Component.id == component_id).first()
+    if exists:
+        deltas = _delete_components(db, [component_id])
         db.commit()
-    return component
+        invalidate_components([component_id], facets=bool(deltas))
+    return exists is not None
 
-def update_component_status(db: Session, component_id: int, new_status: models.Status):
+# admin_id diisi: tolak (review_queue.LeaseConflict) kalau komponen sedang di-lease admin lain
+def update_component_status(db: Session, component_id: int, new_status: models.Status, admin_id: int = None):
     component = db.query(models.Component).filter(models.Component.id == component_id).first()
     if component:
-        component.status = new_status
+        if admin_id is not None and review_queue.held_by_other(component, admin_id):
+            raise review_queue.LeaseConflict(component.review_claimed_by, component.review_lease_until)
+        deltas = _set_status(db, [component_id], new_status)
+        # Index pencarian hanya berisi komponen ACCEPTED
+        if new_status == models.Status.ACCEPTED:
+            search_index.index_component(db, component)
+        else:
+            search_index.remove_components(db, [component.id])
         db.commit()
         db.refresh(component)
+        # Komponen yang baru ACCEPTED bisa muncul di halaman list mana pun
+        invalidate_components([component_id], lists=new_status == models.Status.ACCEPTED, facets=bool(deltas))
     return component
 
+# --- ADMIN: MODERASI BANYAK KOMPONEN SEKALIGUS (1 transaksi) ---
+# Return dict {component_id: "ok" / "not_found" / "leased"} sesuai urutan ids
+# ("leased": sedang di-lease admin lain lewat antrian review, dilewati)
+def bulk_update_component_status(db: Session, component_ids, new_status: models.Status, admin_id: int = None):
+    component_ids = list(dict.fromkeys(component_ids))
+    query = db.query(models.Component).filter(models.Component.id.in_(component_ids))
+
+    if new_status == models.Status.ACCEPTED:
+        # Butuh html/css untuk index pencarian
+        rows = query.all()
+    else:
+        rows = query.with_entities(
+            models.Component.id, models.Component.review_claimed_by, models.Component.review_lease_until
+        ).all()
+
+    leased_ids = set()
+    if admin_id is not None:
+        leased_ids = {c.id for c in rows if review_queue.held_by_other(c, admin_id)}
+    found = [c for c in rows if c.id not in leased_ids]
+    found_ids = [c.id for c in found]
+
+    if found_ids:
+        deltas = _set_status(db, found_ids, new_status)
+        if new_status == models.Status.ACCEPTED:
+            search_index.index_components(db, found)
+        else:
+            search_index.remove_components(db, found_ids)
+        db.commit()
+        invalidate_components(found_ids, lists=new_status == models.Status.ACCEPTED, facets=bool(deltas))
+
+    found_set = set(found_ids)
+    return {
+        cid: "ok" if cid in found_set else "leased" if cid in leased_ids else "not_found"
+        for cid in component_ids
+    }
+
+def bulk_delete_components(db: Session, component_ids):
+    component_ids = list(dict.fromkeys(component_ids))
+    found_ids = [
+        cid for (cid,) in db.query(models.Component.id).filter(models.Component.id.in_(component_ids))
+    ]
+    if found_ids:
+        deltas = _delete_components(db, found_ids)
+        db.commit()
+        invalidate_components(found_ids, facets=bool(deltas))
+
+    found_set = set(found_ids)
+    return {cid: "ok" if cid in found_set else "not_found" for cid in component_ids}
+
+# --- FACET: JUMLAH KOMPONEN ACCEPTED PER KATEGORI ---
+# Dari counter (tabel kecil, 1 query murah)
+def get_category_counts(db: Session):
+    rows = (
+        db.query(models.CategoryCount.category, models.CategoryCount.accepted_count)
+        .filter(models.CategoryCount.accepted_count > 0)
+        .order_by(models.CategoryCount.accepted_count.desc(), models.CategoryCount.category)
+        .all()
+    )
+    return [(category, count) for category, count in rows]
+
+# Jumlah per kategori yang cocok dengan pencarian (dihitung dari hasil full-text search)
+def get_search_category_counts(db: Session, search: str):
+    hits = search_index.search_subquery(db, search)
+    if hits is None:
+        return []
+    count = func.count(models.Component.id)
+    rows = (
+        db.query(models.Component.category, count)
+        .join(hits, hits.c.component_id == models.Component.id)
+        .filter(models.Component.status == models.Status.ACCEPTED)
+        .group_by(models.Component.category)
+        .order_by(count.desc(), models.Component.category)
+        .all()
+    )
+    return [(category, n) for category, n in rows if category is not None]
+
+# Hitung ulang semua counter dari tabel components (isi awal / perbaikan)
+def rebuild_category_counts(db: Session):
+    db.query(models.CategoryCount).delete(synchronize_session=False)
+    rows = (
+        db.query(models.Component.category, func.count(models.Component.id))
+        .filter(models.Component.status == models.Status.ACCEPTED, models.Component.category.isnot(None))
+        .group_by(models.Component.category)
+        .all()
+    )
+    if rows:
+        db.execute(
+            models.CategoryCount.__table__.insert(),
+            [{"category": category, "accepted_count": count} for category, count in rows],
+        )
+    return len(rows)
+
 # --- AMBIL KOMPONEN MILIK USER TERTENTU (Untuk Profile) ---
-def get_components_by_user(db: Session, user_id: int):
-    return db.query(models.Component).filter(models.Component.user_id == user_id).all()
+def get_components_by_user(db: Session, user_id: int, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, summary: bool = False):
+    query = _component_query(db, summary).filter(models.Component.user_id == user_id)
+    return _paginate_components(query, cursor, limit)
 
 # --- AMBIL SEMUA REQUEST PENDING (Untuk Dashboard Admin) ---
-def get_pending_components(db: Session):
-    return db.query(models.Component).filter(models.Component.status == models.Status.IN_REVIEW).all()
+def get_pending_components(db: Session, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, summary: bool = False):
+    query = _component_query(db, summary).filter(models.Component.status == models.Status.IN_REVIEW)
+    return _paginate_components(query, cursor, limit)
+
+# --- ADMIN: KOMPONEN LAMA YANG MIRIP (hasil deteksi saat submit) ---
+def get_similar_components(db: Session, component_id: int):
+    return (
+        db.query(models.ComponentSimilarity)
+        .filter(models.ComponentSimilarity.component_id == component_id)
+        .order_by(models.ComponentSimilarity.score.desc(), models.ComponentSimilarity.similar_id.desc())
+        .all()
+    )
+
 # --- AMBIL SATU KOMPONEN BERDASARKAN ID ---
 def get_component(db: Session, component_id: int):
     return db.query(models.Component).filter(models.Component.id == component_id).first()
 
+# --- AMBIL BANYAK KOMPONEN SEKALIGUS (favorites / koleksi) ---
+# 1 query IN untuk semua ID: owner ikut lewat JOIN, rating dari kolom agregat.
+# Return (komponen sesuai urutan ids, ids yang tidak ditemukan)
+def get_components_by_ids(db: Session, component_ids, summary: bool = False):
+    found = {c.id: c for c in _component_query(db, summary).filter(models.Component.id.in_(component_ids))}
+    return [found[cid] for cid in component_ids if cid in found], [cid for cid in component_ids if cid not in found]
+
+# --- AMBIL KODE LENGKAP SATU KOMPONEN (html_code + css_code saja) ---
+# Return dict {id, html_code, css_code, etag} atau None. etag dari hash blob (lihat blobs.code_etag).
+def get_component_code(db: Session, component_id: int):
+    component = models.Component
+    row = blobs.join_code(
+        db.query(component.id, component.html_hash, component.css_hash, *blobs.CODE_COLUMNS)
+    ).filter(component.id == component_id).first()
+    if row is None:
+        return None
+    html_code, css_code = blobs.row_code(row)
+    return {"id": row.id, "html_code": html_code, "css_code": css_code, "etag": blobs.code_etag(row.html_hash, row.css_hash)}
+
+# ETag kode komponen tanpa membaca blob-nya (None kalau komponen tidak ada / belum dimigrasi)
+def get_component_code_etag(db: Session, component_id: int):
+    row = db.query(models.Component.html_hash, models.Component.css_hash).filter(
+        models.Component.id == component_id
+    ).first()
+    return blobs.code_etag(*row) if row else None
+
 # --- ADMIN: GET ALL USERS ---
-def get_all_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_all_users(db: Session, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    return paginate(
+        db.query(models.User),
+        [(models.User.id, False)],
+        cursor=cursor,
+        limit=limit,
+        row_values=lambda u: (u.id,),
+    )
+
+# --- REVOKASI TOKEN (lihat revocations.py) ---
+# Naikkan versi token user & catat di token_revocations. Return versi minimum baru
+# (None kalau user tidak ada). Tidak commit sendiri; panggil revocations.remember() setelah commit.
+def revoke_user_tokens(db: Session, user_id: int):
+    version = db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(token_version=models.User.token_version + 1)
+        .returning(models.User.token_version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if version is None:
+        return None
+
+    stmt = _dialect_insert(db, models.TokenRevocation).values(
+        user_id=user_id, min_version=version, revoked_at=datetime.datetime.utcnow()
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.TokenRevocation.user_id],
+        set_={"min_version": stmt.excluded.min_version, "revoked_at": stmt.excluded.revoked_at},
+    ))
+    return version
 
 # --- ADMIN: DELETE USER ---
 def delete_user(db: Session, user_id: int):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user:
+        # Semua langkah di bawah set-based: jumlah statement tetap, berapa pun banyak karyanya
+        component_ids = [
+            cid for (cid,) in db.query(models.Component.id).filter(models.Component.user_id == user_id)
+        ]
+
         # 1. HAPUS DULU: Rating yang pernah dibuat oleh user ini
         # Kalau tidak dihapus, database akan menolak delete user (Foreign Key Error)
-        db.query(models.Rating).filter(models.Rating.user_id == user_id).delete()
-
-        # 2. HAPUS DULU: Komponen milik user ini
-        # (Sebenarnya biasanya otomatis, tapi kita paksa hapus manual biar aman & bersih)
-        # Sebelum hapus komponen, hapus juga rating yang nempel di komponen user ini
-        user_components = db.query(models.Component).filter(models.Component.user_id == user_id).all()
-        for comp in user_components:
-            # Hapus rating yang ada di komponen milik user ini
-            db.query(models.Rating).filter(models.Rating.component_id == comp.id).delete()
-            # Hapus komponennya
-            db.delete(comp)
-
-        # 3. TERAKHIR: Baru hapus User-nya
+        # Agregat rating komponen yang pernah di-vote ikut turun lewat trigger (lihat triggers.py),
+        # di sini cukup dicatat ID-nya untuk invalidasi cache
+        own = set(component_ids)
+        voted_ids = [
+            cid for (cid,) in db.query(models.Rating.component_id)
+            .filter(models.Rating.user_id == user_id)
+            .distinct()
+            if cid not in own
+        ]
+        db.query(models.Rating).filter(models.Rating.user_id == user_id).delete(synchronize_session=False)
+
+        # 2. HAPUS DULU: Komponen milik user ini (beserta rating yang nempel di komponennya)
+        deltas = _delete_components(db, component_ids)
+
+        # 3. TERAKHIR: Baru hapus User-nya (semua tokennya direvokasi dulu, selagi barisnya ada)
+        email = user.email
+        version = revoke_user_tokens(db, user_id)
         db.delete(user)
         
         db.commit()
+        # Token user ini tidak boleh lolos lagi lewat cache login / claim JWT
+        user_cache.invalidate(email)
+        revocations.remember(user_id, version)
+        # Komponen miliknya hilang, komponen yang pernah dia vote berubah rating-nya
+        invalidate_components(component_ids + voted_ids, facets=bool(deltas))
         return True
     return False
 
+# --- ADMIN: UBAH ROLE USER ---
+def update_user_role(db: Session, user_id: int, role: models.Role):
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if user:
+        user.role = role
+        db.flush()
+        # Token lama membawa role lama di claim-nya: direvokasi, user harus login ulang
+        version = revoke_user_tokens(db, user_id)
+        db.commit()
+        db.refresh(user)
+        # Role lama jangan sampai masih dipakai dari cache
+        user_cache.invalidate(user.email)
+        revocations.remember(user_id, version)
+        # Response katalog yang sudah di-cache memuat owner.role: buang semua yang memuat karyanya
+        component_ids = [
+            cid for (cid,) in db.query(models.Component.id).filter(models.Component.user_id == user_id)
+        ]
+        invalidate_components(component_ids)
+    return user
+
+# --- LOGOUT: cabut semua token milik user ---
+def logout_user(db: Session, user_id: int):
+    version = revoke_user_tokens(db, user_id)
+    db.commit()
+    if version is not None:
+        revocations.remember(user_id, version)
+        # Snapshot user di cache login juga dibuang (token lama tanpa claim "uid" memakainya)
+        email = db.query(models.User.email).filter(models.User.id == user_id).scalar()
+        user_cache.invalidate(email)
+    return version is not None
+
 # --- ADMIN: GET COMPONENTS BY SPECIFIC USER ID (Untuk melihat karya user lain) ---
-def get_components_by_user_id(db: Session, user_id: int):
-    return db.query(models.Component).filter(models.Component.user_id == user_id).all()
+def get_components_by_user_id(db: Session, user_id: int, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, summary: bool = False):
+    query = _component_query(db, summary).filter(models.Component.user_id == user_id)
+    return _paginate_components(query, cursor, limit)
 
 # rating sistem
-def vote_component(db: Session, user_id: int, component_id: int, score: int):
-    # Cek apakah user sudah pernah vote komponen ini?
-    existing_vote = db.query(models.Rating).filter(
-        models.Rating.user_id == user_id,
-        models.Rating.component_id == component_id
-    ).first()
+# Upsert banyak rating dalam 1 statement: INSERT ... ON CONFLICT (user_id, component_id) DO UPDATE.
+# Agregat rating_sum / rating_count / bayes_score diurus trigger database (lihat triggers.py),
+# trend_score ditambah di sini (butuh waktu vote) hanya untuk vote BARU: user yang mengubah
+# vote-nya berkali-kali tidak boleh mendongkrak trending. Tidak commit sendiri.
+def upsert_ratings(db: Session, votes):
+    # Kalau (user, komponen) yang sama muncul 2x, yang terakhir yang dipakai
+    rows = list({(v["user_id"], v["component_id"]): v for v in votes}.values())
+    if not rows:
+        return
 
-    if existing_vote:
-        existing_vote.score = score # Update nilai lama
+    rating = models.Rating
+    stmt = _dialect_insert(db, rating).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[rating.user_id, rating.component_id],
+        set_={"score": stmt.excluded.score},
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # xmax = 0 hanya untuk baris hasil INSERT (baris hasil DO UPDATE punya xmax transaksi ini)
+        result = db.execute(stmt.returning(rating.component_id, literal_column("xmax = 0")))
+        new_votes = [component_id for component_id, inserted in result if inserted]
     else:
-        new_vote = models.Rating(user_id=user_id, component_id=component_id, score=score)
-        db.add(new_vote)
-    
-    db.commit()
+        # SQLite tidak bisa membedakan INSERT & DO UPDATE di RETURNING: cek vote lama dulu.
+        # Aman karena penulis SQLite memang berurutan (1 writer).
+        existing = set(db.query(rating.user_id, rating.component_id).filter(
+            rating.user_id.in_({row["user_id"] for row in rows}),
+            rating.component_id.in_({row["component_id"] for row in rows}),
+        ))
+        db.execute(stmt)
+        new_votes = [row["component_id"] for row in rows if (row["user_id"], row["component_id"]) not in existing]
+
+    vote_counts = {}
+    for component_id in new_votes:
+        vote_counts[component_id] = vote_counts.get(component_id, 0) + 1
+    rankings.add_trend_votes(db, vote_counts)
+
+def vote_component(db: Session, user_id: int, component_id: int, score: int):
+    # Tidak perlu SELECT rating lama (upsert), tapi komponennya harus dicek ada: SQLite tidak
+    # menegakkan Foreign Key (PRAGMA foreign_keys mati), vote ke ID sembarang jadi rating yatim
+    if not get_existing_component_ids(db, [component_id]):
+        return False
+    try:
+        upsert_ratings(db, [{"user_id": user_id, "component_id": component_id, "score": score}])
+        db.commit()
+    except IntegrityError:
+        # Komponen terhapus di antara cek & upsert (Foreign Key, Postgres)
+        db.rollback()
+        return False
+
+    invalidate_components([component_id])
     return True
 
+# ID komponen yang masih ada (dipakai vote batch & write-behind vote_buffer.py)
+def get_existing_component_ids(db: Session, component_ids):
+    return {
+        cid for (cid,) in db.query(models.Component.id).filter(models.Component.id.in_(list(component_ids)))
+    }
+
+# Vote banyak komponen sekaligus oleh 1 user (1 transaksi)
+# Return dict {component_id: "ok" / "not_found"}
+def vote_components(db: Session, user_id: int, votes):
+    scores = {v["component_id"]: v["score"] for v in votes}
+    found = get_existing_component_ids(db, scores)
+    upsert_ratings(db, [
+        {"user_id": user_id, "component_id": cid, "score": score}
+        for cid, score in scores.items() if cid in found
+    ])
+    db.commit()
+    invalidate_components(found)
+    return {cid: "ok" if cid in found else "not_found" for cid in scores}
+
 def get_average_rating(db: Session, component_id: int):
-    # Hitung rata-rata manual
-    ratings = db.query(models.Rating).filter(models.Rating.component_id == component_id).all()
-    if not ratings:
+    # Baca dari kolom agregat, tidak perlu load semua Rating lagi
+    row = db.query(models.Component.rating_sum, models.Component.rating_count).filter(
+        models.Component.id == component_id
+    ).first()
+    if not row or not row.rating_count:
         return 0, 0 # Rating 0, Jumlah 0
-    
-    total_score = sum(r.score for r in ratings)
-    count = len(ratings)
-    return round(total_score / count, 1), count
\ No newline at end of file
+
+    return round(row.rating_sum / row.rating_count, 1), row.rating_count
+
+# --- PERBAIKI AGREGAT RATING (Backfill / Repair) ---
+# Normalnya agregat dijaga trigger; ini untuk isi awal atau kalau dicurigai tidak sinkron.
+# component_ids=None artinya hitung ulang semua komponen
+def refresh_rating_aggregates(db: Session, component_ids=None):
+    if component_ids is not None and not component_ids:
+        return 0
+
+    rating_sum = (
+        select(func.coalesce(func.sum(models.Rating.score), 0))
+        .where(models.Rating.component_id == models.Component.id)
+        .scalar_subquery()
+    )
+    rating_count = (
+        select(func.count(models.Rating.id))
+        .where(models.Rating.component_id == models.Component.id)
+        .scalar_subquery()
+    )
+
+    query = db.query(models.Component)
+    if component_ids is not None:
+        query = query.filter(models.Component.id.in_(component_ids))
+
+    return query.update(
+        {
+            models.Component.rating_sum: rating_sum,
+            models.Component.rating_count: rating_count,
+            models.Component.bayes_score: (rating_sum + rankings.PRIOR_MEAN * rankings.PRIOR_WEIGHT)
+            / (rating_count + rankings.PRIOR_WEIGHT),
+            # Perbaikan agregat bukan perubahan komponen: updated_at tetap
+            models.Component.updated_at: models.Component.updated_at,
+        },
+        synchronize_session=False,
+    )
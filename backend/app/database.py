@@ -1,20 +1,71 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+import itertools
 import os
+import threading
 from dotenv import load_dotenv
 
-# 1. Load data dari file .env
-load_dotenv()
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+from . import metrics, rankings
+from .cache import TTLCache
 
-# 2. Buat "Mesin" koneksi ke Postgres
+# 1. Konfigurasi koneksi dibaca dari environment.
+# File .env baru dimuat di init_engines() (sebelum engine dibuat), jadi import modul ini
+# tidak punya efek samping; load_settings() dipanggil ulang di sana supaya isi .env terbaca.
+def load_settings():
+    global SQLALCHEMY_DATABASE_URL, REPLICA_URLS
+    global DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+    SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+    # DATABASE_REPLICA_URLS=url1,url2 (lihat bagian 7)
+    REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    # Setting pool koneksi (berlaku untuk primary & semua replica)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # detik, -1 = tidak pernah
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+load_settings()
+
+# Mode async (ASYNC_DB=true): endpoint pakai AsyncSession + driver async (asyncpg / aiosqlite),
+# jadi jumlah request bersamaan tidak dibatasi ukuran threadpool Starlette.
+# Dependency endpoint dipilih saat import, jadi ASYNC_DB harus ada di environment proses (bukan cuma di .env).
+ASYNC_DB = os.getenv("ASYNC_DB", "false").lower() in ("1", "true", "yes")
+
+def engine_options(url: str):
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # SQLite in-memory pakai pool khusus (1 koneksi), tidak bisa diatur ukurannya
+    if make_url(url).database not in (None, "", ":memory:"):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+# 2. "Mesin" koneksi ke Postgres (primary, async & replica) dibuat saat pertama kali dibutuhkan
+# (init_engines: dipanggil di lifespan, atau otomatis oleh SessionLocal() / get_engine()).
+# Import modul ini tidak membuka koneksi apa pun, jadi worker, test & CLI cepat siap.
 # Jika ada error koneksi, biasanya karena URL di .env salah
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = None
+async_engine = None
+replica_engines = []
+async_replica_engines = []
+ReplicaSessionLocals = []
+AsyncReplicaSessionLocals = []
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+_async_session_factory = None
+_init_lock = threading.Lock()
 
 # 3. Buat sesi database (SessionLocal)
 # Ini yang akan kita pakai setiap kali mau simpan/ambil data
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def SessionLocal():
+    init_engines()
+    return _session_factory()
+
+def get_engine():
+    init_engines()
+    return engine
 
 # 4. Base class untuk membuat Model (Tabel) nanti
 Base = declarative_base()
@@ -25,4 +76,163 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- 6. MODE ASYNC (OPSIONAL) ---
+
+# Ganti driver sync di URL dengan driver async-nya
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str):
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+def AsyncSessionLocal():
+    init_engines()
+    return _async_session_factory()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency yang dipakai endpoint: otomatis pilih sync/async sesuai config
+get_session = get_async_db if ASYNC_DB else get_db
+
+# --- 7. READ REPLICA (OPSIONAL) ---
+# DATABASE_REPLICA_URLS=url1,url2 : endpoint yang hanya membaca (katalog publik, list, detail)
+# memakai get_read_session dan dibagi bergiliran ke replica. Tulis tetap ke primary.
+# Read-your-writes: setelah request tulis (POST/PATCH/DELETE) yang login, token yang sama
+# "dipin" ke primary selama PRIMARY_PIN_SECONDS, jadi data miliknya sendiri tidak terlihat
+# mundur karena replica masih tertinggal. Pin disimpan per worker (sama seperti user_cache).
+# Untuk testing lokal: 2 file SQLite (primary.db & salinannya replica.db) sudah cukup.
+PRIMARY_PIN_SECONDS = float(os.getenv("PRIMARY_PIN_SECONDS", "5"))
+
+_replica_turn = itertools.count()
+_pinned = TTLCache(maxsize=10000, ttl=PRIMARY_PIN_SECONDS)
+
+def pin_primary(key):
+    # Dipanggil setelah request tulis; key = header Authorization milik client
+    if REPLICA_URLS and key:
+        _pinned.set(key, True)
+
+def is_pinned(key):
+    return bool(key) and _pinned.get(key) is not None
+
+def read_sessionmaker(pin_key=None, use_async=ASYNC_DB):
+    # Pilih sessionmaker untuk baca: primary kalau tidak ada replica / sedang dipin,
+    # selain itu replica secara bergiliran (round-robin)
+    init_engines()
+    primary, replicas = (AsyncSessionLocal, AsyncReplicaSessionLocals) if use_async else (SessionLocal, ReplicaSessionLocals)
+    if not replicas or is_pinned(pin_key):
+        return primary
+    return replicas[next(_replica_turn) % len(replicas)]
+
+def get_read_db(request: Request):
+    db = read_sessionmaker(request.headers.get("authorization"), use_async=False)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    async with read_sessionmaker(request.headers.get("authorization"), use_async=True)() as db:
+        yield db
+
+# Dependency untuk endpoint yang hanya membaca
+get_read_session = get_async_read_db if ASYNC_DB else get_read_db
+
+# --- 8. BUAT ENGINE (SEKALI PER PROSES) ---
+# create_engine tidak membuka koneksi; koneksi pertama baru dibuat saat query pertama.
+# Isi .env dimuat di sini (variabel yang sudah ada di environment tidak ditimpa).
+# Hook per engine: fungsi exp()/ln() SQLite (rankings.py) & metrik (metrics.py),
+# dipasang di semua engine termasuk replica.
+
+def init_engines():
+    global engine, async_engine, _async_session_factory
+    global replica_engines, ReplicaSessionLocals, async_replica_engines, AsyncReplicaSessionLocals
+    if engine is not None:
+        return
+    with _init_lock:
+        if engine is not None:
+            return
+        load_dotenv()
+        load_settings()
+        replica_engines = [create_engine(url, **engine_options(url)) for url in REPLICA_URLS]
+        ReplicaSessionLocals = [
+            sessionmaker(autocommit=False, autoflush=False, bind=replica) for replica in replica_engines
+        ]
+
+        if ASYNC_DB:
+            # Import di sini supaya mode sync tidak butuh paket asyncpg/aiosqlite
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            async_url = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+            async_engine = create_async_engine(async_url, **engine_options(async_url))
+            # expire_on_commit=False: object hasil query tetap bisa dibaca setelah commit
+            # (di mode async, lazy load setelah commit tidak diizinkan)
+            _async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+            if REPLICA_URLS:
+                async_replica_urls = [
+                    url.strip() for url in os.getenv("ASYNC_DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+                ] or [to_async_url(url) for url in REPLICA_URLS]
+                async_replica_engines = [create_async_engine(url, **engine_options(url)) for url in async_replica_urls]
+                AsyncReplicaSessionLocals = [
+                    async_sessionmaker(replica, autoflush=False, expire_on_commit=False)
+                    for replica in async_replica_engines
+                ]
+
+        primary = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+        _session_factory.configure(bind=primary)
+        # engine diisi paling akhir: thread lain baru memakainya setelah semuanya siap
+        engine = primary
+        for name, bind in all_engines():
+            rankings.register_sqlite_functions(bind)
+            metrics.instrument_engine(bind, name)
+
+# --- 9. STATUS POOL ---
+
+def _safe_url(bind):
+    return bind.url.render_as_string(hide_password=True)
+
+def all_engines():
+    # (nama, engine sync) untuk semua koneksi; AsyncEngine diwakili sync_engine-nya.
+    # Kosong kalau engine belum dibuat.
+    if engine is None:
+        return []
+    engines = [("primary", engine)]
+    engines += [(f"replica{i + 1}", replica) for i, replica in enumerate(replica_engines)]
+    if async_engine is not None:
+        engines.append(("primary_async", async_engine.sync_engine))
+    engines += [(f"replica{i + 1}_async", replica.sync_engine) for i, replica in enumerate(async_replica_engines)]
+    return engines
+
+def pool_status():
+    status = {}
+    for name, bind in all_engines():
+        pool = bind.pool
+        item = {"url": _safe_url(bind), "pool": type(pool).__name__}
+        # Hanya QueuePool (dan turunannya) yang punya angka ukuran/overflow
+        for field in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, field, None)
+            if callable(method):
+                item[field] = method()
+        status[name] = item
+    return {
+        "pinned_clients": _pinned.stats()["size"],
+        "pin_seconds": PRIMARY_PIN_SECONDS,
+        "engines": status,
+    }
+
+# Jalankan fungsi crud (yang ditulis sync) di atas session mana pun:
+# - AsyncSession: lewat run_sync, I/O-nya tetap async (tidak makan thread)
+# - Session biasa: dilempar ke threadpool supaya event loop tidak ke-block
+async def run_db(db, fn, *args, **kwargs):
+    if ASYNC_DB:
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -0,0 +1,149 @@
+# Export katalog (komponen ACCEPTED) dalam format NDJSON: 1 baris JSON = 1 komponen
+# - Dibaca pakai server-side cursor (stream_results + yield_per), jadi memori tetap kecil
+#   berapa pun besar katalognya
+# - Rating ikut di baris yang sama (kolom agregat), tanpa query tambahan
+# - ?updated_since= untuk sinkronisasi incremental (hanya yang berubah sejak waktu itu).
+#   Komponen yang keluar dari katalog sejak waktu itu (ditolak / dikembalikan ke review, dihapus,
+#   ikut terhapus bersama user-nya) dikirim lebih dulu sebagai tombstone {"id": ..., "deleted": true};
+#   client cukup membuang ID tsb (tombstone untuk ID yang tidak dimilikinya boleh diabaikan).
+import json
+import zlib
+from datetime import datetime, timezone
+
+from sqlalchemy import select, union
+
+from . import blobs, models
+
+BATCH_SIZE = 500
+EXPORT_COLUMNS = (
+    models.Component.id,
+    models.Component.category,
+    *blobs.CODE_COLUMNS,
+    models.Component.created_at,
+    models.Component.updated_at,
+    models.Component.rating_sum,
+    models.Component.rating_count,
+    models.Component.user_id,
+    models.User.username.label("owner_username"),
+)
+
+
+def normalize_since(updated_since):
+    # Kolom di DB disimpan UTC tanpa timezone
+    if updated_since is not None and updated_since.tzinfo is not None:
+        updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+    return updated_since
+
+
+def export_query(updated_since=None):
+    # Pakai kolom biasa (bukan object ORM) supaya tidak menumpuk di identity map session
+    query = (
+        blobs.join_code(select(*EXPORT_COLUMNS))
+        .outerjoin(models.User, models.User.id == models.Component.user_id)
+        .where(models.Component.status == models.Status.ACCEPTED)
+        .order_by(models.Component.id)
+        .execution_options(stream_results=True, yield_per=BATCH_SIZE)
+    )
+    if updated_since is not None:
+        query = query.where(models.Component.updated_at >= normalize_since(updated_since))
+    return query
+
+
+def tombstone_query(updated_since):
+    since = normalize_since(updated_since)
+    component = models.Component
+    left = select(component.id).where(component.status != models.Status.ACCEPTED, component.updated_at >= since)
+    deleted = select(models.ComponentDeletion.component_id).where(models.ComponentDeletion.deleted_at >= since)
+    return union(left, deleted).execution_options(stream_results=True, yield_per=BATCH_SIZE)
+
+
+def encode_tombstones(rows):
+    return "".join(json.dumps({"id": component_id, "deleted": True}) + "\n" for (component_id,) in rows).encode()
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_rows(rows):
+    lines = []
+    for row in rows:
+        html_code, css_code = blobs.row_code(row)
+        lines.append(json.dumps({
+            "id": row.id,
+            "category": row.category,
+            "html_code": html_code,
+            "css_code": css_code,
+            "created_at": _isoformat(row.created_at),
+            "updated_at": _isoformat(row.updated_at),
+            "rating": round(row.rating_sum / row.rating_count, 1) if row.rating_count else 0,
+            "review_count": row.rating_count,
+            "owner": {"id": row.user_id, "username": row.owner_username},
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode() if lines else b""
+
+
+# --- SUMBER DATA: SYNC & ASYNC ---
+# Session dibuka sendiri di dalam generator (bukan dari dependency),
+# karena stream masih berjalan setelah endpoint selesai return.
+
+def iter_export_sync(session_factory, updated_since=None):
+    db = session_factory()
+    try:
+        if updated_since is not None:
+            for batch in db.execute(tombstone_query(updated_since)).partitions():
+                yield encode_tombstones(batch)
+        result = db.execute(export_query(updated_since))
+        for batch in result.partitions():
+            yield encode_rows(batch)
+    finally:
+        db.close()
+
+
+async def iter_export_async(session_factory, updated_since=None):
+    async with session_factory() as db:
+        if updated_since is not None:
+            tombstones = await db.stream(tombstone_query(updated_since))
+            async for batch in tombstones.partitions():
+                yield encode_tombstones(batch)
+        result = await db.stream(export_query(updated_since))
+        async for batch in result.partitions():
+            yield encode_rows(batch)
+
+
+# --- KOMPRESI GZIP (OPSIONAL) ---
+
+def accepts_gzip(accept_encoding):
+    # "gzip;q=0" = client menolak gzip; "*" berlaku kalau gzip tidak disebut sendiri
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            qualities[coding.lower()] = q
+    return qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0))) > 0
+
+
+def gzip_sync(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: format gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def gzip_async(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,119 @@
+# Hashing password (bcrypt) di process pool terpisah
+# bcrypt makan ~100-250 ms CPU per panggilan. Kalau dijalankan di thread request,
+# lonjakan login bikin endpoint lain ikut lambat. Di sini bcrypt dijalankan di
+# beberapa proses worker (bisa pakai semua core), dengan batas antrian:
+# kalau antrian penuh, request langsung ditolak 503 daripada menumpuk.
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+# Ini alat untuk mengubah password "rahasia123" menjadi kode acak panjang
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# 0 = tanpa process pool (bcrypt jalan di threadpool, cocok untuk dev/testing)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+# Maksimal pekerjaan hashing yang boleh antri + jalan bersamaan
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(max(PASSWORD_WORKERS, 1) * 4)))
+RETRY_AFTER_SECONDS = 1
+
+
+# --- 1. FUNGSI YANG DIJALANKAN DI PROSES WORKER ---
+# Harus fungsi top-level (bisa di-pickle), dan modul ini sengaja ringan
+# (tidak import database) supaya proses worker cepat siap.
+
+def hash_password_sync(password):
+    return pwd_context.hash(password)
+
+
+def verify_password_sync(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+# --- 2. POOL & METRIK ---
+
+_pool = None
+_in_flight = 0
+_stats = {"submitted": 0, "completed": 0, "rejected": 0, "max_in_flight": 0}
+_latencies = deque(maxlen=1000)  # detik, 1000 sampel terakhir
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: aman walaupun proses utama sudah punya thread / event loop
+        _pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def _run(fn, *args):
+    global _in_flight
+
+    # Admission control: tolak kalau antrian sudah penuh
+    if _in_flight >= PASSWORD_QUEUE_LIMIT:
+        _stats["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+    _in_flight += 1
+    _stats["submitted"] += 1
+    _stats["max_in_flight"] = max(_stats["max_in_flight"], _in_flight)
+    started = time.perf_counter()
+    try:
+        if PASSWORD_WORKERS <= 0:
+            return await run_in_threadpool(fn, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+    finally:
+        _in_flight -= 1
+        _stats["completed"] += 1
+        _latencies.append(time.perf_counter() - started)
+
+
+async def hash_password(password):
+    return await _run(hash_password_sync, password)
+
+
+async def verify_password(plain_password, hashed_password):
+    return await _run(verify_password_sync, plain_password, hashed_password)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def stats():
+    latencies = sorted(_latencies)
+    return {
+        "workers": PASSWORD_WORKERS,
+        "queue_limit": PASSWORD_QUEUE_LIMIT,
+        "queue_depth": _in_flight,
+        **_stats,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 2),
+            "p95": round(_percentile(latencies, 95) * 1000, 2),
+            "p99": round(_percentile(latencies, 99) * 1000, 2),
+        },
+    }
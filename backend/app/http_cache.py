@@ -0,0 +1,58 @@
+# Response cache + ETag untuk endpoint katalog publik
+# - Hit cache: body JSON langsung dikirim, tanpa query DB & tanpa serialisasi ulang
+# - If-None-Match cocok dengan ETag: balas 304 tanpa body
+import hashlib
+
+from fastapi import Request, Response
+
+from .cache import response_cache
+
+# Browser/CDN boleh simpan, tapi wajib cek ulang (pakai ETag) sebelum dipakai
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(body: bytes):
+    # Strong ETag: hash dari isi body
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip() for tag in header.split(",")]
+
+
+def _to_response(request: Request, entry):
+    headers = {"ETag": entry["etag"], "Cache-Control": CACHE_CONTROL, **entry["headers"]}
+    if _etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
+async def cached_json_response(request: Request, key, build, etag=None):
+    """Ambil response dari cache, atau bangun lewat build() lalu simpan.
+
+    build() adalah coroutine yang return (body_bytes, tags, headers). Header "ETag" dari build()
+    dipakai menggantikan hash body. etag (opsional) adalah coroutine yang menghitung ETag yang
+    sama tanpa membangun body: saat cache kosong & If-None-Match cocok, langsung balas 304.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        if etag is not None and request.headers.get("if-none-match"):
+            current = await etag()
+            if current is not None and _etag_matches(request, current):
+                return Response(status_code=304, headers={"ETag": current, "Cache-Control": CACHE_CONTROL})
+        # Token diambil sebelum baca DB; kalau tag response ini di-invalidasi di tengah jalan,
+        # hasilnya tidak disimpan ke cache
+        token = response_cache.begin_build()
+        try:
+            body, tags, headers = await build()
+            headers = dict(headers)
+            entry = {"body": body, "etag": headers.pop("ETag", None) or make_etag(body), "headers": headers}
+            response_cache.set(key, entry, tags, token)
+        finally:
+            response_cache.end_build(token)
+    return _to_response(request, entry)
@@ -1,18 +1,50 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware # <--- IMPORT PENTING
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List, Optional
+from typing import List, Optional, Union
+from datetime import datetime
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+import asyncio
 
-from .database import get_db, engine
-from . import models, schemas, crud, auth
+from .database import get_session, get_read_session, run_db
+from . import admission, models, schemas, crud, auth, hashing, export, database, metrics, migrations, review_queue, revocations, serialization, vote_buffer
+from .pagination import DEFAULT_PAGE_SIZE, NEXT_CURSOR_HEADER, clamp_limit
 from .models import Role, Status
+from .cache import user_cache, response_cache, FACETS_TAG, LIST_TAG, component_tag
+from .http_cache import cached_json_response
 
-# Buat tabel database
-models.Base.metadata.create_all(bind=engine)
+# Startup / shutdown aplikasi
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engine dibuat di sini (belum connect), lalu cuma cek versi skema: tabel, index & trigger
+    # dibuat oleh "python -m app.manage migrate", bukan oleh tiap worker (lihat migrations.py)
+    database.init_engines()
+    # Dengan replica, response yang dibangun sesaat setelah invalidasi bisa berasal dari
+    # replica yang belum ter-update; jangan disimpan ke cache selama jendela pin yang sama
+    if database.REPLICA_URLS:
+        response_cache.stale_window = database.PRIMARY_PIN_SECONDS
+    await run_in_threadpool(migrations.check, database.engine)
+    # Peta revokasi token dimuat ulang berkala (token stateless, lihat revocations.py)
+    refresher = asyncio.create_task(auth.revocation_refresher())
+    # Flush vote write-behind berkala (kalau VOTE_WRITE_BEHIND aktif, lihat vote_buffer.py)
+    vote_flusher = asyncio.create_task(vote_buffer.run_flusher()) if vote_buffer.WRITE_BEHIND else None
+    yield
+    refresher.cancel()
+    if vote_flusher is not None:
+        vote_flusher.cancel()
+        try:
+            await asyncio.gather(vote_flusher, return_exceptions=True)
+        finally:
+            # Vote yang sudah di-ack jangan sampai hilang saat restart/deploy
+            vote_buffer.drain()
+    # Matikan proses worker bcrypt dengan rapi
+    hashing.shutdown()
 
-app = FastAPI(title="UICODE API")
+app = FastAPI(title="UICODE API", lifespan=lifespan)
 
 # --- KONFIGURASI CORS (AGAR FRONTEND BISA AKSES) ---
 origins = [
@@ -26,245 +58,562 @@ app.add_middleware(
     allow_credentials=True,       # Izinkan kirim cookie/token
     allow_methods=["*"],          # Izinkan semua method (GET, POST, DELETE, dll)
     allow_headers=["*"],          # Izinkan semua header
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "X-Export-Started-At"],  # Supaya frontend bisa baca cursor & ETag
 )
 
+# Dipasang paling luar supaya latency yang tercatat mencakup semua middleware lain
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Response list komponen: lengkap (default) atau ringkas (?fields=summary)
+ComponentListResponse = List[Union[schemas.ComponentDisplay, schemas.ComponentSummary]]
+
+# Baris tuple dari crud langsung jadi dict JSON (lihat serialization.py), tanpa validasi ulang
+def component_rows(comps, fields: schemas.ComponentFields):
+    return serialization.component_rows(comps, summary=fields == schemas.ComponentFields.SUMMARY)
+
+# Cursor halaman berikutnya dikirim lewat header, body tetap list biasa
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+# Response list komponen untuk endpoint tanpa response cache (dikembalikan langsung, jadi
+# FastAPI tidak memvalidasi ulang tiap baris terhadap response_model)
+def component_list_response(comps, fields: schemas.ComponentFields, next_cursor: Optional[str]):
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return serialization.FastJSONResponse(component_rows(comps, fields), headers=headers)
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to UICODE API!"}
 
 # Endpoint untuk cek koneksi database
 @app.get("/test-db")
-def test_db_connection(db: Session = Depends(get_db)):
+async def test_db_connection(db: Session = Depends(get_session)):
     try:
         # Coba jalankan query simpel "SELECT 1"
-        db.execute(text("SELECT 1"))
+        await run_db(db, lambda session: session.execute(text("SELECT 1")))
         return {"status": "Database Connected! 🟢"}
     except Exception as e:
         return {"status": "Connection Failed 🔴", "error": str(e)}
-    
+
+# Metrik format Prometheus (latency, query per request, waktu DB & pool per route)
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics(request: Request):
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if metrics.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {metrics.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/token")
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
     # Cari user berdasarkan EMAIL (karena kita sepakat login pakai email)
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+    user = await run_db(db, crud.get_user_by_email, form_data.username)
     
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+    # bcrypt itu berat (CPU), dijalankan di process pool (lihat hashing.py)
+    if not user or not await hashing.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password", 
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Simpan EMAIL ke dalam token sebagai identitas (sub)
+    # Simpan EMAIL (sub) + id, role & versi token, supaya request berikutnya tidak perlu query user
     access_token_expires = auth.timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.email},
+        data=auth.token_claims(user),
         expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+# Logout: semua token milik user ini dicabut (berlaku di semua device)
+@app.post("/logout")
+async def logout(db: Session = Depends(get_session), current_user: models.User = Depends(auth.get_current_user)):
+    await run_db(db, crud.logout_user, current_user.id)
+    return {"message": "Logged out"}
+
 # --- ENDPOINT USER ---
 
-@app.post("/users/", response_model=schemas.UserDisplay)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+# --- ADMISSION CONTROL (rate limit per user / IP + load shedding), lihat admission.py ---
+limit_create_user = Depends(admission.limit("create_user"))
+limit_create_component = Depends(admission.limit("create_component"))
+limit_rate_component = Depends(admission.limit("rate_component"))
+limit_export_components = Depends(admission.limit("export_components"))
+
+@app.post("/users/", response_model=schemas.UserDisplay, dependencies=[limit_create_user])
+async def create_user(user: schemas.UserCreate, db: Session = Depends(get_session)):
+    db_user = await run_db(db, crud.get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await hashing.hash_password(user.password)
+    return await run_db(db, crud.create_user, user=user, hashed_password=hashed_password)
 
 @app.get("/users/me", response_model=schemas.UserDisplay)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+async def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
     return current_user
 
 # --- ENDPOINT COMPONENT ---
 
-@app.get("/components/", response_model=List[schemas.ComponentDisplay])
-def read_components(
-    skip: int = 0, 
-    limit: int = 100, 
+@app.get("/components/", response_model=ComponentListResponse)
+async def read_components(
+    request: Request,
+    cursor: Optional[str] = None, 
+    limit: int = DEFAULT_PAGE_SIZE, 
     search: Optional[str] = None, 
     category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    fields: schemas.ComponentFields = schemas.ComponentFields.FULL,
+    db: Session = Depends(get_read_session)
 ):
-    # 1. Ambil data mentah dari database
-    comps = crud.get_public_components(
-        db, 
-        skip=skip, 
-        limit=limit, 
-        search=search, 
-        category=category
-    )
-    
-    # 2. Loop setiap komponen untuk menyuntikkan data rating
-    results = []
-    for c in comps:
-        # Hitung rating pakai fungsi yang sudah kita buat di crud
-        avg, count = crud.get_average_rating(db, c.id)
-        
-        # Ubah object database ke format Dictionary
-        c_dict = schemas.ComponentDisplay.from_orm(c).dict()
-        
-        # Masukkan data rating manual ke dictionary
-        c_dict['rating'] = avg
-        c_dict['review_count'] = count
-        
-        results.append(c_dict)
+    # Normalisasi parameter supaya request yang artinya sama memakai entry cache yang sama
+    search = " ".join(search.lower().split()) if search else None
+    category = category if category and category != "All" else None
+    limit = clamp_limit(limit)
+
+    async def build():
+        # 1. Ambil data mentah dari database (keyset pagination, bukan OFFSET)
+        comps, next_cursor = await run_db(
+            db, 
+            crud.get_public_components, 
+            cursor=cursor, 
+            limit=limit, 
+            search=search, 
+            category=category,
+            summary=fields == schemas.ComponentFields.SUMMARY
+        )
+        # 2. Rating sudah ada di kolom agregat (rating_sum / rating_count),
+        # jadi tidak ada query tambahan per komponen lagi
+        body = serialization.dumps(component_rows(comps, fields))
+        # Halaman cukup di-invalidasi kalau isinya berubah. (Kalau komponen sesudah halaman ini
+        # dihapus, next_cursor lama paling jauh menunjuk ke halaman kosong — tidak masalah.)
+        tags = [LIST_TAG] + [component_tag(c.id) for c in comps]
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return body, tags, headers
+
+    key = ("components", fields.value, cursor, limit, search, category)
+    return await cached_json_response(request, key, build)
+
+# --- LEADERBOARD: TOP RATED & TRENDING ---
+# Didaftarkan sebelum /components/{id}. Skor sudah tersimpan di kolom ber-index (lihat rankings.py).
+async def ranked_components(request, ranking, cursor, limit, category, fields, db):
+    category = category if category and category != "All" else None
+    limit = clamp_limit(limit)
+
+    async def build():
+        comps, next_cursor = await run_db(
+            db,
+            crud.get_ranked_components,
+            ranking,
+            cursor=cursor,
+            limit=limit,
+            category=category,
+            summary=fields == schemas.ComponentFields.SUMMARY
+        )
+        body = serialization.dumps(component_rows(comps, fields))
+        # Vote ke komponen di halaman ini langsung meng-invalidasi; komponen lain yang naik
+        # peringkat baru terlihat setelah TTL cache habis (cukup untuk leaderboard)
+        tags = [LIST_TAG] + [component_tag(c.id) for c in comps]
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return body, tags, headers
+
+    key = ("ranking", ranking, fields.value, cursor, limit, category)
+    return await cached_json_response(request, key, build)
+
+@app.get("/components/top-rated", response_model=ComponentListResponse)
+async def read_top_rated_components(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    category: Optional[str] = None,
+    fields: schemas.ComponentFields = schemas.ComponentFields.FULL,
+    db: Session = Depends(get_read_session)
+):
+    return await ranked_components(request, "top", cursor, limit, category, fields, db)
+
+@app.get("/components/trending", response_model=ComponentListResponse)
+async def read_trending_components(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    category: Optional[str] = None,
+    fields: schemas.ComponentFields = schemas.ComponentFields.FULL,
+    db: Session = Depends(get_read_session)
+):
+    return await ranked_components(request, "trending", cursor, limit, category, fields, db)
+
+# --- FACET KATEGORI (SIDEBAR FILTER) ---
+# Jumlah per kategori dibaca dari counter (tabel category_counts), bukan menghitung seluruh katalog.
+# Didaftarkan sebelum /components/{id}.
+@app.get("/components/facets", response_model=schemas.ComponentFacets)
+async def read_component_facets(
+    request: Request,
+    search: Optional[str] = None,
+    db: Session = Depends(get_read_session)
+):
+    search = " ".join(search.lower().split()) if search else None
+
+    async def build():
+        counts = await run_db(db, crud.get_category_counts)
+        facets = {
+            "total": sum(count for _, count in counts),
+            "categories": [{"category": category, "count": count} for category, count in counts],
+        }
+        if search:
+            matching = await run_db(db, crud.get_search_category_counts, search)
+            facets["search"] = search
+            facets["matching_total"] = sum(count for _, count in matching)
+            facets["matching"] = [{"category": category, "count": count} for category, count in matching]
+        body = schemas.ComponentFacets(**facets).model_dump_json().encode()
+        # Hasil search ikut berubah kalau ada komponen yang baru ACCEPTED (LIST_TAG)
+        return body, [FACETS_TAG, LIST_TAG], {}
+
+    return await cached_json_response(request, ("facets", search), build)
+
+# --- AMBIL BANYAK KOMPONEN SEKALIGUS (halaman favorites / koleksi) ---
+# ?ids=3,1,7 -> 1 query untuk semua kartu, bukan 1 request GET /components/{id} per kartu
+BATCH_MAX_IDS = 300
+
+@app.get("/components/batch", response_model=schemas.ComponentBatch)
+async def read_components_batch(
+    request: Request,
+    ids: str,
+    fields: schemas.ComponentFields = schemas.ComponentFields.FULL,
+    db: Session = Depends(get_read_session)
+):
+    try:
+        component_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if not component_ids:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(component_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+
+    async def build():
+        comps, missing = await run_db(
+            db, crud.get_components_by_ids, component_ids, summary=fields == schemas.ComponentFields.SUMMARY
+        )
+        body = serialization.dumps({"items": component_rows(comps, fields), "missing": missing})
+        # Tag per ID (termasuk yang belum ada), jadi perubahan salah satu kartu ikut membuang cache ini
+        return body, [component_tag(cid) for cid in component_ids], {}
+
+    return await cached_json_response(request, ("batch", tuple(component_ids), fields.value), build)
 
-    return results
+# --- EXPORT KATALOG (NDJSON STREAMING) ---
+# Harus didaftarkan sebelum /components/{id}, kalau tidak "export" dianggap sebagai id
+@app.get("/components/export", dependencies=[limit_export_components])
+async def export_components(request: Request, updated_since: Optional[datetime] = None):
+    # Catat waktu mulai: dipakai client sebagai updated_since untuk sinkronisasi berikutnya
+    started_at = datetime.utcnow().isoformat()
 
-@app.post("/components/", response_model=schemas.ComponentDisplay)
-def create_component(
+    if database.ASYNC_DB:
+        chunks = export.iter_export_async(database.read_sessionmaker(use_async=True), updated_since)
+    else:
+        chunks = export.iter_export_sync(database.read_sessionmaker(use_async=False), updated_since)
+
+    # Isi response bergantung pada Accept-Encoding: cache di tengah jalan harus membedakannya
+    headers = {"X-Export-Started-At": started_at, "Vary": "Accept-Encoding"}
+    if export.accepts_gzip(request.headers.get("accept-encoding")):
+        chunks = export.gzip_async(chunks) if database.ASYNC_DB else export.gzip_sync(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+@app.post("/components/", response_model=schemas.ComponentDisplay, dependencies=[limit_create_component])
+async def create_component(
     component: schemas.ComponentCreate, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.create_component(db=db, component=component, user_id=current_user.id)
+    return await run_db(db, crud.create_component, component=component, user_id=current_user.id)
 
 # --- 1. USER: LIHAT HISTORY SENDIRI (My Profile) ---
-@app.get("/users/me/components", response_model=List[schemas.ComponentDisplay])
-def read_own_components(
-    db: Session = Depends(get_db),
+@app.get("/users/me/components", response_model=ComponentListResponse)
+async def read_own_components(
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: schemas.ComponentFields = schemas.ComponentFields.FULL,
+    db: Session = Depends(get_read_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return crud.get_components_by_user(db, user_id=current_user.id)
+    comps, next_cursor = await run_db(
+        db,
+        crud.get_components_by_user,
+        user_id=current_user.id,
+        cursor=cursor,
+        limit=limit,
+        summary=fields == schemas.ComponentFields.SUMMARY
+    )
+    return component_list_response(comps, fields, next_cursor)
 
 # --- 2. ADMIN: LIHAT ANTRIAN REVIEW (Dashboard) ---
-@app.get("/admin/pending", response_model=List[schemas.ComponentDisplay])
-def read_pending_components(
-    db: Session = Depends(get_db),
+@app.get("/admin/pending", response_model=ComponentListResponse)
+async def read_pending_components(
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: schemas.ComponentFields = schemas.ComponentFields.FULL,
+    db: Session = Depends(get_read_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     if current_user.role != Role.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized. Admin only.")
         
-    return crud.get_pending_components(db)
+    comps, next_cursor = await run_db(
+        db,
+        crud.get_pending_components,
+        cursor=cursor,
+        limit=limit,
+        summary=fields == schemas.ComponentFields.SUMMARY
+    )
+    return component_list_response(comps, fields, next_cursor)
+
+# --- ADMIN: ANTRIAN REVIEW (CLAIM BATCH DENGAN LEASE) ---
+# Tiap admin claim batch sendiri, jadi beberapa admin bisa moderasi bersamaan tanpa rebutan.
+# Baca & tulis di primary (bukan replica) karena claim adalah write.
+@app.post("/admin/review/claim", response_model=schemas.ReviewClaim)
+async def claim_review_batch(
+    limit: Optional[int] = None,
+    db: Session = Depends(get_session),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized. Admin only.")
+
+    comps, lease_until = await run_db(
+        db, review_queue.claim, current_user.id, review_queue.clamp_claim_size(limit)
+    )
+    return {"lease_until": lease_until, "items": comps}
+
+@app.post("/admin/review/release")
+async def release_review_batch(
+    payload: Optional[schemas.ReviewRelease] = None,
+    db: Session = Depends(get_session),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized. Admin only.")
+
+    ids = payload.ids if payload else None
+    released = await run_db(db, review_queue.release, current_user.id, ids or None)
+    return {"released": released}
 
 # --- 3. ADMIN: UPDATE STATUS (Accept/Reject) ---
 @app.patch("/admin/components/{component_id}/status")
-def update_status(
+async def update_status(
     component_id: int,
     status: Status, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     if current_user.role != Role.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    updated_comp = crud.update_component_status(db, component_id, status)
+    try:
+        updated_comp = await run_db(db, crud.update_component_status, component_id, status, current_user.id)
+    except review_queue.LeaseConflict as exc:
+        raise HTTPException(status_code=409, detail=f"Component is being reviewed by another admin until {exc.expires_at.isoformat()}")
     if not updated_comp:
         raise HTTPException(status_code=404, detail="Component not found")
         
     return {"message": "Status updated successfully", "status": updated_comp.status}
 
+# --- ADMIN: KOMPONEN LAMA YANG MIRIP DENGAN SUBMISSION INI ---
+@app.get("/admin/components/{component_id}/similar", response_model=List[schemas.SimilarComponent])
+async def read_similar_components(
+    component_id: int,
+    db: Session = Depends(get_read_session),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await run_db(db, crud.get_similar_components, component_id)
+
 # --- 4. ADMIN: DELETE COMPONENT ---
 @app.delete("/admin/components/{component_id}")
-def delete_component(
+async def delete_component(
     component_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     if current_user.role != Role.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
         
-    deleted = crud.delete_component(db, component_id)
+    deleted = await run_db(db, crud.delete_component, component_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Component not found")
         
     return {"message": "Component deleted successfully"}
 
+# --- 5. ADMIN: MODERASI MASSAL (Accept / Reject / Delete banyak komponen) ---
+@app.post("/admin/components/bulk", response_model=schemas.ComponentBulkResult)
+async def bulk_moderate_components(
+    payload: schemas.ComponentBulkRequest,
+    db: Session = Depends(get_session),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    if payload.action == schemas.BulkAction.DELETE:
+        results = await run_db(db, crud.bulk_delete_components, payload.ids)
+    else:
+        new_status = Status.ACCEPTED if payload.action == schemas.BulkAction.ACCEPT else Status.REJECTED
+        results = await run_db(db, crud.bulk_update_component_status, payload.ids, new_status, current_user.id)
+
+    return {
+        "action": payload.action,
+        "processed": sum(1 for result in results.values() if result == "ok"),
+        "results": [{"id": cid, "result": result} for cid, result in results.items()],
+    }
+
 # --- ENDPOINT COMPONENT DETAIL (BARU) ---
 @app.get("/components/{id}", response_model=schemas.ComponentDisplay)
-def read_component(id: int, db: Session = Depends(get_db)):
-    # 1. Ambil data komponen dari database
-    comp = crud.get_component(db, component_id=id)
-    if not comp:
-        raise HTTPException(status_code=404, detail="Component not found")
-    
-    # 2. HITUNG RATING RATA-RATA (Ini yang sebelumnya kurang)
-    avg, count = crud.get_average_rating(db, id)
-    
-    # 3. Ubah objek database ke Dictionary agar bisa kita edit isinya
-    # Menggunakan from_orm karena kita pakai Pydantic
-    comp_dict = schemas.ComponentDisplay.from_orm(comp).dict()
-    
-    # 4. Masukkan hasil hitungan rating ke dalam data yang mau dikirim
-    comp_dict['rating'] = avg
-    comp_dict['review_count'] = count
-    
-    return comp_dict
+async def read_component(id: int, request: Request, db: Session = Depends(get_read_session)):
+    async def build():
+        # 1. Ambil data komponen dari database
+        comp = await run_db(db, crud.get_component, component_id=id)
+        if not comp:
+            raise HTTPException(status_code=404, detail="Component not found")
+
+        # 2. Rating & review_count dibaca langsung dari kolom agregat komponen
+        body = schemas.ComponentDisplay.model_validate(comp).model_dump_json().encode()
+        return body, [component_tag(id)], {}
+
+    return await cached_json_response(request, ("component", id), build)
+
+# --- KODE LENGKAP SATU KOMPONEN (dipakai bersama list ?fields=summary) ---
+# ETag diambil dari hash blob kode: klien yang sudah punya kodenya dapat 304 tanpa blob dibaca
+@app.get("/components/{id}/code", response_model=schemas.ComponentCode)
+async def read_component_code(id: int, request: Request, db: Session = Depends(get_read_session)):
+    async def build():
+        code = await run_db(db, crud.get_component_code, id)
+        if not code:
+            raise HTTPException(status_code=404, detail="Component not found")
+        body = schemas.ComponentCode.model_validate(code).model_dump_json().encode()
+        return body, [component_tag(id)], {"ETag": code["etag"]} if code["etag"] else {}
+
+    async def etag():
+        return await run_db(db, crud.get_component_code_etag, id)
+
+    return await cached_json_response(request, ("component_code", id), build, etag)
 
 # --- ADMIN: LIHAT SEMUA USER ---
 @app.get("/admin/users", response_model=List[schemas.UserDisplay])
-def get_all_users(
-    db: Session = Depends(get_db),
+async def get_all_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_read_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     if current_user.role != Role.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return crud.get_all_users(db)
+    users, next_cursor = await run_db(db, crud.get_all_users, cursor=cursor, limit=limit)
+    set_next_cursor(response, next_cursor)
+    return users
+
+# --- ADMIN: UBAH ROLE USER ---
+@app.patch("/admin/users/{user_id}/role", response_model=schemas.UserDisplay)
+async def update_user_role(
+    user_id: int,
+    role: Role,
+    db: Session = Depends(get_session),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    user = await run_db(db, crud.update_user_role, user_id, role)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+# --- ADMIN: STATISTIK (CACHE & POOL BCRYPT) ---
+@app.get("/admin/stats")
+async def read_stats(current_user: models.User = Depends(auth.get_current_user)):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {
+        "user_cache": user_cache.stats(),
+        "password_pool": hashing.stats(),
+        "response_cache": response_cache.stats(),
+        "slow_queries": metrics.slow_query_stats(),
+        "database": database.pool_status(),
+        "token_revocations": revocations.stats(),
+        "admission": admission.stats(),
+        "vote_buffer": vote_buffer.stats(),
+    }
 
 # --- ADMIN: HAPUS USER ---
 @app.delete("/admin/users/{user_id}")
-def delete_user_account(
+async def delete_user_account(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     if current_user.role != Role.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    success = crud.delete_user(db, user_id)
+    success = await run_db(db, crud.delete_user, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"}
 
 # --- ADMIN: LIHAT KARYA USER TERTENTU ---
-@app.get("/admin/users/{user_id}/components", response_model=List[schemas.ComponentDisplay])
-def get_specific_user_components(
+@app.get("/admin/users/{user_id}/components", response_model=ComponentListResponse)
+async def get_specific_user_components(
     user_id: int,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: schemas.ComponentFields = schemas.ComponentFields.FULL,
+    db: Session = Depends(get_read_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     if current_user.role != Role.ADMIN:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return crud.get_components_by_user_id(db, user_id)
+    comps, next_cursor = await run_db(
+        db,
+        crud.get_components_by_user_id,
+        user_id,
+        cursor=cursor,
+        limit=limit,
+        summary=fields == schemas.ComponentFields.SUMMARY
+    )
+    return component_list_response(comps, fields, next_cursor)
 
 # --- ENDPOINT RATING ---
-@app.post("/components/{id}/rate")
-def rate_component(
+@app.post("/components/{id}/rate", dependencies=[limit_rate_component])
+async def rate_component(
     id: int,
     rating: schemas.RatingCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    crud.vote_component(db, user_id=current_user.id, component_id=id, score=rating.score)
-    return {"message": "Rating submitted"}
+    if vote_buffer.enabled():
+        # Write-behind: cukup cek komponennya ada, vote ditulis batch oleh flusher
+        if not await run_db(db, crud.get_existing_component_ids, [id]):
+            raise HTTPException(status_code=404, detail="Component not found")
+        vote_buffer.submit(current_user.id, [(id, rating.score)])
+        return {"message": "Rating submitted"}
 
-# UPDATE ENDPOINT GET SINGLE COMPONENT (Agar return rating asli)
-@app.get("/components/{id}")
-def read_component(id: int, db: Session = Depends(get_db)):
-    comp = crud.get_component(db, component_id=id)
-    if not comp:
+    ok = await run_db(db, crud.vote_component, user_id=current_user.id, component_id=id, score=rating.score)
+    if not ok:
         raise HTTPException(status_code=404, detail="Component not found")
-    
-    # Hitung rating rata-rata saat diambil
-    avg, count = crud.get_average_rating(db, id)
-    
-    # Kita inject data rating ke response JSON manual
-    response_data = schemas.ComponentDisplay.from_orm(comp)
-    # Karena schema ComponentDisplay kita belum ada field rating, 
-    # Frontend nanti akan kita akali supaya fetch terpisah atau kita update schema.
-    # Cara paling gampang: return dict saja
-    
-    result = {
-        "id": comp.id,
-        "category": comp.category,
-        "html_code": comp.html_code,
-        "css_code": comp.css_code,
-        "owner": comp.owner,
-        "created_at": comp.created_at,
-        "status": comp.status,
-        "rating": avg,      # <--- Rating Asli
-        "review_count": count # <--- Jumlah Review Asli
-    }
-    return result
\ No newline at end of file
+    return {"message": "Rating submitted"}
+
+# --- ENDPOINT RATING BANYAK KOMPONEN SEKALIGUS ---
+@app.post("/ratings/batch", response_model=schemas.RatingBatchResult, dependencies=[limit_rate_component])
+async def rate_components_batch(
+    payload: schemas.RatingBatchCreate,
+    db: Session = Depends(get_session),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    votes = [vote.model_dump() for vote in payload.votes]
+    if vote_buffer.enabled():
+        scores = {vote["component_id"]: vote["score"] for vote in votes}
+        found = await run_db(db, crud.get_existing_component_ids, scores)
+        vote_buffer.submit(current_user.id, [(cid, score) for cid, score in scores.items() if cid in found])
+        results = {cid: "ok" if cid in found else "not_found" for cid in scores}
+    else:
+        results = await run_db(db, crud.vote_components, current_user.id, votes)
+    return {"results": [{"id": cid, "result": result} for cid, result in results.items()]}
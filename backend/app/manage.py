@@ -0,0 +1,295 @@
+# Perintah maintenance untuk backend UICODE
+# Cara pakai (dari folder backend):
+#   python -m app.manage migrate
+#   python -m app.manage schema-version
+#   python -m app.manage rebuild-ratings
+#   python -m app.manage reindex-search
+#   python -m app.manage dedupe-ratings
+#   python -m app.manage backfill-summaries
+#   python -m app.manage rebuild-rankings
+#   python -m app.manage rebuild-facets
+#   python -m app.manage rebuild-similarity
+#   python -m app.manage migrate-code-blobs
+#   python -m app.manage prune-revocations
+import argparse
+
+from sqlalchemy import bindparam, func, select, update
+
+from . import auth, blobs, crud, migrations, models, rankings, revocations, search, similarity, triggers
+from .database import SessionLocal, get_engine
+
+
+# --- MIGRASI SKEMA (lihat migrations.py) ---
+# Dijalankan sekali per deploy, sebelum worker baru dinyalakan. Setelah DDL, backfill data untuk
+# migrasi yang baru dijalankan ikut dijalankan (mis. rebuild-ratings setelah kolom agregat dibuat).
+def migrate(args):
+    applied = migrations.migrate(get_engine(), target=args.target or migrations.SCHEMA_VERSION)
+    if applied:
+        print(f"Migrasi dijalankan: versi {', '.join(map(str, applied))}")
+    version = migrations.status(get_engine())["database_version"]
+    print(f"Skema database sekarang versi {version}")
+
+    names = migrations.backfills(applied)
+    if not names:
+        return
+    if args.skip_backfill or version < migrations.SCHEMA_VERSION:
+        # Backfill memakai models.py, jadi butuh skema versi terbaru
+        print(f"Backfill belum dijalankan: {', '.join(names)}")
+        return
+    for name in names:
+        print(f"Backfill: {name}")
+        BACKFILLS[name](args)
+
+
+def schema_version(args):
+    status = migrations.status(get_engine())
+    print(f"Database: versi {status['database_version']}, kode: versi {status['code_version']}")
+    if status["pending"]:
+        print(f"Belum dijalankan: versi {', '.join(map(str, status['pending']))} (python -m app.manage migrate)")
+
+
+# --- HITUNG ULANG AGREGAT RATING (rating_sum / rating_count) ---
+# Dipakai sekali setelah kolom agregat ditambahkan, atau kalau datanya dicurigai tidak sinkron
+def rebuild_ratings(args):
+    db = SessionLocal()
+    try:
+        updated = crud.refresh_rating_aggregates(db)
+        db.commit()
+        print(f"Agregat rating diperbarui untuk {updated} komponen")
+    finally:
+        db.close()
+
+
+# --- BANGUN ULANG INDEX PENCARIAN ---
+# Jalankan sekali setelah deploy search.py pertama kali (isi index dari komponen ACCEPTED)
+def reindex_search(args):
+    with get_engine().begin() as conn:
+        search.ensure_search_index(conn)
+    db = SessionLocal()
+    try:
+        count = search.rebuild_index(db)
+        db.commit()
+        print(f"{count} komponen dimasukkan ke index pencarian")
+    finally:
+        db.close()
+
+
+# --- PASANG ULANG CONSTRAINT & TRIGGER RATING ---
+# Rating duplikat dari versi lama sudah dibersihkan oleh migrasi versi 5 (lihat migrations.py);
+# perintah ini memasang ulang index & trigger (mis. setelah restore) lalu menghitung ulang agregat.
+def dedupe_ratings(args):
+    with get_engine().begin() as conn:
+        removed = migrations.v5_unique_ratings(conn)
+        triggers.ensure_rating_triggers(conn)
+    print(f"{removed} rating duplikat dihapus")
+
+    rebuild_ratings(args)
+
+
+# --- ISI html_size / css_size / preview UNTUK KOMPONEN LAMA ---
+# updated_at tidak diubah: isi komponen tetap sama (tidak ikut export incremental, dan
+# rebuild-rankings memakai updated_at sebagai perkiraan waktu vote)
+def backfill_summaries(args):
+    table = models.Component.__table__
+    fill = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            html_size=bindparam("b_html_size"),
+            css_size=bindparam("b_css_size"),
+            preview=bindparam("b_preview"),
+            updated_at=table.c.updated_at,
+        )
+    )
+    db = SessionLocal()
+    try:
+        count = 0
+        rows = select(models.Component).execution_options(yield_per=500)
+        for batch in db.execute(rows).scalars().partitions():
+            params = []
+            for component in batch:
+                summary = models.code_summary(component.html_code, component.css_code)
+                params.append({"b_id": component.id, **{f"b_{name}": value for name, value in summary.items()}})
+            db.execute(fill, params)
+            count += len(batch)
+        db.commit()
+        print(f"Ringkasan kode diisi untuk {count} komponen")
+    finally:
+        db.close()
+
+
+# --- HITUNG ULANG SKOR LEADERBOARD ---
+# bayes_score dihitung ulang dari agregat (mis. setelah RANKING_PRIOR_* diubah; trigger rating
+# ikut dipasang ulang supaya vote berikutnya memakai prior yang baru).
+# trend_score untuk komponen lama yang belum punya skor: rating tidak menyimpan waktu vote,
+# jadi semua vote-nya dianggap terjadi pada updated_at komponen (perkiraan).
+def rebuild_rankings(args):
+    with get_engine().begin() as conn:
+        triggers.ensure_rating_triggers(conn)
+    db = SessionLocal()
+    try:
+        updated = crud.refresh_rating_aggregates(db)
+        rows = db.query(models.Component.id, models.Component.rating_count, models.Component.updated_at).filter(
+            models.Component.trend_score == 0, models.Component.rating_count > 0
+        ).all()
+        for component_id, count, updated_at in rows:
+            rankings.add_trend_votes(db, {component_id: count}, now=updated_at)
+        db.commit()
+        print(f"bayes_score diperbarui untuk {updated} komponen, trend_score diisi untuk {len(rows)} komponen")
+    finally:
+        db.close()
+
+
+# --- HITUNG ULANG COUNTER KATEGORI (/components/facets) ---
+# Sekali setelah tabel category_counts dibuat, atau kalau angkanya dicurigai tidak sinkron
+def rebuild_facets(args):
+    db = SessionLocal()
+    try:
+        count = crud.rebuild_category_counts(db)
+        db.commit()
+        print(f"Counter diisi ulang untuk {count} kategori")
+    finally:
+        db.close()
+
+
+# --- BANGUN ULANG INDEX NEAR-DUPLICATE (MinHash + LSH) ---
+# Sekali setelah tabel similarity dibuat, atau setelah parameter di similarity.py diubah.
+# Komponen IN_REVIEW ikut dicocokkan ulang dengan komponen yang lebih lama.
+def rebuild_similarity(args):
+    db = SessionLocal()
+    try:
+        count = similarity.rebuild_index(db)
+        db.commit()
+        print(f"{count} komponen dimasukkan ke index near-duplicate")
+    finally:
+        db.close()
+
+
+# --- PINDAHKAN KODE KOMPONEN LAMA KE code_blobs ---
+# Komponen yang masih menyimpan kode di kolom html_code/css_code dipindah per batch: kode masuk
+# code_blobs (dedup + kompresi), komponen menyimpan hash-nya, kolom lama dikosongkan (NULL).
+# Commit per batch, jadi aman dihentikan & dijalankan ulang (yang sudah pindah tidak diproses lagi).
+def migrate_code_blobs(args):
+    component = models.Component
+    table = component.__table__
+    move = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            html_hash=bindparam("b_html_hash"),
+            css_hash=bindparam("b_css_hash"),
+            html_code=None,
+            css_code=None,
+            # Isi komponen tidak berubah: jangan sampai ikut export incremental (?updated_since=)
+            updated_at=table.c.updated_at,
+        )
+    )
+    db = SessionLocal()
+    try:
+        moved = 0
+        while True:
+            rows = db.query(component.id, component.legacy_html_code, component.legacy_css_code).filter(
+                (component.html_hash.is_(None)) | (component.css_hash.is_(None))
+            ).order_by(component.id).limit(args.batch_size).all()
+            if not rows:
+                break
+            html_hashes = blobs.put_many(db, [row.legacy_html_code for row in rows])
+            css_hashes = blobs.put_many(db, [row.legacy_css_code for row in rows])
+            db.execute(move, [
+                {"b_id": row.id, "b_html_hash": html_hash, "b_css_hash": css_hash}
+                for row, html_hash, css_hash in zip(rows, html_hashes, css_hashes)
+            ])
+            db.commit()
+            moved += len(rows)
+            print(f"{moved} komponen dipindahkan...")
+
+        blob = models.CodeBlob
+        count, size, stored = db.query(
+            func.count(blob.hash), func.coalesce(func.sum(blob.size * blob.refcount), 0),
+            func.coalesce(func.sum(blob.stored_size), 0),
+        ).one()
+        print(f"Selesai: {moved} komponen dipindahkan, {count} blob unik")
+        print(f"Ukuran kode: {size} byte -> {stored} byte tersimpan")
+        if moved:
+            print("Jalankan VACUUM (SQLite) / VACUUM FULL components (PostgreSQL) untuk mengembalikan ruang disk")
+    finally:
+        db.close()
+
+
+# --- BERSIHKAN CATATAN REVOKASI TOKEN YANG SUDAH EXPIRED (lihat revocations.py) ---
+# Worker hanya membaca token_revocations; penghapusan dijalankan di sini, cukup dari satu
+# tempat secara berkala (mis. cron tiap beberapa menit)
+def prune_revocations(args):
+    db = SessionLocal()
+    try:
+        removed = revocations.prune(db, auth.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        print(f"{removed} catatan revokasi token dihapus")
+    finally:
+        db.close()
+
+
+# Perintah yang dijalankan otomatis oleh "migrate" (lihat migrations.MIGRATIONS)
+BACKFILLS = {
+    "rebuild-ratings": rebuild_ratings,
+    "reindex-search": reindex_search,
+    "backfill-summaries": backfill_summaries,
+    "rebuild-rankings": rebuild_rankings,
+    "rebuild-facets": rebuild_facets,
+    "rebuild-similarity": rebuild_similarity,
+    "migrate-code-blobs": migrate_code_blobs,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="UICODE maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="Jalankan migrasi skema yang belum terpasang")
+    p.add_argument("--target", type=int, help="Berhenti di versi ini (default: versi terbaru)")
+    p.add_argument("--skip-backfill", action="store_true", help="Hanya DDL, backfill data dijalankan terpisah")
+    p.add_argument("--batch-size", type=int, default=500, help="Ukuran batch migrate-code-blobs")
+    p.set_defaults(func=migrate, schema_check=False)
+
+    p = sub.add_parser("schema-version", help="Tampilkan versi skema database & migrasi yang belum jalan")
+    p.set_defaults(func=schema_version, schema_check=False)
+
+    p = sub.add_parser("rebuild-ratings", help="Hitung ulang rating_sum/rating_count dari tabel ratings")
+    p.set_defaults(func=rebuild_ratings)
+
+    p = sub.add_parser("reindex-search", help="Bangun ulang index full-text dari komponen ACCEPTED")
+    p.set_defaults(func=reindex_search)
+
+    p = sub.add_parser("dedupe-ratings", help="Hapus rating duplikat, pasang unique index & trigger agregat")
+    p.set_defaults(func=dedupe_ratings)
+
+    p = sub.add_parser("rebuild-rankings", help="Hitung ulang bayes_score & isi trend_score yang masih kosong")
+    p.set_defaults(func=rebuild_rankings)
+
+    p = sub.add_parser("rebuild-facets", help="Hitung ulang jumlah komponen ACCEPTED per kategori")
+    p.set_defaults(func=rebuild_facets)
+
+    p = sub.add_parser("rebuild-similarity", help="Bangun ulang index MinHash/LSH & daftar komponen mirip")
+    p.set_defaults(func=rebuild_similarity)
+
+    p = sub.add_parser("migrate-code-blobs", help="Pindahkan kode komponen lama ke code_blobs (dedup + kompresi)")
+    p.add_argument("--batch-size", type=int, default=500)
+    p.set_defaults(func=migrate_code_blobs)
+
+    p = sub.add_parser("backfill-summaries", help="Isi html_size, css_size & preview dari kode yang sudah ada")
+    p.set_defaults(func=backfill_summaries)
+
+    p = sub.add_parser("prune-revocations", help="Hapus catatan revokasi token yang lebih tua dari umur token")
+    p.set_defaults(func=prune_revocations)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "schema_check", True):
+        # Perintah data memakai semua kolom models.py: tolak jalan di atas skema lama
+        try:
+            migrations.require(get_engine())
+        except migrations.SchemaOutdated as exc:
+            parser.exit(1, f"{exc}\n")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
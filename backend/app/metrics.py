@@ -0,0 +1,358 @@
+# Instrumentasi request & SQL, diekspos dalam format teks Prometheus di /metrics
+# - Middleware ASGI: latency per route (pakai template path, mis. /components/{id}, bukan id-nya)
+# - Event engine SQLAlchemy: jumlah statement, waktu di DB, waktu tunggu koneksi dari pool
+# - Slow query log (opsional, SLOW_QUERY_MS > 0): statement dinormalisasi jadi "fingerprint"
+#   supaya query yang sama dengan parameter berbeda terkumpul jadi satu
+# Angka per request dikumpulkan lewat contextvar, jadi ikut terbawa ke threadpool (mode sync)
+# maupun greenlet run_sync (mode async).
+import contextvars
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Kalau diisi, /metrics wajib pakai header "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_TOP = 20
+SLOW_QUERY_MAX_FINGERPRINTS = 500
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+FLUSH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Request yang tidak cocok dengan route mana pun digabung jadi 1 label (supaya label tidak meledak)
+UNMATCHED_ROUTE = "<unmatched>"
+
+logger = logging.getLogger("uicode.slow_query")
+
+
+# --- 1. METRIK (COUNTER & HISTOGRAM) ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, doc, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [count per bucket..., +Inf], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            item = self._values.get(labels)
+            if item is None:
+                item = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = item[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            item[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(bound)
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter("uicode_http_requests_total", "Jumlah request HTTP", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram(
+    "uicode_http_request_duration_seconds", "Latency request HTTP", ("method", "route"), LATENCY_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "uicode_http_request_db_statements", "Jumlah statement SQL per request", ("method", "route"), STATEMENT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "uicode_http_request_db_seconds", "Total waktu di database per request", ("method", "route"), DB_TIME_BUCKETS
+)
+REQUEST_POOL_WAIT = Histogram(
+    "uicode_http_request_pool_wait_seconds", "Total waktu tunggu koneksi dari pool per request",
+    ("method", "route"), POOL_WAIT_BUCKETS
+)
+STATEMENTS = Counter("uicode_db_statements_total", "Jumlah statement SQL (termasuk di luar request)", ("engine",))
+STATEMENT_TIME = Histogram(
+    "uicode_db_statement_duration_seconds", "Durasi per statement SQL", ("engine",), DB_TIME_BUCKETS
+)
+POOL_WAIT = Histogram(
+    "uicode_db_pool_wait_seconds", "Waktu tunggu checkout koneksi dari pool", ("engine",), POOL_WAIT_BUCKETS
+)
+SLOW_QUERIES = Counter("uicode_db_slow_queries_total", "Jumlah statement yang melewati SLOW_QUERY_MS", ("engine",))
+ADMISSION_REJECTED = Counter(
+    "uicode_admission_rejected_total", "Request tulis yang ditolak admission control (429/503)", ("rule", "reason")
+)
+ADMISSION_STORE_ERRORS = Counter(
+    "uicode_admission_store_errors_total", "Error database bucket rate limit (jatuh ke bucket in-process)"
+)
+VOTE_FLUSH_SIZE = Histogram(
+    "uicode_vote_flush_size", "Jumlah vote per flush write-behind", (), FLUSH_SIZE_BUCKETS
+)
+VOTE_FLUSH_SECONDS = Histogram(
+    "uicode_vote_flush_duration_seconds", "Durasi 1 flush write-behind (upsert + commit)", (), DB_TIME_BUCKETS
+)
+VOTE_WRITE_DELAY = Histogram(
+    "uicode_vote_write_delay_seconds", "Jeda dari vote di-ack sampai ter-commit (write-behind)", (), LATENCY_BUCKETS
+)
+
+REGISTRY = [
+    REQUESTS, REQUEST_LATENCY, REQUEST_STATEMENTS, REQUEST_DB_TIME, REQUEST_POOL_WAIT,
+    STATEMENTS, STATEMENT_TIME, POOL_WAIT, SLOW_QUERIES, ADMISSION_REJECTED, ADMISSION_STORE_ERRORS,
+    VOTE_FLUSH_SIZE, VOTE_FLUSH_SECONDS, VOTE_WRITE_DELAY,
+]
+
+
+POOL_GAUGES = [
+    ("uicode_db_pool_size", "Ukuran pool koneksi", "size"),
+    ("uicode_db_pool_checked_out", "Koneksi yang sedang dipakai", "checkedout"),
+    ("uicode_db_pool_checked_in", "Koneksi idle di pool", "checkedin"),
+    ("uicode_db_pool_overflow", "Koneksi overflow di atas ukuran pool", "overflow"),
+]
+
+
+def _pool_gauges():
+    # Dibaca langsung dari pool saat /metrics diminta (hanya QueuePool yang punya angka ini)
+    lines = []
+    for name, doc, method in POOL_GAUGES:
+        lines += [f"# HELP {name} {doc}", f"# TYPE {name} gauge"]
+        for engine_name, engine in sorted(_engines.items()):
+            value = getattr(engine.pool, method, None)
+            if callable(value):
+                lines.append(f"{name}{_labels(('engine',), (engine_name,))} {value()}")
+    return lines
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_pool_gauges())
+    return "\n".join(lines) + "\n"
+
+
+# --- 2. DATA PER REQUEST ---
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds", "pool_wait_seconds", "scope")
+
+    def __init__(self, scope):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.scope = scope
+
+    @property
+    def route(self):
+        # Router Starlette menaruh route yang cocok di scope; sebelum routing belum ada
+        route = self.scope.get("route")
+        return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+_current = contextvars.ContextVar("uicode_request_stats", default=None)
+
+
+def current_stats():
+    return _current.get()
+
+
+# --- 3. SLOW QUERY LOG ---
+
+_NUMBER_RE = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST_RE = re.compile(r"\(\s*(\?|%\([^)]*\)s|:\w+|\$\d+)(\s*,\s*(\?|%\([^)]*\)s|:\w+|\$\d+))*\s*\)")
+_PARAM_RE = re.compile(r"%\([^)]*\)s|:\w+|\$\d+|\?")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    # Literal & parameter diganti "?", daftar IN (...) diciutkan, spasi dirapikan.
+    # IN dengan 3 id dan IN dengan 300 id jadi fingerprint yang sama.
+    sql = _STRING_RE.sub("?", statement)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    sql = _PARAM_RE.sub("?", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+_slow = {}  # fingerprint id -> ringkasan
+_slow_lock = threading.Lock()
+
+
+def _record_slow(engine_name, statement, seconds):
+    text = fingerprint(statement)
+    fid = hashlib.sha1(text.encode()).hexdigest()[:12]
+    stats = current_stats()
+    route = stats.route if stats is not None else "-"
+    ms = seconds * 1000
+    SLOW_QUERIES.inc(engine_name)
+    logger.warning("slow query %s %.1fms route=%s engine=%s: %s", fid, ms, route, engine_name, text)
+    with _slow_lock:
+        item = _slow.get(fid)
+        if item is None:
+            if len(_slow) >= SLOW_QUERY_MAX_FINGERPRINTS:
+                return
+            item = _slow[fid] = {"fingerprint": text, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_route": route}
+        item["count"] += 1
+        item["total_ms"] += ms
+        item["max_ms"] = max(item["max_ms"], ms)
+        item["last_route"] = route
+
+
+def slow_query_stats():
+    # Untuk /admin/stats: fingerprint paling lambat (total waktu terbanyak) di atas
+    with _slow_lock:
+        items = [{"id": fid, **item} for fid, item in _slow.items()]
+    items.sort(key=lambda item: item["total_ms"], reverse=True)
+    for item in items:
+        item["total_ms"] = round(item["total_ms"], 1)
+        item["max_ms"] = round(item["max_ms"], 1)
+    return {"threshold_ms": SLOW_QUERY_MS, "top": items[:SLOW_QUERY_TOP]}
+
+
+# --- 4. EVENT ENGINE SQLALCHEMY ---
+
+def _observe_pool_wait(engine_name, seconds):
+    POOL_WAIT.observe(seconds, engine_name)
+    stats = current_stats()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def _instrument_pool(pool, engine_name):
+    # SQLAlchemy tidak punya event "sebelum checkout", jadi pool.connect dibungkus langsung
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            _observe_pool_wait(engine_name, time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+_instrumented = weakref.WeakSet()
+_engines = {}  # nama -> engine, untuk gauge status pool
+
+
+def instrument_engine(engine, engine_name="primary"):
+    """Pasang hook metrik ke engine sync (untuk AsyncEngine: kirim engine.sync_engine)."""
+    if not METRICS_ENABLED or engine in _instrumented:
+        return
+    _instrumented.add(engine)
+    _engines[engine_name] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("uicode_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("uicode_query_start")
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        STATEMENTS.inc(engine_name)
+        STATEMENT_TIME.observe(seconds, engine_name)
+        stats = current_stats()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += seconds
+        if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+            _record_slow(engine_name, statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # Statement gagal: buang waktu mulainya supaya stack tidak bocor
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("uicode_query_start"):
+            conn.info["uicode_query_start"].pop()
+
+    _instrument_pool(engine.pool, engine_name)
+
+
+# --- 5. MIDDLEWARE ASGI ---
+
+class MetricsMiddleware:
+    # Middleware ASGI murni (bukan BaseHTTPMiddleware): tidak mengganggu StreamingResponse,
+    # dan latency yang dicatat = sampai body terakhir terkirim
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            method, route = scope["method"], stats.route
+            REQUESTS.inc(method, route, str(status_code))
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method, route)
+            REQUEST_STATEMENTS.observe(stats.statements, method, route)
+            REQUEST_DB_TIME.observe(stats.db_seconds, method, route)
+            REQUEST_POOL_WAIT.observe(stats.pool_wait_seconds, method, route)
@@ -0,0 +1,397 @@
+# Migrasi skema database (berversi)
+# Skema TIDAK lagi dibuat otomatis saat aplikasi start. Perubahan skema dijalankan sekali per
+# deploy lewat perintah terpisah, sebelum worker baru dinyalakan:
+#   python -m app.manage migrate
+# Versi yang sudah terpasang dicatat di tabel schema_version. Saat start, tiap worker hanya
+# menjalankan 1 query kecil untuk membandingkan versi database dengan SCHEMA_VERSION (check()).
+#
+# Versi 1 = skema awal aplikasi (users, components, ratings), versi berikutnya meng-ALTER tabel
+# yang sudah ada, jadi database lama (termasuk yang dibuat create_all versi awal) ikut terupdate.
+# Tiap langkah idempotent (kolom / index / tabel hanya dibuat kalau belum ada): database yang
+# skemanya sudah sebagian / seluruhnya terpasang (mis. dari database.sql) cukup "diadopsi".
+# Definisi tabel di sini sengaja dibekukan (bukan diambil dari models.py), supaya migrasi lama
+# tetap menghasilkan skema yang sama walau models.py berubah.
+#
+# Menambah perubahan skema: ubah models.py, lalu tambahkan fungsi migrasi baru di MIGRATIONS
+# (versi berikutnya) yang menjalankan DDL-nya, dan samakan database.sql. Jangan mengubah migrasi
+# yang sudah pernah dirilis. Selama rolling restart worker lama masih jalan di atas skema baru,
+# jadi perubahan sebaiknya kompatibel ke belakang (tambah kolom nullable / tabel baru dulu,
+# hapus kolom lama di rilis berikutnya).
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Float, ForeignKey, Integer, LargeBinary, MetaData, String, Table, Text,
+    func, inspect, insert, select, text,
+)
+from sqlalchemy.schema import CreateColumn
+
+from . import search, triggers
+from .rankings import PRIOR_MEAN
+
+logger = logging.getLogger("uicode.migrations")
+
+# strict: worker menolak start kalau skema database lebih lama dari kode
+# warn  : hanya log peringatan
+# off   : tidak cek sama sekali
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "strict").lower()
+# Khusus development/testing lokal: jalankan migrasi otomatis saat start.
+# Hanya DDL; backfill data (BACKFILLS) tetap lewat "python -m app.manage migrate".
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes")
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class SchemaOutdated(RuntimeError):
+    pass
+
+
+# --- 1. HELPER DDL (IDEMPOTENT) ---
+
+def _has_column(conn, table, name):
+    return any(column["name"] == name for column in inspect(conn).get_columns(table))
+
+
+def add_column(conn, table, column, references=None):
+    # ALTER TABLE ... ADD COLUMN, dilewati kalau kolomnya sudah ada.
+    # SQLite: kolom NOT NULL wajib punya server_default.
+    if _has_column(conn, table, column.name):
+        return
+    ddl = str(CreateColumn(column).compile(dialect=conn.dialect))
+    if references:
+        ddl += f" REFERENCES {references}"
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}"))
+
+
+def create_index(conn, name, table, columns, unique=False):
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+
+
+def create_table(conn, table):
+    table.create(conn, checkfirst=True)
+
+
+def drop_not_null(conn, table, name):
+    # Hanya Postgres (tabel dari database.sql); SQLite tidak bisa ALTER COLUMN, dan tabel SQLite
+    # dari create_all memang sudah nullable
+    if conn.dialect.name == "postgresql" and _has_column(conn, table, name):
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {name} DROP NOT NULL"))
+
+
+# --- 2. TABEL (DIBEKUKAN PER VERSI) ---
+
+_schema = MetaData()
+
+# Versi 1: skema awal aplikasi
+users_v1 = Table(
+    "users",
+    _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("username", String, nullable=True),
+    Column("hashed_password", String),
+    Column("role", String),
+)
+components_v1 = Table(
+    "components",
+    _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("category", String, index=True),
+    Column("html_code", Text),
+    Column("css_code", Text),
+    Column("status", String),
+    Column("created_at", DateTime),
+    Column("user_id", Integer, ForeignKey("users.id")),
+)
+ratings_v1 = Table(
+    "ratings",
+    _schema,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("score", Integer),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("component_id", Integer, ForeignKey("components.id")),
+)
+
+# Versi 9: counter kategori (/components/facets)
+category_counts_v9 = Table(
+    "category_counts",
+    _schema,
+    Column("category", String, primary_key=True),
+    Column("accepted_count", Integer, nullable=False, server_default="0"),
+)
+
+# Versi 11: index near-duplicate (similarity.py)
+component_signatures_v11 = Table(
+    "component_signatures",
+    _schema,
+    Column("component_id", Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True),
+    Column("signature", LargeBinary, nullable=False),
+)
+component_lsh_buckets_v11 = Table(
+    "component_lsh_buckets",
+    _schema,
+    Column("bucket", BigInteger, primary_key=True),
+    Column("component_id", Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True,
+           index=True),
+)
+component_similarities_v11 = Table(
+    "component_similarities",
+    _schema,
+    Column("component_id", Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True),
+    Column("similar_id", Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True,
+           index=True),
+    Column("score", Float, nullable=False),
+)
+
+# Versi 12: revokasi token (revocations.py)
+token_revocations_v12 = Table(
+    "token_revocations",
+    _schema,
+    Column("user_id", Integer, primary_key=True),
+    Column("min_version", Integer, nullable=False),
+    Column("revoked_at", DateTime, nullable=False, index=True),
+)
+
+# Versi 13: kode komponen content-addressed (blobs.py)
+code_blobs_v13 = Table(
+    "code_blobs",
+    _schema,
+    Column("hash", String(64), primary_key=True),
+    Column("size", Integer, nullable=False),
+    Column("stored_size", Integer, nullable=False),
+    Column("refcount", Integer, nullable=False, server_default="0"),
+    Column("data", LargeBinary, nullable=False),
+)
+
+# Versi 14: tombstone komponen yang dihapus (export incremental)
+component_deletions_v14 = Table(
+    "component_deletions",
+    _schema,
+    Column("component_id", Integer, primary_key=True),
+    Column("deleted_at", DateTime, nullable=False, index=True),
+)
+
+
+# --- 3. DAFTAR MIGRASI ---
+
+def v1_initial_schema(conn):
+    for table in (users_v1, components_v1, ratings_v1):
+        create_table(conn, table)
+    # Database dari database.sql versi lama: kolom title wajib diisi, padahal aplikasi tidak pernah
+    # mengisinya
+    drop_not_null(conn, "components", "title")
+
+
+def v2_rating_aggregates(conn):
+    add_column(conn, "components", Column("rating_sum", Integer, nullable=False, server_default="0"))
+    add_column(conn, "components", Column("rating_count", Integer, nullable=False, server_default="0"))
+
+
+def v3_search_index(conn):
+    search.ensure_search_index(conn)
+
+
+def v4_pagination_indexes(conn):
+    create_index(conn, "ix_components_status_created_id", "components", ["status", "created_at", "id"])
+    create_index(conn, "ix_components_user_created_id", "components", ["user_id", "created_at", "id"])
+
+
+def v5_unique_ratings(conn):
+    # Rating duplikat per (user, komponen) dari versi lama: simpan yang paling baru (id terbesar),
+    # baru unique index bisa dibuat
+    removed = conn.execute(text("""
+        DELETE FROM ratings WHERE id NOT IN (
+            SELECT MAX(id) FROM ratings GROUP BY user_id, component_id
+        )
+    """)).rowcount
+    if removed:
+        logger.info("%d rating duplikat dihapus", removed)
+    create_index(conn, "uq_ratings_user_component", "ratings", ["user_id", "component_id"], unique=True)
+    create_index(conn, "ix_ratings_component_id", "ratings", ["component_id"])
+    return removed
+
+
+def v6_code_summaries(conn):
+    add_column(conn, "components", Column("html_size", Integer, nullable=False, server_default="0"))
+    add_column(conn, "components", Column("css_size", Integer, nullable=False, server_default="0"))
+    add_column(conn, "components", Column("preview", String(200), nullable=False, server_default=""))
+
+
+def v7_updated_at(conn):
+    add_column(conn, "components", Column("updated_at", DateTime))
+    conn.execute(text("UPDATE components SET updated_at = created_at WHERE updated_at IS NULL"))
+    create_index(conn, "ix_components_updated_at", "components", ["updated_at"])
+
+
+def v8_rankings(conn):
+    add_column(conn, "components", Column("bayes_score", Float, nullable=False, server_default=str(PRIOR_MEAN)))
+    add_column(conn, "components", Column("trend_score", Float, nullable=False, server_default="0"))
+    create_index(conn, "ix_components_status_bayes_id", "components", ["status", "bayes_score", "id"])
+    create_index(conn, "ix_components_status_category_bayes_id", "components",
+                 ["status", "category", "bayes_score", "id"])
+    create_index(conn, "ix_components_status_trend_id", "components", ["status", "trend_score", "id"])
+    create_index(conn, "ix_components_status_category_trend_id", "components",
+                 ["status", "category", "trend_score", "id"])
+    # Trigger agregat rating butuh rating_sum/rating_count (v2), updated_at (v7) & bayes_score
+    triggers.ensure_rating_triggers(conn)
+
+
+def v9_category_counts(conn):
+    create_table(conn, category_counts_v9)
+
+
+def v10_review_lease(conn):
+    add_column(conn, "components", Column("review_claimed_by", Integer))
+    add_column(conn, "components", Column("review_lease_until", DateTime))
+
+
+def v11_similarity(conn):
+    for table in (component_signatures_v11, component_lsh_buckets_v11, component_similarities_v11):
+        create_table(conn, table)
+
+
+def v12_token_revocation(conn):
+    add_column(conn, "users", Column("token_version", Integer, nullable=False, server_default="0"))
+    create_table(conn, token_revocations_v12)
+
+
+def v13_code_blobs(conn):
+    create_table(conn, code_blobs_v13)
+    add_column(conn, "components", Column("html_hash", String(64)), references="code_blobs (hash)")
+    add_column(conn, "components", Column("css_hash", String(64)), references="code_blobs (hash)")
+    # Kode baru hanya disimpan di code_blobs, kolom lama jadi NULL
+    drop_not_null(conn, "components", "html_code")
+    drop_not_null(conn, "components", "css_code")
+
+
+def v14_component_deletions(conn):
+    create_table(conn, component_deletions_v14)
+
+
+# (versi, deskripsi, fungsi(conn), perintah backfill manage.py) — urut, versi naik 1 per migrasi.
+# Backfill mengisi data untuk kolom/tabel baru; dijalankan oleh "manage migrate" setelah DDL-nya.
+MIGRATIONS = [
+    (1, "Skema awal (users, components, ratings)", v1_initial_schema, ()),
+    (2, "Agregat rating (rating_sum, rating_count)", v2_rating_aggregates, ("rebuild-ratings",)),
+    (3, "Index full-text search", v3_search_index, ("reindex-search",)),
+    (4, "Index keyset pagination", v4_pagination_indexes, ()),
+    (5, "Unique rating per (user, komponen)", v5_unique_ratings, ("rebuild-ratings",)),
+    (6, "Ringkasan kode (html_size, css_size, preview)", v6_code_summaries, ("backfill-summaries",)),
+    (7, "components.updated_at (export incremental)", v7_updated_at, ()),
+    (8, "Skor leaderboard & trigger agregat rating", v8_rankings, ("rebuild-rankings",)),
+    (9, "Counter kategori (category_counts)", v9_category_counts, ("rebuild-facets",)),
+    (10, "Lease antrian review", v10_review_lease, ()),
+    (11, "Index near-duplicate (MinHash/LSH)", v11_similarity, ("rebuild-similarity",)),
+    (12, "Versi token & revokasi token", v12_token_revocation, ()),
+    (13, "Kode komponen di code_blobs", v13_code_blobs, ("migrate-code-blobs",)),
+    (14, "Tombstone komponen terhapus (export incremental)", v14_component_deletions, ()),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def backfills(versions):
+    # Perintah backfill untuk versi-versi ini, urut sesuai migrasi & tanpa duplikat
+    commands = []
+    for version, _, _, names in MIGRATIONS:
+        if version in versions:
+            commands += [name for name in names if name not in commands]
+    return commands
+
+
+# --- 4. VERSI SAAT INI ---
+
+def current_version(conn):
+    # 0 = database kosong / belum pernah dimigrasi
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def migrate(engine, target=SCHEMA_VERSION):
+    """Jalankan migrasi yang belum terpasang sampai versi target. Return list versi yang dijalankan.
+
+    Tiap migrasi 1 transaksi (DDL + catatan versinya), jadi migrasi yang gagal tidak tercatat
+    dan bisa diulang setelah diperbaiki.
+    """
+    _metadata.create_all(engine)
+    applied = []
+    for version, description, upgrade, _ in MIGRATIONS:
+        if version > target:
+            break
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # 2 proses migrate bersamaan: yang kedua menunggu, lalu melihat versi terbaru
+                conn.execute(text("LOCK TABLE schema_version IN EXCLUSIVE MODE"))
+            if current_version(conn) >= version:
+                continue
+            logger.info("Migrasi skema versi %d: %s", version, description)
+            upgrade(conn)
+            conn.execute(insert(schema_version).values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
+
+
+def status(engine):
+    with engine.connect() as conn:
+        version = current_version(conn)
+    return {
+        "database_version": version,
+        "code_version": SCHEMA_VERSION,
+        "pending": [v for v, _, _, _ in MIGRATIONS if v > version],
+    }
+
+
+def require(engine):
+    # Untuk perintah yang membaca/menulis data lewat models.py (semua kolom harus sudah ada)
+    version = status(engine)["database_version"]
+    if version < SCHEMA_VERSION:
+        raise SchemaOutdated(
+            f"Skema database versi {version}, aplikasi butuh versi {SCHEMA_VERSION}. "
+            "Jalankan: python -m app.manage migrate"
+        )
+    return version
+
+
+# --- 5. CEK SAAT STARTUP ---
+
+def check(engine):
+    """Dipanggil di lifespan: 1 query kecil, tidak pernah menjalankan DDL (kecuali AUTO_MIGRATE).
+
+    Database yang sedang tidak bisa diakses tidak menggagalkan start (worker tetap hidup &
+    request akan gagal sampai database kembali), supaya restart serentak tidak ikut tumbang.
+    """
+    if AUTO_MIGRATE:
+        applied = migrate(engine)
+        if backfills(applied):
+            logger.warning("Migrasi otomatis tanpa backfill data, jalankan: %s",
+                           ", ".join(f"python -m app.manage {name}" for name in backfills(applied)))
+        return SCHEMA_VERSION
+    if SCHEMA_CHECK == "off":
+        return None
+    try:
+        version = require(engine)
+    except SchemaOutdated as exc:
+        if SCHEMA_CHECK == "strict":
+            raise
+        logger.warning(str(exc))
+        return None
+    except Exception as exc:
+        logger.warning("Cek versi skema dilewati, database tidak bisa diakses: %s", exc)
+        return None
+
+    if version > SCHEMA_VERSION:
+        # Wajar selama rolling deploy: migrasi rilis baru sudah jalan, worker ini masih versi lama
+        logger.info("Skema database versi %d lebih baru dari kode (versi %d)", version, SCHEMA_VERSION)
+    return version
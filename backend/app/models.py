@@ -1,8 +1,10 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, Float, ForeignKey, Integer, LargeBinary, String, Text, DateTime, Index
 from sqlalchemy.orm import relationship
 from .database import Base
+from .rankings import PRIOR_MEAN
 import datetime
 import enum
+import zlib
 
 class Role(str, enum.Enum):
     ADMIN = "ADMIN"
@@ -21,24 +23,184 @@ class User(Base):
     username = Column(String, nullable=True)
     hashed_password = Column(String)
     role = Column(String, default=Role.USER)
+    # Versi token (claim "tv" di JWT). Dinaikkan saat logout / ubah role, token versi lama ditolak.
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     components = relationship("Component", back_populates="owner")
 
+# Revokasi token dalam umur token terakhir (lihat revocations.py).
+# Sengaja tanpa Foreign Key: catatan user yang dihapus harus tetap ada sampai tokennya expired.
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+    user_id = Column(Integer, primary_key=True)
+    min_version = Column(Integer, nullable=False)
+    revoked_at = Column(DateTime, nullable=False, index=True)
+
+# Komponen yang dihapus (tombstone untuk export incremental ?updated_since=, lihat export.py).
+# Tanpa Foreign Key: barisnya justru ada untuk komponen yang sudah tidak ada.
+class ComponentDeletion(Base):
+    __tablename__ = "component_deletions"
+    component_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime, nullable=False, index=True)
+
+# Panjang maksimal cuplikan html_code di list versi summary
+PREVIEW_LENGTH = 200
+
+# Ukuran & cuplikan kode, supaya list versi "summary" tidak perlu membaca kodenya
+def code_summary(html_code, css_code):
+    return {
+        "html_size": len((html_code or "").encode()),
+        "css_size": len((css_code or "").encode()),
+        "preview": (html_code or "")[:PREVIEW_LENGTH],
+    }
+
+# Kode HTML/CSS disimpan sekali per isi (content-addressed), terkompresi zlib (lihat blobs.py).
+# size & hash adalah metadata: bisa dipakai (ukuran, ETag) tanpa membaca/decompress data.
+class CodeBlob(Base):
+    __tablename__ = "code_blobs"
+    hash = Column(String(64), primary_key=True)  # sha256 (hex) kode asli
+    size = Column(Integer, nullable=False)  # byte sebelum kompresi
+    stored_size = Column(Integer, nullable=False)  # byte setelah kompresi
+    # Jumlah kolom components.html_hash/css_hash yang menunjuk ke blob ini
+    refcount = Column(Integer, nullable=False, default=0, server_default="0")
+    data = Column(LargeBinary, nullable=False)
+
+    # Decompress hanya saat kodenya benar-benar dibaca
+    @property
+    def text(self):
+        return zlib.decompress(self.data).decode()
+
 class Component(Base):
     __tablename__ = "components"
     id = Column(Integer, primary_key=True, index=True)
     category = Column(String, index=True)
-    html_code = Column(Text)
-    css_code = Column(Text)
+    # Kode ada di code_blobs (html_hash/css_hash). Kolom html_code/css_code hanya berisi data lama
+    # yang belum dipindahkan (NULL setelah: python -m app.manage migrate-code-blobs)
+    legacy_html_code = Column("html_code", Text, nullable=True)
+    legacy_css_code = Column("css_code", Text, nullable=True)
+    html_hash = Column(String(64), ForeignKey("code_blobs.hash"), nullable=True)
+    css_hash = Column(String(64), ForeignKey("code_blobs.hash"), nullable=True)
     status = Column(String, default=Status.IN_REVIEW)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Waktu perubahan terakhir (status, rating, dll) — dipakai export incremental (?updated_since=)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
+
+    # Agregat rating (dijaga trigger database, lihat triggers.py), supaya list tidak perlu hitung ulang
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Ringkasan kode (diisi saat create), supaya list versi "summary" tidak perlu baca html_code/css_code
+    html_size = Column(Integer, nullable=False, default=0, server_default="0")
+    css_size = Column(Integer, nullable=False, default=0, server_default="0")
+    preview = Column(String(PREVIEW_LENGTH), nullable=False, default="", server_default="")
+
+    # Skor leaderboard (lihat rankings.py): top rated (Bayesian, dijaga trigger) & trending
+    bayes_score = Column(Float, nullable=False, default=PRIOR_MEAN, server_default=str(PRIOR_MEAN))
+    trend_score = Column(Float, nullable=False, default=0.0, server_default="0")
+
+    # Lease antrian review (lihat review_queue.py): admin yang sedang mengerjakan + batas waktunya.
+    # Sengaja tanpa Foreign Key: lease cuma sementara dan tidak boleh menghalangi hapus user.
+    review_claimed_by = Column(Integer, nullable=True)
+    review_lease_until = Column(DateTime, nullable=True)
     
     user_id = Column(Integer, ForeignKey("users.id"))
-    owner = relationship("User", back_populates="components")
+    # lazy="joined": owner selalu ikut di-load (dipakai di semua response komponen,
+    # dan di mode async lazy load setelah query tidak diizinkan)
+    owner = relationship("User", back_populates="components", lazy="joined")
+
+    # Blob kode ikut di-JOIN: object Component dipakai di jalur yang memang butuh kodenya
+    # (detail, moderasi + index pencarian, antrian review). List memakai tuple kolom (serialization.py).
+    html_blob = relationship("CodeBlob", foreign_keys=[html_hash], lazy="joined")
+    css_blob = relationship("CodeBlob", foreign_keys=[css_hash], lazy="joined")
     
     # Relasi ke Rating
     ratings = relationship("Rating", back_populates="component")
 
+    # Komponen lama yang mirip (diisi similarity.py saat submit). Tidak ikut response komponen biasa,
+    # hanya di-load eksplisit (selectinload) oleh antrian review.
+    similar_matches = relationship(
+        "ComponentSimilarity",
+        foreign_keys="ComponentSimilarity.component_id",
+        order_by="ComponentSimilarity.score.desc()",
+        lazy="raise_on_sql",
+    )
+
+    # Index untuk keyset pagination (lihat pagination.py)
+    __table_args__ = (
+        Index("ix_components_status_created_id", "status", "created_at", "id"),
+        Index("ix_components_user_created_id", "user_id", "created_at", "id"),
+        # Index leaderboard: 1 halaman = 1 index scan, dengan atau tanpa filter kategori
+        Index("ix_components_status_bayes_id", "status", "bayes_score", "id"),
+        Index("ix_components_status_category_bayes_id", "status", "category", "bayes_score", "id"),
+        Index("ix_components_status_trend_id", "status", "trend_score", "id"),
+        Index("ix_components_status_category_trend_id", "status", "category", "trend_score", "id"),
+    )
+
+    # Dibaca otomatis oleh schemas.ComponentDisplay (from_attributes)
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return 0
+        return round(self.rating_sum / self.rating_count, 1)
+
+    @property
+    def review_count(self):
+        return self.rating_count or 0
+
+    # Dibaca otomatis oleh schemas.ComponentDisplay; fallback ke kolom lama kalau belum dimigrasi
+    @property
+    def html_code(self):
+        if self.html_blob is not None:
+            return self.html_blob.text
+        return self.legacy_html_code
+
+    @property
+    def css_code(self):
+        if self.css_blob is not None:
+            return self.css_blob.text
+        return self.legacy_css_code
+
+    # Hitung ulang ukuran & cuplikan dari kode (dipanggil saat kode diisi)
+    def set_code_summary(self):
+        for name, value in code_summary(self.html_code, self.css_code).items():
+            setattr(self, name, value)
+
+# Jumlah komponen ACCEPTED per kategori (dijaga crud setiap status berubah / komponen dihapus),
+# supaya sidebar filter kategori cukup membaca tabel kecil ini
+class CategoryCount(Base):
+    __tablename__ = "category_counts"
+    category = Column(String, primary_key=True)
+    accepted_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+# --- DETEKSI KOMPONEN HAMPIR SAMA (lihat similarity.py) ---
+# Signature MinHash per komponen (dihitung sekali saat submit, kode komponen tidak pernah diedit)
+class ComponentSignature(Base):
+    __tablename__ = "component_signatures"
+    component_id = Column(Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+# Index LSH: 1 baris per (band, komponen). bucket = hash band (nomor band ikut di-hash),
+# jadi kandidat mirip dicari dengan "bucket IN (...)" lewat primary key, tanpa scan katalog.
+class ComponentLshBucket(Base):
+    __tablename__ = "component_lsh_buckets"
+    bucket = Column(BigInteger, primary_key=True)
+    component_id = Column(Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_component_lsh_buckets_component_id", "component_id"),
+    )
+
+# Top-k komponen lama yang mirip dengan komponen baru, beserta perkiraan similarity (Jaccard)
+class ComponentSimilarity(Base):
+    __tablename__ = "component_similarities"
+    component_id = Column(Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True)
+    similar_id = Column(Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_component_similarities_similar_id", "similar_id"),
+    )
+
 class Rating(Base):
     __tablename__ = "ratings"
     id = Column(Integer, primary_key=True, index=True)
@@ -47,4 +209,10 @@ class Rating(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     component_id = Column(Integer, ForeignKey("components.id"))
     
-    component = relationship("Component", back_populates="ratings")
\ No newline at end of file
+    component = relationship("Component", back_populates="ratings")
+
+    # 1 user hanya boleh punya 1 rating per komponen (dipakai juga oleh upsert ON CONFLICT)
+    __table_args__ = (
+        Index("uq_ratings_user_component", "user_id", "component_id", unique=True),
+        Index("ix_ratings_component_id", "component_id"),
+    )
\ No newline at end of file
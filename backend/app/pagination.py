@@ -0,0 +1,85 @@
+# Keyset (cursor) pagination
+# Halaman berikutnya dicari pakai "WHERE (created_at, id) > (nilai terakhir)"
+# bukan OFFSET, jadi halaman ke-1000 sama cepatnya dengan halaman pertama.
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 100
+
+# Header tempat cursor halaman berikutnya dikirim ke frontend
+# (body tetap berupa list supaya frontend lama tidak rusak)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    # Cursor bersifat opaque untuk client; kalau formatnya aneh langsung tolak (400)
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("panjang cursor tidak cocok")
+
+        parsed = []
+        for (column, _desc), value in zip(columns, values):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            parsed.append(value)
+        return parsed
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(columns, values):
+    # Bangun kondisi "baris sesudah cursor" untuk urutan campuran ASC/DESC:
+    # (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+    clauses = []
+    for i, (column, desc) in enumerate(columns):
+        equal_prefix = [col == val for (col, _), val in zip(columns[:i], values[:i])]
+        step = column < values[i] if desc else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def clamp_limit(limit):
+    if limit is None or limit <= 0:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, row_values=None):
+    """Jalankan query dengan keyset pagination.
+
+    columns    : list (kolom, descending?) — kolom terakhir harus unik (biasanya id)
+    row_values : fungsi untuk mengambil nilai kolom urutan dari 1 baris hasil
+    Return (items, next_cursor). next_cursor None kalau sudah halaman terakhir.
+    """
+    limit = clamp_limit(limit)
+
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns)))
+
+    query = query.order_by(*[column.desc() if desc else column.asc() for column, desc in columns])
+
+    # Ambil 1 baris lebih untuk tahu apakah masih ada halaman berikutnya
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(row_values(rows[-1]))
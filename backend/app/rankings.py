@@ -0,0 +1,89 @@
+# Leaderboard komponen: "top rated" dan "trending"
+# Skornya disimpan di kolom components (bayes_score, trend_score) dan punya index
+# (status, skor, id) + (status, category, skor, id), jadi 1 halaman leaderboard cukup
+# membaca sepanjang page size dari index, berapa pun besar katalognya.
+#
+# - bayes_score = (rating_sum + m*C) / (rating_count + C)
+#   m = RANKING_PRIOR_MEAN, C = RANKING_PRIOR_WEIGHT. Komponen dengan 1 vote bintang 5
+#   tidak langsung mengalahkan komponen dengan ratusan vote rata-rata 4.8.
+#   Dijaga oleh trigger rating (triggers.py), jadi ikut berubah di setiap vote / hapus rating.
+# - trend_score = ln( sum exp((waktu_vote - TREND_EPOCH) / tau) ) untuk semua vote
+#   (vote pertama tiap user per komponen; mengubah vote tidak menambah bobot, lihat crud.upsert_ratings)
+#   Urutannya sama persis dengan "jumlah vote yang meluruh" (half-life RANKING_TREND_HALF_LIFE_HOURS),
+#   tapi nilai lama tidak perlu diperbarui seiring waktu: cukup ditambah saat ada vote (log-sum-exp).
+#   Disimpan dalam skala log supaya tidak pernah overflow.
+import math
+import os
+from datetime import datetime
+
+from sqlalchemy import event, text
+
+PRIOR_MEAN = float(os.getenv("RANKING_PRIOR_MEAN", "3.0"))
+PRIOR_WEIGHT = float(os.getenv("RANKING_PRIOR_WEIGHT", "5"))
+TREND_HALF_LIFE_HOURS = float(os.getenv("RANKING_TREND_HALF_LIFE_HOURS", "24"))
+
+# Titik nol waktu untuk trend_score. Jangan diubah setelah ada data (skor lama jadi tidak sebanding).
+TREND_EPOCH = datetime(2024, 1, 1)
+# Konstanta peluruhan: bobot vote turun setengah setiap TREND_HALF_LIFE_HOURS
+TREND_TAU_SECONDS = TREND_HALF_LIFE_HOURS * 3600 / math.log(2)
+
+
+# --- 1. TOP RATED (BAYESIAN) ---
+
+def bayes_sql(sum_expr, count_expr):
+    # Ekspresi SQL untuk trigger. Konstanta ditulis sebagai float supaya SQLite tidak pakai pembagian integer.
+    return f"(({sum_expr}) + {PRIOR_MEAN * PRIOR_WEIGHT!r}) / (({count_expr}) + {PRIOR_WEIGHT!r})"
+
+
+# --- 2. TRENDING (VOTE DENGAN PELURUHAN WAKTU) ---
+
+def trend_point(now=None):
+    # Bobot 1 vote pada waktu `now`, dalam skala log
+    now = now or datetime.utcnow()
+    return (now - TREND_EPOCH).total_seconds() / TREND_TAU_SECONDS
+
+
+# log-sum-exp yang stabil: exp() hanya dipanggil untuk nilai <= 0
+TREND_UPDATE = text("""
+    UPDATE components SET trend_score = CASE
+        WHEN trend_score >= :x THEN trend_score + ln(1 + exp(:x - trend_score))
+        ELSE :x + ln(1 + exp(trend_score - :x))
+    END
+    WHERE id = :id
+""")
+
+
+def add_trend_votes(db, vote_counts, now=None):
+    """Tambahkan vote ke trend_score. vote_counts: {component_id: jumlah vote baru}.
+
+    1 statement executemany, race-free (nilai baru dihitung database dari nilai terbaru).
+    Tidak commit sendiri.
+    """
+    if not vote_counts:
+        return
+    point = trend_point(now)
+    db.execute(TREND_UPDATE, [
+        {"id": component_id, "x": point + math.log(count)}
+        for component_id, count in vote_counts.items() if count > 0
+    ])
+
+
+def current_trend(trend_score, now=None):
+    # Nilai "jumlah vote meluruh" saat ini (untuk debugging / admin), 0 kalau belum ada vote
+    if not trend_score:
+        return 0.0
+    return math.exp(trend_score - trend_point(now))
+
+
+# --- 3. FUNGSI MATEMATIKA UNTUK SQLITE ---
+# Postgres sudah punya exp() & ln(). SQLite hanya punya kalau dikompilasi dengan math functions,
+# jadi didaftarkan sendiri di setiap koneksi.
+
+def register_sqlite_functions(engine):
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("exp", 1, math.exp)
+        dbapi_connection.create_function("ln", 1, math.log)
@@ -0,0 +1,117 @@
+# Antrian review untuk banyak admin sekaligus (leasing)
+# Admin "claim" N komponen IN_REVIEW sekaligus dan mendapat lease selama REVIEW_LEASE_SECONDS.
+# Selama lease masih berlaku, komponen itu tidak dibagikan ke admin lain, jadi tiap admin
+# mengerjakan batch yang berbeda. Lease yang kedaluwarsa (admin menutup tab, dll) otomatis
+# bisa di-claim lagi, tidak perlu job pembersih. Lease hilang begitu status komponen berubah.
+#
+# - Postgres: kandidat dipilih dengan SELECT ... FOR UPDATE SKIP LOCKED, jadi 2 admin yang
+#   claim bersamaan tidak saling menunggu dan tidak pernah dapat baris yang sama.
+# - SQLite: FOR UPDATE diabaikan, tapi claim dikerjakan dalam 1 statement UPDATE ... RETURNING
+#   dan SQLite hanya punya 1 writer, jadi pilih + tandai tetap atomik (claim lain menunggu lock).
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from . import models
+
+REVIEW_LEASE_SECONDS = int(os.getenv("REVIEW_LEASE_SECONDS", "300"))
+DEFAULT_CLAIM_SIZE = int(os.getenv("REVIEW_CLAIM_SIZE", "20"))
+MAX_CLAIM_SIZE = 100
+
+
+class LeaseConflict(Exception):
+    """Komponen sedang di-lease admin lain."""
+
+    def __init__(self, owner_id, expires_at):
+        super().__init__(f"leased by admin {owner_id} until {expires_at.isoformat()}")
+        self.owner_id = owner_id
+        self.expires_at = expires_at
+
+
+def clamp_claim_size(limit):
+    if limit is None:
+        return DEFAULT_CLAIM_SIZE
+    return max(1, min(limit, MAX_CLAIM_SIZE))
+
+
+def _available(component, admin_id, now):
+    # Bebas di-claim: belum pernah di-lease, lease-nya sudah habis, atau milik admin ini sendiri
+    return or_(
+        component.review_lease_until.is_(None),
+        component.review_lease_until <= now,
+        component.review_claimed_by == admin_id,
+    )
+
+
+def held_by_other(component, admin_id, now=None):
+    # Dipakai crud sebelum moderasi (komponen sudah ter-load, jadi tanpa query tambahan)
+    now = now or datetime.utcnow()
+    return (
+        component.review_lease_until is not None
+        and component.review_lease_until > now
+        and component.review_claimed_by not in (None, admin_id)
+    )
+
+
+# --- 1. CLAIM BATCH ---
+def claim(db: Session, admin_id: int, limit: int = DEFAULT_CLAIM_SIZE, lease_seconds: int = REVIEW_LEASE_SECONDS):
+    """Ambil (atau perpanjang) lease untuk maksimal `limit` komponen IN_REVIEW tertua.
+
+    Komponen yang masih di-lease admin ini ikut dikembalikan (lease-nya diperpanjang), jadi
+    claim ulang setelah refresh halaman tidak kehilangan pekerjaan. Return (list komponen
+    beserta owner, waktu lease berakhir). Commit sendiri supaya lock dilepas secepatnya.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    candidate = aliased(models.Component)
+    candidates = (
+        select(candidate.id)
+        .where(candidate.status == models.Status.IN_REVIEW, _available(candidate, admin_id, now))
+        # Index (status, created_at, id): yang paling lama menunggu dikerjakan duluan
+        .order_by(candidate.created_at, candidate.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    component = models.Component
+    claimed_ids = [
+        cid for (cid,) in db.execute(
+            update(component)
+            .where(component.id.in_(candidates))
+            # updated_at dipertahankan: lease bukan perubahan konten (export incremental tidak ikut)
+            .values(review_claimed_by=admin_id, review_lease_until=expires_at, updated_at=component.updated_at)
+            .returning(component.id)
+            .execution_options(synchronize_session=False)
+        )
+    ]
+    db.commit()
+    if not claimed_ids:
+        return [], expires_at
+
+    # Owner ikut di-load lewat JOIN (relationship lazy="joined"), bukan 1 query per baris.
+    # Komponen mirip (similarity.py) di-load sekaligus untuk semua item dalam 1 query.
+    components = (
+        db.query(component)
+        .options(selectinload(component.similar_matches))
+        .filter(component.id.in_(claimed_ids))
+        .order_by(component.created_at, component.id)
+        .all()
+    )
+    return components, expires_at
+
+
+# --- 2. LEPAS LEASE (batal mengerjakan) ---
+def release(db: Session, admin_id: int, component_ids=None):
+    """Lepas lease milik admin ini (semua, atau hanya `component_ids`). Return jumlah baris."""
+    component = models.Component
+    stmt = update(component).where(component.review_claimed_by == admin_id)
+    if component_ids is not None:
+        stmt = stmt.where(component.id.in_(component_ids))
+    result = db.execute(
+        stmt.values(review_claimed_by=None, review_lease_until=None, updated_at=component.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
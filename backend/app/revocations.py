@@ -0,0 +1,80 @@
+# Revokasi token JWT tanpa query database di setiap request
+# Token membawa id, role dan versi token user (claim "uid", "role", "tv"). Token ditolak kalau
+# versinya lebih kecil dari versi minimum user tsb di peta _min_versions (in-memory).
+#
+# - Logout, ubah role, hapus user: versi user dinaikkan + dicatat di tabel token_revocations
+#   (crud.revoke_user_tokens). Worker yang memproses perubahan langsung memperbarui petanya
+#   sendiri (remember()).
+# - Worker lain memuat ulang peta dari tabel tiap TOKEN_REVOCATION_REFRESH_SECONDS (refresh()),
+#   jadi revokasi berlaku di semua worker paling lambat selama itu. refresh() cuma SELECT.
+# - Catatan yang lebih tua dari umur token tidak perlu lagi (token lamanya sudah expired):
+#   refresh() mengabaikannya, dan tabelnya dibersihkan oleh satu proses maintenance
+#   ("python -m app.manage prune-revocations", mis. dari cron), bukan oleh tiap worker.
+# - User baru yang mendapat id bekas user yang dihapus (SQLite bisa memakai ulang id) mulai dari
+#   versi minimum id tsb (crud.create_user), jadi tokennya valid & token user lama tetap ditolak.
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "5"))
+
+_min_versions = {}  # user_id -> versi token minimum yang masih berlaku
+_recent = {}        # remember() sejak refresh() terakhir dimulai
+_lock = threading.Lock()
+
+
+def is_revoked(user_id, version):
+    return (version or 0) < _min_versions.get(user_id, 0)
+
+
+def remember(user_id, version):
+    # Dipanggil setelah commit, supaya worker ini langsung menolak token lama
+    with _lock:
+        if version > _min_versions.get(user_id, 0):
+            _min_versions[user_id] = version
+        if version > _recent.get(user_id, 0):
+            _recent[user_id] = version
+
+
+def min_version(db: Session, user_id):
+    return db.execute(
+        select(models.TokenRevocation.min_version).where(models.TokenRevocation.user_id == user_id)
+    ).scalar()
+
+
+def refresh(db: Session, max_age_seconds):
+    """Muat ulang peta revokasi dari database (read-only)."""
+    global _min_versions
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    revocation = models.TokenRevocation
+    with _lock:
+        _recent.clear()
+    # Query di luar lock: request yang memanggil is_revoked()/remember() tidak ikut menunggu
+    rows = db.execute(
+        select(revocation.user_id, revocation.min_version).where(revocation.revoked_at >= cutoff)
+    ).all()
+    fresh = dict(rows)
+    with _lock:
+        # remember() yang datang selama query mungkin belum terlihat di hasilnya: jangan tertimpa
+        for user_id, version in _recent.items():
+            if version > fresh.get(user_id, 0):
+                fresh[user_id] = version
+        _min_versions = fresh
+    return len(rows)
+
+
+def prune(db: Session, max_age_seconds):
+    """Hapus catatan revokasi yang lebih tua dari umur token. Return jumlah yang dihapus."""
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    result = db.execute(delete(models.TokenRevocation).where(models.TokenRevocation.revoked_at < cutoff))
+    db.commit()
+    return result.rowcount
+
+
+def stats():
+    return {"revoked_users": len(_min_versions), "refresh_seconds": REFRESH_SECONDS}
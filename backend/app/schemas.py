@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional, Union
 from datetime import datetime
 from enum import Enum
 
@@ -57,5 +57,109 @@ class ComponentDisplay(BaseModel):
     class Config:
         # GANTI INI: dari orm_mode menjadi from_attributes
         from_attributes = True
+
+# Output ringkas untuk list (tanpa html_code/css_code yang besar)
+class ComponentSummary(BaseModel):
+    id: int
+    category: str
+    status: str
+    created_at: datetime
+    owner: UserDisplay
+
+    rating: float = 0.0
+    review_count: int = 0
+
+    html_size: int = 0
+    css_size: int = 0
+    preview: str = ""
+
+    class Config:
+        from_attributes = True
+
+# Kode lengkap satu komponen (diambil saat dibutuhkan saja)
+class ComponentCode(BaseModel):
+    id: int
+    html_code: str
+    css_code: str
+
+    class Config:
+        from_attributes = True
+
+# Pilihan bentuk data di endpoint list (?fields=...)
+class ComponentFields(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
+# --- AMBIL BANYAK KOMPONEN SEKALIGUS (GET /components/batch) ---
+class ComponentBatch(BaseModel):
+    # Urutan sama dengan ?ids= yang diminta, ID yang tidak ada masuk "missing"
+    items: List[Union[ComponentDisplay, ComponentSummary]]
+    missing: List[int]
+
+# --- MODERASI MASSAL (ADMIN) ---
+class BulkAction(str, Enum):
+    ACCEPT = "ACCEPT"
+    REJECT = "REJECT"
+    DELETE = "DELETE"
+
+# Input: banyak ID + satu aksi, dikerjakan dalam 1 transaksi
+class ComponentBulkRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=1000)
+    action: BulkAction
+
+# Output: hasil per ID ("ok" / "not_found" / "leased")
+class BulkResultItem(BaseModel):
+    id: int
+    result: str
+
+class ComponentBulkResult(BaseModel):
+    action: BulkAction
+    processed: int
+    results: List[BulkResultItem]
+
+# --- KOMPONEN MIRIP (NEAR-DUPLICATE) ---
+class SimilarComponent(BaseModel):
+    similar_id: int
+    score: float  # perkiraan Jaccard similarity 0..1
+
+    class Config:
+        from_attributes = True
+
+# --- ANTRIAN REVIEW (LEASE PER ADMIN) ---
+class ReviewItem(ComponentDisplay):
+    similar: List[SimilarComponent] = Field(default_factory=list, validation_alias="similar_matches")
+
+class ReviewClaim(BaseModel):
+    lease_until: datetime
+    items: List[ReviewItem]
+
+# ids kosong/None = lepas semua lease milik admin ini
+class ReviewRelease(BaseModel):
+    ids: Optional[List[int]] = Field(default=None, max_length=1000)
+
+# --- FACET KATEGORI (SIDEBAR FILTER) ---
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+
+class ComponentFacets(BaseModel):
+    total: int
+    categories: List[CategoryFacet]
+    # Diisi kalau ada ?search=: jumlah per kategori yang cocok dengan pencarian
+    search: Optional[str] = None
+    matching_total: Optional[int] = None
+    matching: Optional[List[CategoryFacet]] = None
+
 class RatingCreate(BaseModel):
-    score: int
\ No newline at end of file
+    score: int = Field(ge=1, le=5) # 1 sampai 5
+
+# --- VOTE BANYAK KOMPONEN SEKALIGUS ---
+class RatingBatchItem(BaseModel):
+    component_id: int
+    score: int = Field(ge=1, le=5)
+
+class RatingBatchCreate(BaseModel):
+    votes: List[RatingBatchItem] = Field(min_length=1, max_length=500)
+
+class RatingBatchResult(BaseModel):
+    results: List[BulkResultItem]
\ No newline at end of file
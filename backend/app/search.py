@@ -0,0 +1,203 @@
+# Mesin pencarian komponen (full-text search)
+# - Postgres: tabel component_search dengan kolom tsvector + GIN index
+# - SQLite  : virtual table FTS5 (dipakai untuk testing lokal)
+# Yang di-index hanya komponen ACCEPTED, jadi ukuran index = ukuran katalog publik.
+import re
+from html.parser import HTMLParser
+
+from sqlalchemy import Float, Integer, bindparam, select, text
+from sqlalchemy.orm import Session
+
+SEARCH_TABLE = "component_search"
+
+# Kata = huruf/angka saja. "neon-btn" dipecah jadi "neon" dan "btn",
+# sama seperti cara Postgres & FTS5 memecah tanda hubung.
+WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+CSS_PROPERTY_RE = re.compile(r"(?<![\w-])(-{0,2}[a-zA-Z][\w-]*)\s*:(?!:)")
+CSS_CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_BLOCK_RE = re.compile(r"\{([^{}]*)\}")
+
+
+def _words(value):
+    return [w.lower() for w in WORD_RE.findall(value or "")]
+
+
+# --- 1. TOKENIZER HTML / CSS ---
+
+class _HTMLTokenizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags = []
+        self.classes = []
+        self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.append(tag)
+        for name, value in attrs:
+            if name in ("class", "id") and value:
+                self.classes.extend(value.split())
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+
+def tokenize_html(html_code):
+    # Hasil: (tag + class/id, teks yang tampil)
+    parser = _HTMLTokenizer()
+    try:
+        parser.feed(html_code or "")
+        parser.close()
+    except Exception:
+        # HTML rusak tetap di-index sebisanya (ambil semua kata)
+        return [], _words(html_code)
+
+    names = parser.tags + [w for c in parser.classes for w in _words(c)]
+    return names, _words(" ".join(parser.text))
+
+
+def tokenize_css(css_code):
+    # Hasil: (class di selector, nama properti CSS)
+    css = CSS_COMMENT_RE.sub(" ", css_code or "")
+    classes = [w for c in CSS_CLASS_RE.findall(CSS_BLOCK_RE.sub(" ", css)) for w in _words(c)]
+    properties = []
+    for block in CSS_BLOCK_RE.findall(css):
+        for prop in CSS_PROPERTY_RE.findall(block):
+            properties.extend(_words(prop))
+    return classes, properties
+
+
+def build_document(category, html_code, css_code):
+    # Dokumen dibagi 2 bobot:
+    # - meta (bobot tinggi): kategori, nama tag, class/id
+    # - body (bobot rendah): properti CSS dan teks di dalam HTML
+    tags, text_words = tokenize_html(html_code)
+    css_classes, properties = tokenize_css(css_code)
+    meta = _words(category) + tags + css_classes
+    body = properties + text_words
+    return " ".join(meta), " ".join(body)
+
+
+def _query_words(search):
+    # Buang duplikat tapi tetap jaga urutan
+    return list(dict.fromkeys(_words(search)))
+
+
+# --- 2. SETUP INDEX ---
+
+def _dialect(bind):
+    return bind.dialect.name
+
+
+def ensure_search_index(conn):
+    # Dipanggil oleh migrasi (migrations.py) & reindex-search, di dalam transaksi milik pemanggil.
+    # Aman dipanggil berulang kali.
+    if _dialect(conn) == "postgresql":
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+                component_id INTEGER PRIMARY KEY REFERENCES components(id) ON DELETE CASCADE,
+                meta TEXT NOT NULL DEFAULT '',
+                body TEXT NOT NULL DEFAULT '',
+                tsv TSVECTOR GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', meta), 'A') ||
+                    setweight(to_tsvector('simple', body), 'B')
+                ) STORED
+            )
+        """))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_tsv ON {SEARCH_TABLE} USING GIN (tsv)"
+        ))
+    else:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            "USING fts5(component_id UNINDEXED, meta, body)"
+        ))
+
+
+# --- 3. UPDATE INDEX (INCREMENTAL) ---
+# Tidak commit sendiri: ikut transaksi milik crud yang memanggil
+
+def index_component(db: Session, component):
+    index_components(db, [component])
+
+
+def index_components(db: Session, components):
+    # Banyak komponen sekaligus: 1 statement executemany, bukan 1 round-trip per komponen
+    rows = []
+    for component in components:
+        meta, body = build_document(component.category, component.html_code, component.css_code)
+        rows.append({"id": component.id, "meta": meta, "body": body})
+    if not rows:
+        return
+
+    if _dialect(db.get_bind()) == "postgresql":
+        db.execute(text(f"""
+            INSERT INTO {SEARCH_TABLE} (component_id, meta, body) VALUES (:id, :meta, :body)
+            ON CONFLICT (component_id) DO UPDATE SET meta = EXCLUDED.meta, body = EXCLUDED.body
+        """), rows)
+    else:
+        remove_components(db, [row["id"] for row in rows])
+        db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (component_id, meta, body) VALUES (:id, :meta, :body)"
+        ), rows)
+
+
+def remove_components(db: Session, component_ids):
+    component_ids = list(component_ids)
+    if not component_ids:
+        return
+    stmt = text(f"DELETE FROM {SEARCH_TABLE} WHERE component_id IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    )
+    db.execute(stmt, {"ids": component_ids})
+
+
+def rebuild_index(db: Session):
+    # Isi ulang index dari semua komponen ACCEPTED (dipakai oleh manage.py)
+    from . import models
+
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    count = 0
+    accepted = (
+        select(models.Component)
+        .where(models.Component.status == models.Status.ACCEPTED)
+        .execution_options(yield_per=500)
+    )
+    for batch in db.execute(accepted).scalars().partitions():
+        index_components(db, batch)
+        count += len(batch)
+    return count
+
+
+# --- 4. QUERY ---
+
+def search_subquery(db: Session, search: str):
+    # Return subquery (component_id, rank) yang bisa di-JOIN oleh crud,
+    # atau None kalau kata kuncinya tidak mengandung kata yang bisa dicari.
+    words = _query_words(search)
+    if not words:
+        return None
+
+    if _dialect(db.get_bind()) == "postgresql":
+        # Tiap kata dicocokkan sebagai prefix: 'neon':* & 'btn':*
+        tsquery = " & ".join(f"{w}:*" for w in words)
+        stmt = text(f"""
+            SELECT component_id, ts_rank_cd(tsv, to_tsquery('simple', :q)) AS rank
+            FROM {SEARCH_TABLE}
+            WHERE tsv @@ to_tsquery('simple', :q)
+        """)
+    else:
+        # bm25: makin kecil makin relevan, jadi dibalik tandanya
+        tsquery = " AND ".join(f'"{w}"*' for w in words)
+        stmt = text(f"""
+            SELECT CAST(component_id AS INTEGER) AS component_id,
+                   -bm25({SEARCH_TABLE}, 0.0, 4.0, 1.0) AS rank
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH :q
+        """)
+
+    return (
+        stmt.bindparams(q=tsquery)
+        .columns(component_id=Integer, rank=Float)
+        .subquery("search_hits")
+    )
@@ -0,0 +1,108 @@
+# Serialisasi cepat untuk list komponen
+# Baris list dibaca sebagai tuple kolom (component + owner lewat JOIN), bukan object ORM, lalu
+# langsung dibentuk jadi dict dengan urutan field yang sama persis dengan schemas.ComponentDisplay /
+# schemas.ComponentSummary. Datanya berasal dari database sendiri (bentuknya sudah pasti), jadi
+# tidak divalidasi ulang oleh pydantic, dan di-encode dengan orjson kalau terpasang.
+# Endpoint mengembalikan FastJSONResponse secara langsung, sehingga FastAPI tidak memvalidasi
+# response_model lagi (response_model tetap dipasang untuk dokumentasi OpenAPI).
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+from sqlalchemy.orm import Session
+
+from . import blobs, models
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, pydantic_core.to_json juga encoder Rust
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return to_json(value)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+# --- 1. KOLOM YANG DI-SELECT ---
+# Kode (blob terkompresi, lihat blobs.py) hanya di-JOIN & di-SELECT untuk list versi lengkap
+component = models.Component
+BASE_COLUMNS = (
+    component.id,
+    component.category,
+    component.status,
+    component.created_at,
+    component.rating_sum,
+    component.rating_count,
+)
+FULL_COLUMNS = BASE_COLUMNS + blobs.CODE_COLUMNS
+SUMMARY_COLUMNS = BASE_COLUMNS + (component.html_size, component.css_size, component.preview)
+OWNER_COLUMNS = (
+    models.User.id.label("owner_id"),
+    models.User.username.label("owner_username"),
+    models.User.email.label("owner_email"),
+    models.User.role.label("owner_role"),
+)
+
+
+def component_query(db: Session, summary: bool = False, *extra_columns):
+    # Query tuple: filter / order_by / keyset pagination tetap memakai kolom models.Component.
+    # extra_columns (mis. skor leaderboard) bisa dibaca dari baris lewat nama kolomnya.
+    if summary:
+        return db.query(*SUMMARY_COLUMNS, *extra_columns, *OWNER_COLUMNS).outerjoin(models.Component.owner)
+    query = db.query(*FULL_COLUMNS, *extra_columns, *OWNER_COLUMNS).outerjoin(models.Component.owner)
+    return blobs.join_code(query)
+
+
+# --- 2. BARIS -> DICT ---
+
+def _owner(row):
+    if row.owner_id is None:
+        return None
+    return {"id": row.owner_id, "username": row.owner_username, "email": row.owner_email, "role": row.owner_role}
+
+
+def _rating(row):
+    # Sama dengan models.Component.rating
+    if not row.rating_count:
+        return 0.0
+    return round(row.rating_sum / row.rating_count, 1)
+
+
+def full_row(row):
+    html_code, css_code = blobs.row_code(row)
+    return {
+        "id": row.id,
+        "category": row.category,
+        "html_code": html_code,
+        "css_code": css_code,
+        "status": row.status,
+        "created_at": row.created_at,
+        "owner": _owner(row),
+        "rating": _rating(row),
+        "review_count": row.rating_count or 0,
+    }
+
+
+def summary_row(row):
+    return {
+        "id": row.id,
+        "category": row.category,
+        "status": row.status,
+        "created_at": row.created_at,
+        "owner": _owner(row),
+        "rating": _rating(row),
+        "review_count": row.rating_count or 0,
+        "html_size": row.html_size,
+        "css_size": row.css_size,
+        "preview": row.preview,
+    }
+
+
+def component_rows(rows, summary: bool = False):
+    make = summary_row if summary else full_row
+    return [make(row) for row in rows]
@@ -0,0 +1,242 @@
+# Deteksi komponen hampir sama (near-duplicate) untuk antrian review
+# - Kode dinormalisasi (lowercase, komentar dibuang, angka & warna hex diseragamkan) lalu dipecah
+#   jadi shingle: potongan SHINGLE_SIZE token berurutan. Copy yang cuma diganti warna / ukuran /
+#   spasi tetap menghasilkan shingle yang hampir sama.
+# - Tiap komponen disimpan sebagai signature MinHash (NUM_PERM nilai). Persentase nilai yang sama
+#   antara 2 signature = perkiraan Jaccard similarity shingle-nya.
+# - Signature dipecah jadi LSH_BANDS band. Komponen yang punya minimal 1 band identik masuk satu
+#   bucket, jadi kandidat dicari lewat index bucket (sub-linear), bukan membandingkan seluruh katalog.
+#   Dengan 16 band x 4 baris, pasangan dengan similarity >= ~0.5 hampir pasti jadi kandidat.
+#
+# Yang di-index semua komponen (ACCEPTED, IN_REVIEW, REJECTED): submit ulang komponen yang
+# pernah ditolak juga perlu ketahuan. Tidak commit sendiri, ikut transaksi crud.
+import hashlib
+import os
+import re
+import struct
+import zlib
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from . import blobs, models
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.5"))
+SIMILARITY_TOP_K = int(os.getenv("SIMILARITY_TOP_K", "5"))
+# Batas kandidat dari LSH yang dibandingkan signature-nya (komponen yang sangat umum bisa punya banyak)
+MAX_CANDIDATES = 200
+
+# MinHash versi "one permutation hashing": tiap shingle di-hash sekali lalu masuk ke 1 dari NUM_PERM
+# bin (nilai minimum per bin = 1 nilai signature). Biayanya O(jumlah shingle), bukan
+# O(jumlah shingle x NUM_PERM), jadi submit tetap cepat walau kodenya puluhan KB.
+# Bin kosong (komponen sangat kecil) diisi dari bin terisi terdekat di kanannya + offset jarak
+# (densifikasi), supaya estimasi Jaccard tetap tidak bias.
+# Konstanta tetap: jangan diubah setelah ada data (jalankan ulang rebuild-similarity kalau terpaksa).
+_PRIME = (1 << 61) - 1
+_MIX_A, _MIX_B = 0x1F3D5B79A2C4E681 % _PRIME, 0x5DEECE66D
+_BIN_OFFSET = _PRIME // NUM_PERM + 1
+_SIGNATURE = struct.Struct(f"<{NUM_PERM}Q")
+
+HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+TOKEN_RE = re.compile(r"#[0-9a-f]{3,8}\b|\d+(?:\.\d+)?|[a-z_-][\w-]*|[^\s\w]")
+NUMBER_RE = re.compile(r"\d")
+
+
+# --- 1. NORMALISASI & SHINGLE ---
+
+def _tokens(code, comment_re):
+    tokens = []
+    for token in TOKEN_RE.findall(comment_re.sub(" ", (code or "").lower())):
+        if token[0] == "#" and len(token) > 1:
+            token = "#"  # warna hex
+        elif NUMBER_RE.match(token):
+            token = "0"  # ukuran, durasi, dll
+        tokens.append(token)
+    return tokens
+
+
+def _shingles(prefix, tokens):
+    if not tokens:
+        return set()
+    if len(tokens) < SHINGLE_SIZE:
+        return {zlib.crc32(f"{prefix}{' '.join(tokens)}".encode())}
+    return {
+        zlib.crc32(f"{prefix}{' '.join(tokens[i:i + SHINGLE_SIZE])}".encode())
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def shingles(html_code, css_code):
+    # HTML & CSS diberi prefix berbeda supaya shingle-nya tidak tercampur
+    return _shingles("h:", _tokens(html_code, HTML_COMMENT_RE)) | _shingles("c:", _tokens(css_code, CSS_COMMENT_RE))
+
+
+# --- 2. MINHASH & LSH ---
+
+def signature(html_code, css_code):
+    # Return tuple NUM_PERM angka, atau None kalau kodenya kosong
+    hashes = shingles(html_code, css_code)
+    if not hashes:
+        return None
+    bins = [None] * NUM_PERM
+    for h in hashes:
+        value, b = divmod((_MIX_A * h + _MIX_B) % _PRIME, NUM_PERM)
+        if bins[b] is None or value < bins[b]:
+            bins[b] = value
+
+    sig = []
+    for i, value in enumerate(bins):
+        distance = 0
+        while value is None:
+            distance += 1
+            value = bins[(i + distance) % NUM_PERM]
+        sig.append(value + distance * _BIN_OFFSET)
+    return tuple(sig)
+
+
+def estimate(signature_a, signature_b):
+    # Perkiraan Jaccard similarity dari 2 signature
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / NUM_PERM
+
+
+def lsh_buckets(sig):
+    # 1 bucket per band. Nomor band ikut di-hash supaya band berbeda tidak pernah bertabrakan.
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = sig[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<H{LSH_ROWS}Q", band, *rows), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def pack(sig):
+    return _SIGNATURE.pack(*sig)
+
+
+def unpack(data):
+    return _SIGNATURE.unpack(data)
+
+
+# --- 3. CARI KOMPONEN MIRIP ---
+
+def find_similar(db: Session, sig, before_id=None, k=SIMILARITY_TOP_K):
+    """Top-k komponen ter-index yang mirip dengan `sig`: list (component_id, score), skor menurun.
+
+    before_id: hanya komponen yang lebih lama (id lebih kecil), yaitu yang sudah ada saat submit.
+    Biaya: 1 query bucket lewat primary key + 1 query signature untuk maksimal MAX_CANDIDATES baris.
+    """
+    bucket = models.ComponentLshBucket
+    candidates = (
+        select(bucket.component_id)
+        .where(bucket.bucket.in_(lsh_buckets(sig)))
+        .group_by(bucket.component_id)
+        # Makin banyak band yang sama, makin mungkin mirip: dibandingkan duluan
+        .order_by(func.count().desc(), bucket.component_id.desc())
+        .limit(MAX_CANDIDATES)
+    )
+    if before_id is not None:
+        candidates = candidates.where(bucket.component_id < before_id)
+    candidate_ids = db.execute(candidates).scalars().all()
+    if not candidate_ids:
+        return []
+
+    stored = db.execute(
+        select(models.ComponentSignature.component_id, models.ComponentSignature.signature)
+        .where(models.ComponentSignature.component_id.in_(candidate_ids))
+    )
+    scored = []
+    for component_id, data in stored:
+        score = estimate(sig, unpack(data))
+        if score >= SIMILARITY_THRESHOLD:
+            scored.append((component_id, round(score, 3)))
+    scored.sort(key=lambda item: (-item[1], -item[0]))
+    return scored[:k]
+
+
+# --- 4. UPDATE INDEX ---
+
+def _store(db: Session, signatures):
+    # signatures: list (component_id, sig). 2 statement executemany untuk berapa pun jumlahnya.
+    if not signatures:
+        return
+    db.execute(insert(models.ComponentSignature), [
+        {"component_id": component_id, "signature": pack(sig)} for component_id, sig in signatures
+    ])
+    db.execute(insert(models.ComponentLshBucket), [
+        {"bucket": b, "component_id": component_id}
+        for component_id, sig in signatures
+        for b in set(lsh_buckets(sig))
+    ])
+
+
+def _store_matches(db: Session, component_id, matches):
+    if matches:
+        db.execute(insert(models.ComponentSimilarity), [
+            {"component_id": component_id, "similar_id": similar_id, "score": score}
+            for similar_id, score in matches
+        ])
+
+
+def index_component(db: Session, component):
+    """Dipanggil saat submit (component.id sudah ada, sesudah flush).
+
+    Catat komponen lama yang mirip, lalu masukkan komponen ini ke index. Return list (id, score).
+    """
+    sig = signature(component.html_code, component.css_code)
+    if sig is None:
+        return []
+    matches = find_similar(db, sig, before_id=component.id)
+    _store(db, [(component.id, sig)])
+    _store_matches(db, component.id, matches)
+    return matches
+
+
+def remove_components(db: Session, component_ids):
+    component_ids = list(component_ids)
+    if not component_ids:
+        return
+    similarity = models.ComponentSimilarity
+    db.execute(delete(similarity).where(or_(
+        similarity.component_id.in_(component_ids), similarity.similar_id.in_(component_ids)
+    )))
+    db.execute(delete(models.ComponentLshBucket).where(models.ComponentLshBucket.component_id.in_(component_ids)))
+    db.execute(delete(models.ComponentSignature).where(models.ComponentSignature.component_id.in_(component_ids)))
+
+
+def rebuild_index(db: Session, batch_size=500):
+    """Bangun ulang seluruh index dari tabel components (dipakai manage.py & benchmark seed).
+
+    Komponen diproses urut id; komponen IN_REVIEW dicocokkan dengan komponen yang lebih lama,
+    sama seperti kalau mereka di-submit satu per satu. Return jumlah komponen yang di-index.
+    """
+    db.execute(delete(models.ComponentSimilarity))
+    db.execute(delete(models.ComponentLshBucket))
+    db.execute(delete(models.ComponentSignature))
+
+    component = models.Component
+    rows = (
+        blobs.join_code(select(component.id, component.status, *blobs.CODE_COLUMNS))
+        .order_by(component.id)
+        .execution_options(yield_per=batch_size)
+    )
+    count = 0
+    for batch in db.execute(rows).partitions():
+        signatures, pending = [], []
+        for row in batch:
+            sig = signature(*blobs.row_code(row))
+            if sig is None:
+                continue
+            signatures.append((row.id, sig))
+            if row.status == models.Status.IN_REVIEW:
+                pending.append((row.id, sig))
+        _store(db, signatures)
+        for component_id, sig in pending:
+            _store_matches(db, component_id, find_similar(db, sig, before_id=component_id))
+        count += len(signatures)
+    return count
@@ -0,0 +1,109 @@
+# Trigger database untuk menjaga agregat rating (components.rating_sum / rating_count),
+# skor top rated (components.bayes_score, lihat rankings.py)
+# dan components.updated_at (rating berubah = komponen ikut "berubah" untuk export incremental)
+# Dengan trigger, vote cukup 1 statement upsert: database sendiri yang tahu skor lama
+# (OLD.score) dan skor baru (NEW.score), jadi agregat tetap benar walau ada vote bersamaan.
+from sqlalchemy import text
+
+from .rankings import bayes_sql
+
+# SET bayes_score dihitung dari nilai agregat yang BARU (di SET, kolom di kanan masih nilai lama)
+ADD_NEW = (
+    "rating_sum = rating_sum + NEW.score, rating_count = rating_count + 1, "
+    "bayes_score = " + bayes_sql("rating_sum + NEW.score", "rating_count + 1")
+)
+REMOVE_OLD = (
+    "rating_sum = rating_sum - OLD.score, rating_count = rating_count - 1, "
+    "bayes_score = " + bayes_sql("rating_sum - OLD.score", "rating_count - 1")
+)
+CHANGE_SCORE = (
+    "rating_sum = rating_sum + NEW.score - OLD.score, "
+    "bayes_score = " + bayes_sql("rating_sum + NEW.score - OLD.score", "rating_count")
+)
+
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION ratings_aggregate_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.component_id = NEW.component_id THEN
+            UPDATE components SET {CHANGE_SCORE},
+                updated_at = (now() AT TIME ZONE 'utc')
+            WHERE id = NEW.component_id;
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE components SET {REMOVE_OLD},
+                updated_at = (now() AT TIME ZONE 'utc')
+            WHERE id = OLD.component_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE components SET {ADD_NEW},
+                updated_at = (now() AT TIME ZONE 'utc')
+            WHERE id = NEW.component_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER trg_ratings_aggregate
+    AFTER INSERT OR UPDATE OF score, component_id OR DELETE ON ratings
+    FOR EACH ROW EXECUTE FUNCTION ratings_aggregate_trigger()
+    """,
+]
+
+# Format sama dengan yang ditulis SQLAlchemy (mikrodetik 6 digit), supaya perbandingan string tetap benar
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+SQLITE_TRIGGERS = ["trg_ratings_aggregate_insert", "trg_ratings_aggregate_update", "trg_ratings_aggregate_delete"]
+
+SQLITE_DDL = [
+    """
+    CREATE TRIGGER trg_ratings_aggregate_insert AFTER INSERT ON ratings
+    BEGIN
+        UPDATE components SET {ADD_NEW},
+            updated_at = {SQLITE_NOW}
+        WHERE id = NEW.component_id;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_ratings_aggregate_update AFTER UPDATE OF score, component_id ON ratings
+    BEGIN
+        UPDATE components SET {REMOVE_OLD},
+            updated_at = {SQLITE_NOW}
+        WHERE id = OLD.component_id;
+        UPDATE components SET {ADD_NEW},
+            updated_at = {SQLITE_NOW}
+        WHERE id = NEW.component_id;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_ratings_aggregate_delete AFTER DELETE ON ratings
+    BEGIN
+        UPDATE components SET {REMOVE_OLD},
+            updated_at = {SQLITE_NOW}
+        WHERE id = OLD.component_id;
+    END
+    """,
+]
+
+
+def _render(ddl):
+    for name, value in (("{SQLITE_NOW}", SQLITE_NOW), ("{ADD_NEW}", ADD_NEW),
+                        ("{REMOVE_OLD}", REMOVE_OLD), ("{CHANGE_SCORE}", CHANGE_SCORE)):
+        ddl = ddl.replace(name, value)
+    return ddl
+
+
+def ensure_rating_triggers(conn):
+    # Dipanggil oleh migrasi (migrations.py), dedupe-ratings & rebuild-rankings, di dalam transaksi
+    # milik pemanggil. Aman dipanggil berulang kali: trigger selalu dibuat ulang, jadi perubahan
+    # RANKING_PRIOR_* terpasang lewat: python -m app.manage rebuild-rankings (skor lama ikut disamakan).
+    if conn.dialect.name == "postgresql":
+        statements = [_render(ddl) for ddl in POSTGRES_DDL]
+    else:
+        # SQLite tidak punya CREATE OR REPLACE TRIGGER: hapus dulu lalu buat ulang
+        statements = [f"DROP TRIGGER IF EXISTS {name}" for name in SQLITE_TRIGGERS]
+        statements += [_render(ddl) for ddl in SQLITE_DDL]
+    for ddl in statements:
+        conn.execute(text(ddl))
@@ -0,0 +1,187 @@
+# Write-behind untuk vote (opsional, VOTE_WRITE_BEHIND=true)
+# Tanpa buffer, setiap POST /components/{id}/rate = 1 transaksi + 1 commit (fsync WAL). Saat ramai,
+# waktu commit yang mendominasi. Dengan buffer:
+# - Vote langsung di-ack setelah masuk buffer in-process (per worker). Vote ulang oleh user yang sama
+#   untuk komponen yang sama sebelum flush cukup menimpa entry-nya (yang terakhir yang dipakai).
+# - Buffer di-flush tiap VOTE_FLUSH_MS, atau lebih cepat kalau sudah VOTE_FLUSH_MAX vote:
+#   1 transaksi berisi 1 upsert multi-row (crud.upsert_ratings). Agregat rating ikut terupdate
+#   di transaksi yang sama (trigger + trend_score).
+# - Konsekuensinya: rating/leaderboard tertinggal paling lama ~VOTE_FLUSH_MS (+ waktu flush), dan
+#   vote yang belum di-flush hilang kalau proses mati mendadak. Shutdown normal menguras buffer dulu
+#   (drain(), sinkron: flush yang terpotong pembatalan task sudah mengembalikan batch-nya ke buffer).
+# - Buffer penuh (VOTE_BUFFER_MAX, mis. database sedang down): vote ditolak 503 + Retry-After.
+# Semua akses buffer terjadi di event loop (endpoint async + task flusher), jadi tidak perlu lock.
+import asyncio
+import logging
+import os
+import time
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from . import crud, database, metrics, models
+from .cache import invalidate_components
+
+WRITE_BEHIND = os.getenv("VOTE_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+FLUSH_MS = float(os.getenv("VOTE_FLUSH_MS", "200"))
+FLUSH_MAX = int(os.getenv("VOTE_FLUSH_MAX", "500"))
+BUFFER_MAX = int(os.getenv("VOTE_BUFFER_MAX", "20000"))
+RETRY_AFTER_SECONDS = 1
+DRAIN_ATTEMPTS = 3
+
+logger = logging.getLogger("uicode.votes")
+
+_pending = {}  # (user_id, component_id) -> (score, waktu masuk buffer)
+_wakeup = None  # asyncio.Event, dibuat saat flusher jalan
+_running = False
+_stats = {"accepted": 0, "coalesced": 0, "flushes": 0, "flushed": 0, "dropped": 0, "failed_flushes": 0, "rejected": 0}
+
+
+def enabled():
+    # Hanya kalau flusher benar-benar jalan (lifespan aktif); selain itu vote ditulis langsung
+    return WRITE_BEHIND and _running
+
+
+def submit(user_id, votes):
+    """Masukkan vote ke buffer. votes: list (component_id, score) yang komponennya sudah dicek ada."""
+    if len(_pending) + len(votes) > BUFFER_MAX:
+        _stats["rejected"] += len(votes)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    now = time.perf_counter()
+    for component_id, score in votes:
+        key = (user_id, component_id)
+        if key in _pending:
+            _stats["coalesced"] += 1
+        _pending[key] = (score, now)
+    _stats["accepted"] += len(votes)
+    if len(_pending) >= FLUSH_MAX and _wakeup is not None:
+        _wakeup.set()
+
+
+# --- FLUSH (1 TRANSAKSI PER BATCH) ---
+# Lewat engine sync di threadpool, sama seperti refresh revokasi token (auth.py)
+
+def write_votes(votes):
+    """Tulis batch vote: {(user_id, component_id): score}. Return (component_ids yang ditulis, jumlah dibuang)."""
+    db = database.SessionLocal()
+    try:
+        user_ids = {user_id for user_id, _ in votes}
+        component_ids = {component_id for _, component_id in votes}
+        # Komponen / user bisa saja terhapus setelah vote di-ack: vote-nya dibuang,
+        # supaya 1 baris tidak menggagalkan seluruh batch (Foreign Key)
+        users = {uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(user_ids))}
+        components = crud.get_existing_component_ids(db, component_ids)
+        rows = [
+            {"user_id": user_id, "component_id": component_id, "score": score}
+            for (user_id, component_id), score in votes.items()
+            if user_id in users and component_id in components
+        ]
+        crud.upsert_ratings(db, rows)
+        db.commit()
+        return {row["component_id"] for row in rows}, len(votes) - len(rows)
+    finally:
+        db.close()
+
+
+def _scores(batch):
+    return {key: score for key, (score, _) in batch.items()}
+
+
+def _requeue(batch):
+    # Vote yang lebih baru (masuk selama flush) tetap menang. Menulis ulang batch yang ternyata
+    # sudah ter-commit aman: upsert_ratings idempotent & trend_score hanya dari baris baru.
+    for key, value in batch.items():
+        _pending.setdefault(key, value)
+
+
+def _record(batch, started, written, dropped):
+    finished = time.perf_counter()
+    metrics.VOTE_FLUSH_SIZE.observe(len(batch))
+    metrics.VOTE_FLUSH_SECONDS.observe(finished - started)
+    for _, enqueued in batch.values():
+        metrics.VOTE_WRITE_DELAY.observe(finished - enqueued)
+    _stats["flushes"] += 1
+    _stats["flushed"] += len(batch) - dropped
+    _stats["dropped"] += dropped
+    invalidate_components(written)
+
+
+async def flush():
+    global _pending
+    if not _pending:
+        return 0
+    batch, _pending = _pending, {}
+    started = time.perf_counter()
+    done = False
+    try:
+        written, dropped = await run_in_threadpool(write_votes, _scores(batch))
+        done = True
+    except Exception as exc:
+        _stats["failed_flushes"] += 1
+        logger.warning("Gagal flush %d vote: %s", len(batch), exc)
+        raise
+    finally:
+        # Gagal, atau task dibatalkan (CancelledError saat shutdown): kembalikan ke buffer
+        if not done:
+            _requeue(batch)
+
+    _record(batch, started, written, dropped)
+    return len(batch)
+
+
+async def run_flusher():
+    """Task di lifespan: flush tiap FLUSH_MS atau saat buffer mencapai FLUSH_MAX."""
+    global _wakeup, _running
+    _wakeup = asyncio.Event()
+    _running = True
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            try:
+                await flush()
+            except Exception:
+                await asyncio.sleep(RETRY_AFTER_SECONDS)
+    finally:
+        _running = False
+
+
+def drain():
+    # Dipanggil saat shutdown (setelah flusher dihentikan): tulis semua vote yang tersisa.
+    # Sengaja sinkron (tanpa await), jadi tidak bisa terpotong pembatalan di tengah jalan.
+    global _pending
+    for _ in range(DRAIN_ATTEMPTS):
+        if not _pending:
+            return
+        batch, _pending = _pending, {}
+        started = time.perf_counter()
+        try:
+            written, dropped = write_votes(_scores(batch))
+        except Exception as exc:
+            _stats["failed_flushes"] += 1
+            logger.warning("Gagal flush %d vote: %s", len(batch), exc)
+            _requeue(batch)
+            time.sleep(RETRY_AFTER_SECONDS)
+            continue
+        _record(batch, started, written, dropped)
+    if _pending:
+        logger.error("%d vote tidak tertulis saat shutdown", len(_pending))
+
+
+def stats():
+    return {
+        "write_behind": WRITE_BEHIND,
+        "running": _running,
+        "flush_ms": FLUSH_MS,
+        "flush_max": FLUSH_MAX,
+        "buffer_max": BUFFER_MAX,
+        "pending": len(_pending),
+        **_stats,
+    }
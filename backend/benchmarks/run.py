@@ -0,0 +1,327 @@
+# Benchmark backend UICODE (in-process, tanpa server uvicorn)
+#
+# Cara pakai (dari folder backend):
+#   python -m benchmarks.run                                  # dataset default, semua skenario
+#   python -m benchmarks.run --users 50 --components 500 --votes 5000 --requests 200
+#   python -m benchmarks.run --scenarios list,search --concurrency 32
+#   python -m benchmarks.run --save benchmarks/baseline.json  # simpan hasil sebagai baseline
+#   python -m benchmarks.run --compare benchmarks/baseline.json
+#
+# - Database default: file SQLite terpisah (benchmarks/bench.db), di-seed otomatis kalau masih kosong.
+#   Untuk Postgres: --database-url postgresql://... (pakai database kosong khusus benchmark!)
+# - --cold mematikan response cache, jadi yang diukur benar-benar query + serialisasi
+# - Hasil per skenario: p50/p95/p99 latency (ms), throughput (req/s), jumlah query SQL per request
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = "sqlite:///" + os.path.join(HERE, "bench.db")
+
+SCENARIOS = ["list", "list_summary", "detail", "code", "search", "token", "rate"]
+
+# Jumlah query SQL di request yang sedang berjalan.
+# Isinya list [n] (bukan int) supaya tetap terhitung dari threadpool / greenlet yang menyalin context.
+_query_counter = contextvars.ContextVar("bench_query_counter", default=None)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark in-process untuk backend UICODE")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DB))
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--components", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Eksponen Zipf untuk distribusi vote")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reseed", action="store_true", help="Hapus file SQLite lama lalu seed ulang")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="Jumlah request per skenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="Request pemanasan (tidak diukur)")
+    parser.add_argument("--cold", action="store_true", help="Matikan response cache")
+    parser.add_argument("--save", help="Simpan hasil ke file JSON (baseline)")
+    parser.add_argument("--compare", help="Bandingkan dengan baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Batas regresi p95/throughput (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    # Harus sebelum import app: konfigurasi (os.getenv) dibaca saat modul di-import
+    os.environ["DATABASE_URL"] = args.database_url
+    # Semua request benchmark datang dari 1 IP & segelintir user: rate limit dimatikan
+    # supaya yang diukur biaya endpoint-nya, bukan 429
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+    if args.cold:
+        os.environ["RESPONSE_CACHE_BYTES"] = "0"
+    if args.reseed and args.database_url.startswith("sqlite:///"):
+        path = args.database_url[len("sqlite:///"):]
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# --- 1. PENGHITUNG QUERY ---
+
+def install_query_counter(*engines):
+    from sqlalchemy import event
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter = _query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+    for engine in engines:
+        if engine is not None:
+            event.listen(engine, "before_cursor_execute", before_cursor_execute)
+
+
+# --- 2. DATASET ---
+
+def ensure_dataset(args):
+    from app import database, migrations, models
+    from app.database import SessionLocal
+    from benchmarks.seed import seed
+
+    # Skema tidak dibuat otomatis saat start aplikasi (lihat app/migrations.py)
+    migrations.migrate(database.get_engine())
+    db = SessionLocal()
+    try:
+        if db.query(models.User.id).first() is None:
+            started = time.perf_counter()
+            summary = seed(db, users=args.users, components=args.components, votes=args.votes,
+                           skew=args.skew, seed_value=args.seed)
+            summary["seconds"] = round(time.perf_counter() - started, 2)
+            print(f"Seed: {summary}")
+
+        accepted_ids = [
+            cid for (cid,) in db.query(models.Component.id)
+            .filter(models.Component.status == models.Status.ACCEPTED)
+        ]
+        users = db.query(models.User.email).order_by(models.User.id).limit(max(args.concurrency, 10)).all()
+        return {
+            "accepted_ids": accepted_ids,
+            "emails": [email for (email,) in users],
+            "users": db.query(models.User).count(),
+            "components": db.query(models.Component).count(),
+            "votes": db.query(models.Rating).count(),
+        }
+    finally:
+        db.close()
+
+
+# --- 3. SKENARIO ---
+# Tiap skenario: coroutine (client, rng) -> response
+
+def build_scenarios(data):
+    from app import auth
+    from benchmarks.seed import BENCH_PASSWORD, CATEGORIES, WORDS
+
+    tokens = [auth.create_access_token({"sub": email}) for email in data["emails"]]
+    ids = data["accepted_ids"]
+
+    async def list_full(client, rng):
+        return await client.get("/components/", params={"limit": 20})
+
+    async def list_summary(client, rng):
+        params = {"limit": 20, "fields": "summary"}
+        if rng.random() < 0.5:
+            params["category"] = rng.choice(CATEGORIES)
+        return await client.get("/components/", params=params)
+
+    async def detail(client, rng):
+        return await client.get(f"/components/{rng.choice(ids)}")
+
+    async def code(client, rng):
+        return await client.get(f"/components/{rng.choice(ids)}/code")
+
+    async def search(client, rng):
+        q = " ".join(rng.sample(WORDS, k=rng.randint(1, 2)))
+        return await client.get("/components/", params={"search": q, "limit": 20, "fields": "summary"})
+
+    async def token(client, rng):
+        email = rng.choice(data["emails"])
+        return await client.post("/token", data={"username": email, "password": BENCH_PASSWORD})
+
+    async def rate(client, rng):
+        headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+        return await client.post(f"/components/{rng.choice(ids)}/rate",
+                                 json={"score": rng.randint(1, 5)}, headers=headers)
+
+    return {
+        "list": list_full,
+        "list_summary": list_summary,
+        "detail": detail,
+        "code": code,
+        "search": search,
+        "token": token,
+        "rate": rate,
+    }
+
+
+# --- 4. DRIVER ---
+
+def percentile(values, pct):
+    # Nearest-rank percentile (cukup untuk ratusan-ribuan sampel)
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+async def run_scenario(client, name, fn, args):
+    rng = random.Random(f"{args.seed}-{name}")
+    latencies, queries, statuses = [], [], {}
+
+    async def one(measure):
+        counter = [0]
+        token = _query_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            status = str((await fn(client, rng)).status_code)
+        except Exception as exc:
+            status = type(exc).__name__
+        finally:
+            _query_counter.reset(token)
+        if measure:
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(counter[0])
+            statuses[status] = statuses.get(status, 0) + 1
+
+    async def worker(jobs):
+        while jobs:
+            measure = jobs.pop()
+            await one(measure)
+
+    for _ in range(args.warmup):
+        await one(False)
+
+    jobs = [True] * args.requests
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(jobs) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        # 503 di skenario token = antrian bcrypt penuh (lihat PASSWORD_QUEUE_LIMIT), bukan bug
+        "errors": sum(n for code, n in statuses.items() if not (code.isdigit() and int(code) < 400)),
+        "statuses": statuses,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else 0.0,
+    }
+
+
+async def run_all(args, scenarios):
+    import httpx
+    from app.main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    # lifespan dijalankan manual supaya shutdown (pool bcrypt) tetap rapi
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, fn in scenarios.items():
+                results[name] = await run_scenario(client, name, fn, args)
+                print_row(name, results[name])
+    return results
+
+
+# --- 5. LAPORAN & BASELINE ---
+
+HEADER = f"{'scenario':<14}{'req':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'q/req':>7}"
+
+
+def print_row(name, r):
+    print(f"{name:<14}{r['requests']:>6}{r['errors']:>5}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+          f"{r['p99_ms']:>9.2f}{r['throughput_rps']:>9.1f}{r['queries_per_request']:>7.2f}")
+
+
+def compare(results, baseline, threshold):
+    # Regresi: p95 naik / throughput turun melebihi threshold, atau query per request bertambah
+    regressions = []
+    print(f"\nDibandingkan dengan baseline ({baseline['meta'].get('created_at', '?')}):")
+    for name, current in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        p95_delta = (current["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+        rps_delta = (current["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] \
+            if old["throughput_rps"] else 0.0
+        q_delta = current["queries_per_request"] - old["queries_per_request"]
+        flags = []
+        if p95_delta > threshold:
+            flags.append("p95")
+        if rps_delta < -threshold:
+            flags.append("throughput")
+        if q_delta > 0.5:
+            flags.append("queries")
+        if flags:
+            regressions.append((name, flags))
+        print(f"  {name:<14} p95 {p95_delta:+.0%}  req/s {rps_delta:+.0%}  q/req {q_delta:+.2f}"
+              + (f"  <-- REGRESI ({', '.join(flags)})" if flags else ""))
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    # Import setelah environment diset
+    sys.path.insert(0, os.path.dirname(HERE))
+    from app import database
+
+    data = ensure_dataset(args)
+    install_query_counter(database.engine,
+                          database.async_engine.sync_engine if database.async_engine is not None else None)
+
+    all_scenarios = build_scenarios(data)
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in all_scenarios]
+    if unknown:
+        raise SystemExit(f"Skenario tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(SCENARIOS)})")
+    if not data["accepted_ids"]:
+        raise SystemExit("Database tidak punya komponen ACCEPTED untuk di-benchmark")
+
+    print(f"Dataset: {data['users']} users, {data['components']} komponen, {data['votes']} vote | "
+          f"concurrency={args.concurrency} async_db={database.ASYNC_DB} cold={args.cold}")
+    print(HEADER)
+    results = asyncio.run(run_all(args, {name: all_scenarios[name] for name in selected}))
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "database": database.engine.dialect.name,
+            "async_db": database.ASYNC_DB,
+            "cold": args.cold,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "dataset": {k: data[k] for k in ("users", "components", "votes")},
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nHasil disimpan ke {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# Generator data sintetis untuk benchmark
+# - N user (semua password-nya sama, di-hash sekali saja)
+# - M komponen dengan ukuran HTML/CSS yang realistis (log-normal, beberapa KB)
+# - Vote dengan distribusi miring (Zipf): sedikit komponen viral dapat sebagian besar vote
+# Semua acak pakai seed, jadi dataset bisa diulang persis sama.
+import datetime
+import itertools
+import random
+
+from sqlalchemy import insert
+
+from app import blobs, crud, models, search, similarity
+from app.hashing import hash_password_sync
+
+BENCH_PASSWORD = "benchpass"
+CATEGORIES = ["Button", "Card", "Forms", "Loader", "Input", "Toggle", "Navbar", "Modal"]
+CATEGORY_WEIGHTS = [30, 20, 12, 10, 10, 8, 6, 4]
+TAGS = ["div", "span", "button", "a", "p", "section", "ul", "li", "label", "input"]
+WORDS = (
+    "neon glow card shadow gradient glass button hover click submit modern dark light "
+    "pulse loader spinner toggle switch form input label menu nav header footer hero"
+).split()
+CSS_PROPERTIES = [
+    "background", "color", "padding", "margin", "border", "border-radius", "box-shadow",
+    "display", "justify-content", "align-items", "font-size", "font-weight", "transition",
+    "transform", "width", "height", "opacity", "cursor", "gap", "animation",
+]
+CSS_VALUES = ["#0f0", "#111", "10px 20px", "0 0 10px #0f0", "flex", "center", "1rem", "600",
+              "all 0.3s ease", "scale(1.05)", "100%", "0.8", "pointer", "8px", "pulse 1s infinite"]
+
+
+def _sized(rng, median_bytes, make_piece):
+    # Ukuran mengikuti log-normal: kebanyakan kecil, sebagian kecil sangat besar
+    target = int(rng.lognormvariate(0, 0.8) * median_bytes)
+    parts, size = [], 0
+    while size < target:
+        piece = make_piece()
+        parts.append(piece)
+        size += len(piece)
+    return "\n".join(parts)
+
+
+def make_html(rng, classes, median_bytes=2500):
+    def piece():
+        tag = rng.choice(TAGS)
+        cls = " ".join(rng.sample(classes, k=min(2, len(classes))))
+        text = " ".join(rng.choices(WORDS, k=rng.randint(1, 6)))
+        return f'<{tag} class="{cls}">{text}</{tag}>'
+    return _sized(rng, median_bytes, piece)
+
+
+def make_css(rng, classes, median_bytes=1800):
+    def piece():
+        props = rng.sample(CSS_PROPERTIES, k=rng.randint(2, 6))
+        body = " ".join(f"{p}: {rng.choice(CSS_VALUES)};" for p in props)
+        return f".{rng.choice(classes)} {{ {body} }}"
+    return _sized(rng, median_bytes, piece)
+
+
+def _zipf_weights(n, skew):
+    return [1.0 / (rank ** skew) for rank in range(1, n + 1)]
+
+
+def seed(db, users=200, components=2000, votes=20000, accepted_ratio=0.8, skew=1.1, seed_value=42, batch=1000):
+    """Isi database kosong dengan data sintetis. Return ringkasan (dict)."""
+    rng = random.Random(seed_value)
+    hashed = hash_password_sync(BENCH_PASSWORD)
+    now = datetime.datetime.utcnow()
+
+    # 1. Users (user pertama admin)
+    user_rows = [
+        {
+            "username": f"bench_user_{i}",
+            "email": f"bench{i}@uicode.test",
+            "hashed_password": hashed,
+            "role": models.Role.ADMIN if i == 0 else models.Role.USER,
+        }
+        for i in range(users)
+    ]
+    db.execute(insert(models.User), user_rows)
+    user_ids = [uid for (uid,) in db.query(models.User.id).order_by(models.User.id)]
+
+    # 2. Components
+    # Kode masuk ke code_blobs per batch (blobs.put_many), komponen cukup menyimpan hash-nya
+    def insert_components(rows, codes):
+        html_hashes = blobs.put_many(db, [html_code for html_code, _ in codes])
+        css_hashes = blobs.put_many(db, [css_code for _, css_code in codes])
+        for row, html_hash, css_hash in zip(rows, html_hashes, css_hashes):
+            row.update(html_hash=html_hash, css_hash=css_hash)
+        db.execute(insert(models.Component), rows)
+
+    component_rows, component_codes = [], []
+    for i in range(components):
+        classes = [f"{rng.choice(WORDS)}-{rng.choice(WORDS)}" for _ in range(4)]
+        category = rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0]
+        html_code, css_code = make_html(rng, classes), make_css(rng, classes)
+        created = now - datetime.timedelta(minutes=components - i)
+        component_rows.append({
+            "category": category,
+            **models.code_summary(html_code, css_code),
+            "status": models.Status.ACCEPTED if rng.random() < accepted_ratio else models.Status.IN_REVIEW,
+            "created_at": created,
+            "updated_at": created,
+            "user_id": rng.choice(user_ids),
+        })
+        component_codes.append((html_code, css_code))
+        if len(component_rows) >= batch:
+            insert_components(component_rows, component_codes)
+            component_rows, component_codes = [], []
+    if component_rows:
+        insert_components(component_rows, component_codes)
+
+    accepted_ids = [
+        cid for (cid,) in db.query(models.Component.id)
+        .filter(models.Component.status == models.Status.ACCEPTED)
+        .order_by(models.Component.id)
+    ]
+
+    # 3. Votes: komponen dipilih dengan distribusi Zipf, skor condong ke 4-5
+    cum_weights = list(itertools.accumulate(_zipf_weights(len(accepted_ids), skew)))
+    shuffled = accepted_ids[:]
+    rng.shuffle(shuffled)  # yang viral tidak selalu komponen paling lama
+    seen = {}
+    for _ in range(votes):
+        key = (rng.choice(user_ids), rng.choices(shuffled, cum_weights=cum_weights)[0])
+        seen[key] = rng.choices([1, 2, 3, 4, 5], [5, 5, 15, 35, 40])[0]
+    vote_rows = [{"user_id": u, "component_id": c, "score": s} for (u, c), s in seen.items()]
+    for start in range(0, len(vote_rows), batch):
+        db.execute(insert(models.Rating), vote_rows[start:start + batch])
+
+    # 4. Agregat rating, counter kategori, index pencarian + index near-duplicate
+    crud.refresh_rating_aggregates(db)
+    crud.rebuild_category_counts(db)
+    indexed = search.rebuild_index(db)
+    similarity.rebuild_index(db)
+    db.commit()
+
+    return {
+        "users": len(user_ids),
+        "components": components,
+        "accepted": len(accepted_ids),
+        "votes": len(vote_rows),
+        "indexed": indexed,
+        "seed": seed_value,
+    }
@@ -0,0 +1,130 @@
+# Benchmark serialisasi 1 halaman list komponen (default 100 baris)
+#
+# Cara pakai (dari folder backend):
+#   python -m benchmarks.serialization
+#   python -m benchmarks.serialization --rows 100 --repeat 300 --fields summary
+#
+# Membandingkan 3 jalur untuk halaman yang sama:
+# - orm_validate_twice : object ORM (owner joinedload) -> validasi pydantic -> validasi ulang
+#                        response_model -> jsonable_encoder + json stdlib (jalur lama endpoint
+#                        tanpa response cache, mis. /admin/pending)
+# - orm_dump_json      : object ORM -> validasi pydantic sekali -> dump_json (jalur lama endpoint
+#                        yang memakai response cache)
+# - tuple_fast         : tuple kolom -> dict -> orjson (serialization.py, jalur sekarang)
+# Tiap jalur diukur 2x: serialisasi saja (baris sudah di-fetch) dan query + serialisasi.
+# Dataset memakai database benchmark yang sama dengan benchmarks.run (di-seed kalau masih kosong).
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.run import DEFAULT_DB, HERE
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serialisasi list komponen")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DB))
+    parser.add_argument("--rows", type=int, default=100, help="Jumlah baris per halaman")
+    parser.add_argument("--repeat", type=int, default=200, help="Jumlah pengulangan per jalur")
+    parser.add_argument("--fields", choices=["full", "summary"], default="full")
+    # Dipakai ensure_dataset kalau database masih kosong
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--components", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    sys.path.insert(0, os.path.dirname(HERE))
+
+    from typing import List
+
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import joinedload, load_only
+
+    from app import models, schemas, serialization
+    from app.database import SessionLocal
+    from benchmarks.run import ensure_dataset
+
+    ensure_dataset(args)
+    summary = args.fields == "summary"
+    schema = schemas.ComponentSummary if summary else schemas.ComponentDisplay
+    adapter = TypeAdapter(List[schema])
+    component = models.Component
+
+    def orm_page(db):
+        query = db.query(component).options(joinedload(component.owner))
+        if summary:
+            query = query.options(load_only(*serialization.SUMMARY_COLUMNS))
+        return query.filter(component.status == models.Status.ACCEPTED).order_by(
+            component.created_at, component.id
+        ).limit(args.rows).all()
+
+    def tuple_page(db):
+        return serialization.component_query(db, summary).filter(
+            component.status == models.Status.ACCEPTED
+        ).order_by(component.created_at, component.id).limit(args.rows).all()
+
+    def orm_validate_twice(comps):
+        validated = adapter.validate_python(comps, from_attributes=True)
+        revalidated = adapter.validate_python(adapter.dump_python(validated))
+        return json.dumps(jsonable_encoder(revalidated)).encode()
+
+    def orm_dump_json(comps):
+        return adapter.dump_json(adapter.validate_python(comps, from_attributes=True))
+
+    def tuple_fast(rows):
+        return serialization.dumps(serialization.component_rows(rows, summary))
+
+    paths = [
+        ("orm_validate_twice", orm_page, orm_validate_twice),
+        ("orm_dump_json", orm_page, orm_dump_json),
+        ("tuple_fast", tuple_page, tuple_fast),
+    ]
+
+    db = SessionLocal()
+    try:
+        # Hasil JSON ketiga jalur harus sama persis isinya
+        outputs = [json.loads(serialize(load(db))) for _, load, serialize in paths]
+        if any(output != outputs[0] for output in outputs[1:]):
+            raise SystemExit("Output JSON antar jalur berbeda!")
+        rows = len(outputs[0])
+
+        print(f"{rows} baris/halaman, fields={args.fields}, repeat={args.repeat}, "
+              f"orjson={'ya' if serialization.orjson is not None else 'tidak'}")
+        print(f"{'jalur':<20} {'serialisasi ms':>15} {'query+serialisasi ms':>22}")
+        baseline = None
+        for name, load, serialize in paths:
+            loaded = load(db)
+            serialize_ms = timed(lambda: serialize(loaded), args.repeat)
+
+            def full():
+                db.expunge_all()
+                serialize(load(db))
+            total_ms = timed(full, args.repeat)
+            baseline = baseline or (serialize_ms, total_ms)
+            print(f"{name:<20} {serialize_ms:>15.3f} {total_ms:>22.3f}"
+                  f"   ({baseline[0] / serialize_ms:.1f}x / {baseline[1] / total_ms:.1f}x)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,139 @@
--- 1. Buat Custom Types (ENUM) untuk menjaga konsistensi data
--- Ini memastikan role hanya bisa 'USER' atau 'ADMIN'
-CREATE TYPE user_role AS ENUM ('USER', 'ADMIN');
+-- Referensi skema (PostgreSQL), disamakan dengan app/models.py.
+-- Skema resmi dibuat & diubah lewat migrasi berversi (app/migrations.py):
+--   python -m app.manage migrate
+-- Aplikasi tidak lagi membuat tabel saat start; worker menolak start kalau versi skema database
+-- lebih lama dari kode (SCHEMA_CHECK). Kalau file ini dipakai langsung, jalankan juga
+-- "python -m app.manage migrate" sesudahnya untuk memasang index pencarian & trigger rating
+-- (semua migrasi idempotent, aman dijalankan di atas tabel yang sudah ada).
+--
+-- role & status sengaja VARCHAR biasa (bukan ENUM), sama seperti models.py:
+--   role  : 'USER' | 'ADMIN'
+--   status: 'PENDING' | 'IN_REVIEW' | 'ACCEPTED' | 'REJECTED'
 
--- Ini memastikan status komponen hanya bisa 3 opsi ini
-CREATE TYPE component_status AS ENUM ('IN_REVIEW', 'ACCEPTED', 'REJECTED');
+-- 1. Versi skema (diisi oleh migrasi)
+CREATE TABLE schema_version (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+);
 
 -- 2. Buat Tabel Users
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
-    username VARCHAR(50) UNIQUE NOT NULL,
-    email VARCHAR(100) UNIQUE NOT NULL,
-    hashed_password VARCHAR(255) NOT NULL,
-    role user_role DEFAULT 'USER',
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    email VARCHAR UNIQUE,
+    username VARCHAR,
+    hashed_password VARCHAR,
+    role VARCHAR DEFAULT 'USER',
+    -- Versi token per user (claim "tv" di JWT, naik saat logout / ubah role)
+    token_version INTEGER NOT NULL DEFAULT 0
+);
+
+-- Revokasi token dalam 30 menit terakhir (umur token), dibaca berkala oleh tiap worker.
+-- Tanpa Foreign Key: catatan user yang dihapus tetap harus ada sampai tokennya expired.
+CREATE TABLE token_revocations (
+    user_id INTEGER PRIMARY KEY,
+    min_version INTEGER NOT NULL,
+    revoked_at TIMESTAMP NOT NULL
 );
+CREATE INDEX ix_token_revocations_revoked_at ON token_revocations (revoked_at);
 
 -- 3. Buat Tabel Components
+-- Kode HTML/CSS disimpan sekali per isi (key = sha256), terkompresi zlib (lihat app/blobs.py).
+-- refcount = jumlah components.html_hash/css_hash yang menunjuk ke blob ini.
+CREATE TABLE code_blobs (
+    hash VARCHAR(64) PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    data BYTEA NOT NULL
+);
+
+-- user_id tanpa ON DELETE CASCADE: komponen milik user dihapus oleh aplikasi (crud.delete_user),
+-- supaya refcount code_blobs & category_counts ikut terupdate.
 CREATE TABLE components (
     id SERIAL PRIMARY KEY,
-    title VARCHAR(100) NOT NULL,
-    category VARCHAR(50) NOT NULL,
-    html_code TEXT NOT NULL,
-    css_code TEXT NOT NULL,
-    status component_status DEFAULT 'IN_REVIEW',
-    rating INTEGER DEFAULT 0,
-    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    category VARCHAR,
+    -- html_code/css_code hanya untuk data lama yang belum dipindah ke code_blobs
+    html_code TEXT,
+    css_code TEXT,
+    html_hash VARCHAR(64) REFERENCES code_blobs(hash),
+    css_hash VARCHAR(64) REFERENCES code_blobs(hash),
+    status VARCHAR DEFAULT 'IN_REVIEW',
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    html_size INTEGER NOT NULL DEFAULT 0,
+    css_size INTEGER NOT NULL DEFAULT 0,
+    preview VARCHAR(200) NOT NULL DEFAULT '',
+    bayes_score DOUBLE PRECISION NOT NULL DEFAULT 3.0,
+    trend_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    review_claimed_by INTEGER,
+    review_lease_until TIMESTAMP,
+    updated_at TIMESTAMP,
+    user_id INTEGER REFERENCES users(id),
+    created_at TIMESTAMP
+);
+CREATE INDEX ix_components_category ON components (category);
+CREATE INDEX ix_components_updated_at ON components (updated_at);
+CREATE INDEX ix_components_status_created_id ON components (status, created_at, id);
+CREATE INDEX ix_components_user_created_id ON components (user_id, created_at, id);
+CREATE INDEX ix_components_status_bayes_id ON components (status, bayes_score, id);
+CREATE INDEX ix_components_status_category_bayes_id ON components (status, category, bayes_score, id);
+CREATE INDEX ix_components_status_trend_id ON components (status, trend_score, id);
+CREATE INDEX ix_components_status_category_trend_id ON components (status, category, trend_score, id);
+
+-- Rating per user per komponen. Agregat di components (rating_sum, rating_count, bayes_score)
+-- dijaga trigger database (app/triggers.py, dipasang oleh migrasi).
+CREATE TABLE ratings (
+    id SERIAL PRIMARY KEY,
+    score INTEGER,
+    user_id INTEGER REFERENCES users(id),
+    component_id INTEGER REFERENCES components(id)
+);
+CREATE UNIQUE INDEX uq_ratings_user_component ON ratings (user_id, component_id);
+CREATE INDEX ix_ratings_component_id ON ratings (component_id);
+
+-- Database lama (dibuat sebelum kolom/tabel di atas ada): JANGAN ALTER manual, jalankan
+--   python -m app.manage migrate
+-- Migrasi versi 2-14 (app/migrations.py) menambah kolom, index, tabel & trigger yang belum ada,
+-- membersihkan rating duplikat, lalu menjalankan backfill datanya (rebuild-ratings, reindex-search,
+-- backfill-summaries, rebuild-rankings, rebuild-facets, rebuild-similarity, migrate-code-blobs).
+
+-- 4. Counter jumlah komponen ACCEPTED per kategori (/components/facets)
+CREATE TABLE category_counts (
+    category VARCHAR PRIMARY KEY,
+    accepted_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- 5. Index komponen hampir sama / near-duplicate (lihat app/similarity.py)
+CREATE TABLE component_signatures (
+    component_id INTEGER PRIMARY KEY REFERENCES components(id) ON DELETE CASCADE,
+    signature BYTEA NOT NULL
+);
+
+CREATE TABLE component_lsh_buckets (
+    bucket BIGINT NOT NULL,
+    component_id INTEGER NOT NULL REFERENCES components(id) ON DELETE CASCADE,
+    PRIMARY KEY (bucket, component_id)
+);
+CREATE INDEX ix_component_lsh_buckets_component_id ON component_lsh_buckets (component_id);
+
+CREATE TABLE component_similarities (
+    component_id INTEGER NOT NULL REFERENCES components(id) ON DELETE CASCADE,
+    similar_id INTEGER NOT NULL REFERENCES components(id) ON DELETE CASCADE,
+    score DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (component_id, similar_id)
+);
+CREATE INDEX ix_component_similarities_similar_id ON component_similarities (similar_id);
+
+-- 6. Komponen yang dihapus, untuk tombstone export incremental (/components/export?updated_since=)
+-- Tanpa Foreign Key: barisnya justru ada untuk komponen yang sudah tidak ada.
+CREATE TABLE component_deletions (
+    component_id INTEGER PRIMARY KEY,
+    deleted_at TIMESTAMP NOT NULL
 );
+CREATE INDEX ix_component_deletions_deleted_at ON component_deletions (deleted_at);
 
--- 4. (Opsional) Masukkan Data Dummy untuk Pengetesan Awal
+-- 7. (Opsional) Masukkan Data Dummy untuk Pengetesan Awal
 -- Insert Admin User (Password ini cuma contoh string, nanti di app harus di-hash)
 INSERT INTO users (username, email, hashed_password, role)
 VALUES ('adminirvan', 'irvan1212@uicode.com', '$2b$12$kd/w826bYVExKgNNFl5q8.RWFgoCUcqcYskaSaAwdWft1HL6hIVrS', 'ADMIN');
@@ -38,25 +143,27 @@ INSERT INTO users (username, email, hashed_password, role)
 VALUES ('dev_budi', 'budi@gmail.com', '$2b$12$RVRzTDgV0ZagOGuEZxbpCupRbrNtGKbzJCCMgMz2tK1QZP6/fteWm', 'USER');
 
 -- Insert Contoh Komponen (Sudah Accepted)
-INSERT INTO components (title, category, html_code, css_code, status, rating, user_id)
+-- Kode ditulis ke kolom lama; pindahkan ke code_blobs dengan: python -m app.manage migrate-code-blobs
+-- (rating_sum/rating_count diisi trigger saat ada rating; category_counts lewat rebuild-facets)
+INSERT INTO components (category, html_code, css_code, status, user_id, created_at, updated_at)
 VALUES (
-    'Neon Button', 
     'Button', 
     '<button class="neon-btn">Click Me</button>', 
     '.neon-btn { background: #000; color: #0f0; border: 2px solid #0f0; padding: 10px 20px; box-shadow: 0 0 10px #0f0; }',
     'ACCEPTED',
-    5,
-    2 -- Milik User ID 2 (dev_budi)
+    2, -- Milik User ID 2 (dev_budi)
+    CURRENT_TIMESTAMP,
+    CURRENT_TIMESTAMP
 );
 
 -- Insert Contoh Komponen (Masih Review)
-INSERT INTO components (title, category, html_code, css_code, status, rating, user_id)
+INSERT INTO components (category, html_code, css_code, status, user_id, created_at, updated_at)
 VALUES (
-    'Simple Card', 
     'Card', 
     '<div class="card">Hello World</div>', 
     '.card { background: white; padding: 20px; border-radius: 8px; }',
     'IN_REVIEW',
-    0,
-    2 -- Milik User ID 2 (dev_budi)
+    2, -- Milik User ID 2 (dev_budi)
+    CURRENT_TIMESTAMP,
+    CURRENT_TIMESTAMP
 );
\ No newline at end of file
@@ -0,0 +1,99 @@
+# Test backend UICODE: request lewat TestClient ke aplikasi sungguhan, di atas database SQLite
+# sementara yang dibuat lewat migrasi (app/migrations.py), sama seperti database produksi.
+# Jalankan dari folder backend:  python -m pytest -q
+import os
+import tempfile
+
+# Konfigurasi dibaca saat modul app di-import (os.getenv), jadi harus diset paling awal
+_tmpdir = tempfile.mkdtemp(prefix="uicode-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+os.environ.setdefault("PASSWORD_WORKERS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import auth, cache, database, migrations, models, revocations, search
+from app.hashing import hash_password_sync
+from app.main import app
+
+PASSWORD = "rahasia123"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrations.migrate(database.get_engine())
+    # bcrypt sekali saja, dipakai semua user buatan make_user
+    return hash_password_sync(PASSWORD)
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    # Tiap test mulai dari database & cache kosong
+    with database.get_engine().begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        conn.execute(text(f"DELETE FROM {search.SEARCH_TABLE}"))
+    cache.response_cache.clear()
+    cache.user_cache.clear()
+    revocations._min_versions.clear()
+    yield
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_user(schema):
+    counter = iter(range(1, 10 ** 6))
+
+    def make(role=models.Role.USER):
+        n = next(counter)
+        session = database.SessionLocal()
+        try:
+            user = models.User(email=f"user{n}@x.com", username=f"user{n}", hashed_password=schema, role=role)
+            session.add(user)
+            session.commit()
+            token = auth.create_access_token(auth.token_claims(user))
+            return user.id, {"Authorization": f"Bearer {token}"}
+        finally:
+            session.close()
+
+    return make
+
+
+@pytest.fixture
+def admin(make_user):
+    return make_user(models.Role.ADMIN)[1]
+
+
+@pytest.fixture
+def make_component(client, make_user, admin):
+    owner = {}
+
+    def make(category="Button", html_code="<button>Klik</button>", css_code=".btn{}", status="ACCEPTED", headers=None):
+        if headers is None:
+            if "headers" not in owner:
+                owner["headers"] = make_user()[1]
+            headers = owner["headers"]
+        response = client.post("/components/", json={"category": category, "html_code": html_code, "css_code": css_code},
+                               headers=headers)
+        assert response.status_code == 200, response.text
+        component_id = response.json()["id"]
+        if status != "IN_REVIEW":
+            response = client.patch(f"/admin/components/{component_id}/status", params={"status": status}, headers=admin)
+            assert response.status_code == 200, response.text
+        return component_id
+
+    return make
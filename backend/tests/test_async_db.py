@@ -0,0 +1,42 @@
+# Mode ASYNC_DB dibaca saat app di-import, jadi test API-nya dijalankan ulang di proses terpisah
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app import crud, database, models
+
+# Test API yang dijalankan ulang dengan ASYNC_DB=true (lihat test_api_under_async_db)
+ASYNC_SUITE = ["tests/test_user_cache.py", "tests/test_ratings.py", "tests/test_cache.py", "tests/test_export.py"]
+
+
+def test_run_db_uses_run_sync_on_async_session(db, make_user, monkeypatch):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    user_id, _ = make_user()
+    email = db.query(models.User.email).filter(models.User.id == user_id).scalar()
+    monkeypatch.setattr(database, "ASYNC_DB", True)
+
+    async def lookup():
+        engine = create_async_engine(database.to_async_url(database.SQLALCHEMY_DATABASE_URL))
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                return await database.run_db(session, crud.get_user_by_email, email)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(lookup()).id == user_id
+
+
+@pytest.mark.skipif(database.ASYNC_DB, reason="sudah berjalan dengan ASYNC_DB=true")
+def test_api_under_async_db():
+    env = dict(os.environ, ASYNC_DB="true")
+    env.pop("DATABASE_URL", None)  # conftest membuat database sementara sendiri
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", *ASYNC_SUITE],
+        cwd=backend, env=env, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stdout[-3000:]
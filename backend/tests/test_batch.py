@@ -0,0 +1,44 @@
+import pytest
+
+from app import schemas
+from app.main import BATCH_MAX_IDS
+
+
+def test_batch_keeps_request_order_and_lists_missing(client, make_component):
+    ids = [make_component(html_code=f"<b>{i}</b>") for i in range(3)]
+    response = client.get("/components/batch", params={"ids": f"{ids[2]},99999,{ids[0]},{ids[2]},{ids[1]}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body["items"]] == [ids[2], ids[0], ids[1]]
+    assert body["missing"] == [99999]
+    assert body["items"][0]["html_code"] == "<b>2</b>"
+
+
+@pytest.mark.parametrize("ids", ["1,abc", "1;2", "", ",,", ",".join(str(i) for i in range(BATCH_MAX_IDS + 1))])
+def test_batch_rejects_bad_ids(client, ids):
+    assert client.get("/components/batch", params={"ids": ids}).status_code == 400
+
+
+def test_batch_requires_ids(client):
+    assert client.get("/components/batch").status_code == 422
+
+
+@pytest.mark.parametrize("fields, model", [
+    ("full", schemas.ComponentDisplay),
+    ("summary", schemas.ComponentSummary),
+])
+def test_fast_serialization_matches_response_schemas(client, make_user, make_component, fields, model):
+    # Body list/batch dibangun tanpa validasi Pydantic: bentuknya harus tetap sama dengan schema-nya
+    component_id = make_component(html_code="<p>é ✓</p>", css_code="p{}")
+    _, headers = make_user()
+    client.post(f"/components/{component_id}/rate", json={"score": 4}, headers=headers)
+
+    items = [
+        client.get("/components/", params={"fields": fields}).json()[0],
+        client.get("/components/top-rated", params={"fields": fields}).json()[0],
+        client.get("/components/batch", params={"ids": component_id, "fields": fields}).json()["items"][0],
+    ]
+    for item in items:
+        assert model.model_validate(item).model_dump(mode="json") == item
+    assert items[0] == items[1] == items[2]
+    assert items[0]["rating"] == 4
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+from app import blobs, manage, models
+
+SHARED_HTML = "<nav class='menu'><a href='#'>Beranda</a><a href='#'>Profil</a></nav>"
+SHARED_CSS = ".menu{display:flex;gap:12px}"
+
+
+def _blob(db, code):
+    db.expire_all()
+    return db.get(models.CodeBlob, blobs.digest(code))
+
+
+def _code(client, component_id):
+    response = client.get(f"/components/{component_id}/code")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_compression_round_trip():
+    code = ".btn{padding:8px 16px;}" * 200
+    data = blobs.compress(code)
+    assert len(data) < len(code)
+    assert blobs.decompress(data) == code
+    assert blobs.digest(None) == blobs.digest("")
+
+
+def test_identical_code_is_stored_once(client, db, make_component):
+    first = make_component(html_code=SHARED_HTML, css_code=SHARED_CSS)
+    second = make_component(html_code=SHARED_HTML, css_code=".menu{display:block}")
+
+    shared = _blob(db, SHARED_HTML)
+    assert shared.refcount == 2
+    assert shared.size == len(SHARED_HTML.encode())
+    assert db.query(models.CodeBlob).count() == 3
+    assert _code(client, first)["html_code"] == _code(client, second)["html_code"] == SHARED_HTML
+
+
+def test_same_code_in_html_and_css_counts_both_columns(db, make_component):
+    make_component(html_code="/* kosong */", css_code="/* kosong */")
+    assert _blob(db, "/* kosong */").refcount == 2
+
+
+def test_shared_blob_survives_until_last_owner_is_deleted(client, db, admin, make_user, make_component):
+    _, other = make_user()
+    first = make_component(html_code=SHARED_HTML, css_code=SHARED_CSS)
+    second = make_component(html_code=SHARED_HTML, css_code=SHARED_CSS, headers=other)
+
+    assert client.delete(f"/admin/components/{first}", headers=admin).status_code == 200
+    assert _blob(db, SHARED_HTML).refcount == 1
+    assert _blob(db, SHARED_CSS).refcount == 1
+    assert _code(client, second)["css_code"] == SHARED_CSS
+
+    assert client.delete(f"/admin/components/{second}", headers=admin).status_code == 200
+    assert _blob(db, SHARED_HTML) is None
+    assert _blob(db, SHARED_CSS) is None
+
+
+def test_bulk_and_user_delete_release_blobs(client, db, admin, make_user, make_component):
+    user_id, owner = make_user()
+    kept = make_component(html_code=SHARED_HTML, css_code=SHARED_CSS)
+    owned = [make_component(html_code=SHARED_HTML, css_code=SHARED_CSS, headers=owner) for _ in range(2)]
+    bulk = make_component(html_code=SHARED_HTML, css_code=SHARED_CSS)
+    assert _blob(db, SHARED_HTML).refcount == 4
+
+    response = client.post("/admin/components/bulk", json={"action": "DELETE", "ids": [bulk]}, headers=admin)
+    assert response.status_code == 200, response.text
+    assert _blob(db, SHARED_HTML).refcount == 3
+
+    assert client.delete(f"/admin/users/{user_id}", headers=admin).status_code == 200
+    assert _blob(db, SHARED_HTML).refcount == 1
+    assert _code(client, kept)["html_code"] == SHARED_HTML
+    assert all(client.get(f"/components/{component_id}/code").status_code == 404 for component_id in owned)
+
+
+def test_migrate_code_blobs_moves_legacy_code(client, db, make_user, make_component, capsys):
+    user_id, _ = make_user()
+    migrated = make_component(html_code=SHARED_HTML, css_code=SHARED_CSS)
+    updated_at = datetime(2024, 1, 1)
+    legacy = [
+        models.Component(user_id=user_id, category="Menu", legacy_html_code=SHARED_HTML, legacy_css_code=css,
+                         status=models.Status.ACCEPTED, updated_at=updated_at)
+        for css in (SHARED_CSS, ".menu{display:grid}", ".menu{display:grid}")
+    ]
+    db.add_all(legacy)
+    db.commit()
+    legacy_ids = [component.id for component in legacy]
+
+    manage.main(["migrate-code-blobs", "--batch-size", "2"])
+    assert "3 komponen dipindahkan" in capsys.readouterr().out
+
+    db.expire_all()
+    for component in db.query(models.Component).filter(models.Component.id.in_(legacy_ids)):
+        assert component.html_hash is not None and component.css_hash is not None
+        assert component.legacy_html_code is None and component.legacy_css_code is None
+        assert component.updated_at == updated_at  # tidak ikut export incremental
+    assert _blob(db, SHARED_HTML).refcount == 4
+    assert _blob(db, SHARED_CSS).refcount == 2
+    assert _blob(db, ".menu{display:grid}").refcount == 2
+    code = _code(client, legacy_ids[1])
+    assert (code["html_code"], code["css_code"]) == (SHARED_HTML, ".menu{display:grid}")
+    assert _code(client, migrated)["html_code"] == SHARED_HTML
+
+    # Jalan ulang tidak memproses komponen yang sudah pindah
+    manage.main(["migrate-code-blobs"])
+    assert "Selesai: 0 komponen dipindahkan" in capsys.readouterr().out
+    assert _blob(db, SHARED_HTML).refcount == 4
@@ -0,0 +1,82 @@
+from app.cache import ResponseCache
+
+
+def _entry(body=b"[]"):
+    return {"body": body, "etag": '"x"', "headers": {}}
+
+
+def _build(cache, key, tags, during=lambda: None):
+    token = cache.begin_build()
+    try:
+        during()
+        cache.set(key, _entry(), tags, token)
+    finally:
+        cache.end_build(token)
+    return cache.get(key) is not None
+
+
+def test_unrelated_invalidation_does_not_block_store():
+    cache = ResponseCache()
+    assert _build(cache, "page1", ["list", "component:1"], lambda: cache.invalidate_tags("component:9"))
+
+
+def test_invalidation_of_own_tag_blocks_store():
+    cache = ResponseCache()
+    assert not _build(cache, "page1", ["list", "component:1"], lambda: cache.invalidate_tags("component:1"))
+    assert not _build(cache, "page1", ["list", "component:1"], lambda: cache.invalidate_tags("list"))
+    # Build berikutnya (dimulai setelah invalidasi) boleh disimpan
+    assert _build(cache, "page1", ["list", "component:1"])
+
+
+def test_clear_blocks_in_flight_builds():
+    cache = ResponseCache()
+    assert not _build(cache, "page1", ["list"], cache.clear)
+
+
+def test_tag_clock_is_pruned_once_builds_finish(monkeypatch):
+    import app.cache
+
+    monkeypatch.setattr(app.cache, "TAG_CLOCK_PRUNE", 10)
+    cache = ResponseCache()
+    for i in range(50):
+        cache.invalidate_tags(f"component:{i}")
+    _build(cache, "page1", ["list"])
+    assert len(cache._tag_clock) <= 10
+
+
+def test_list_cache_serves_until_vote_invalidates(client, make_user, make_component):
+    component_id = make_component()
+    first = client.get("/components/")
+    assert first.json()[0]["rating"] == 0
+    etag = first.headers["etag"]
+    assert client.get("/components/", headers={"If-None-Match": etag}).status_code == 304
+
+    _, headers = make_user()
+    client.post(f"/components/{component_id}/rate", json={"score": 4}, headers=headers)
+    after = client.get("/components/", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.json()[0]["rating"] == 4
+
+
+def test_batch_cache_key_separates_fields(client, make_component):
+    component_id = make_component()
+    full = client.get(f"/components/batch?ids={component_id}")
+    summary = client.get(f"/components/batch?ids={component_id}&fields=summary")
+    assert "html_code" in full.json()["items"][0]
+    assert "html_code" not in summary.json()["items"][0]
+    assert full.headers["etag"] != summary.headers["etag"]
+    assert client.get(f"/components/batch?ids={component_id}&fields=full").headers["etag"] == full.headers["etag"]
+
+
+def test_role_change_refreshes_cached_owner(client, make_user, make_component, admin):
+    owner_id, owner = make_user()
+    component_id = make_component(headers=owner)
+    urls = ["/components/", f"/components/{component_id}", f"/components/batch?ids={component_id}"]
+
+    def owner_roles():
+        list_page, detail, batch = (client.get(url).json() for url in urls)
+        return list_page[0]["owner"]["role"], detail["owner"]["role"], batch["items"][0]["owner"]["role"]
+
+    assert owner_roles() == ("USER", "USER", "USER")
+    assert client.patch(f"/admin/users/{owner_id}/role?role=ADMIN", headers=admin).status_code == 200
+    assert owner_roles() == ("ADMIN", "ADMIN", "ADMIN")
@@ -0,0 +1,47 @@
+from app import models
+from app.cache import response_cache
+
+LONG_HTML = "<div>" + "x" * 500 + "</div>"
+
+
+def test_summary_list_omits_code(client, make_component):
+    make_component(html_code=LONG_HTML, css_code=".a{}")
+    full = client.get("/components/").json()[0]
+    summary = client.get("/components/", params={"fields": "summary"}).json()[0]
+
+    assert full["html_code"] == LONG_HTML
+    assert "html_code" not in summary and "css_code" not in summary
+    assert summary["html_size"] == len(LONG_HTML)
+    assert summary["css_size"] == len(".a{}")
+    assert summary["preview"] == LONG_HTML[:models.PREVIEW_LENGTH]
+    assert {key: full[key] for key in ("id", "category", "owner", "rating")} == \
+        {key: summary[key] for key in ("id", "category", "owner", "rating")}
+
+
+def test_code_endpoint_etag_and_304(client, make_component):
+    component_id = make_component(html_code=LONG_HTML, css_code=".a{}")
+    response = client.get(f"/components/{component_id}/code")
+    assert response.status_code == 200
+    assert (response.json()["html_code"], response.json()["css_code"]) == (LONG_HTML, ".a{}")
+    etag = response.headers["etag"]
+
+    # 304 dari cache, lalu dari hash blob saja (cache kosong, kode tidak dibaca)
+    assert client.get(f"/components/{component_id}/code", headers={"If-None-Match": etag}).status_code == 304
+    response_cache.clear()
+    not_modified = client.get(f"/components/{component_id}/code", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert client.get(f"/components/{component_id}/code", headers={"If-None-Match": '"lain"'}).status_code == 200
+
+
+def test_code_etag_follows_content(client, make_component):
+    same = [make_component(html_code="<p>a</p>") for _ in range(2)]
+    different = make_component(html_code="<p>b</p>")
+    etags = [client.get(f"/components/{cid}/code").headers["etag"] for cid in same + [different]]
+    assert etags[0] == etags[1] != etags[2]
+
+
+def test_code_of_unknown_component_is_404(client, make_component):
+    make_component()
+    assert client.get("/components/99999/code").status_code == 404
+    assert client.get("/components/99999/code", headers={"If-None-Match": '"x"'}).status_code == 404
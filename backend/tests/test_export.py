@@ -0,0 +1,75 @@
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from app import admission, export
+
+
+def _lines(response):
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.content.splitlines() if line]
+
+
+def test_full_export_only_accepted(client, make_component):
+    accepted = make_component(html_code="<b>a</b>")
+    make_component(status="REJECTED")
+    rows = _lines(client.get("/components/export"))
+    assert [row["id"] for row in rows] == [accepted]
+    assert rows[0]["html_code"] == "<b>a</b>"
+
+
+def test_incremental_export_sends_tombstones(client, make_user, make_component, admin):
+    owner_id, owner = make_user()
+    rejected = make_component()
+    deleted = make_component()
+    cascaded = make_component(headers=owner)
+    unchanged = make_component()
+    time.sleep(0.01)
+    since = datetime.utcnow().isoformat()
+
+    client.patch(f"/admin/components/{rejected}/status", params={"status": "REJECTED"}, headers=admin)
+    client.delete(f"/admin/components/{deleted}", headers=admin)
+    client.delete(f"/admin/users/{owner_id}", headers=admin)
+    added = make_component()
+
+    rows = _lines(client.get("/components/export", params={"updated_since": since}))
+    tombstones = [row["id"] for row in rows if row.get("deleted")]
+    assert sorted(tombstones) == sorted([rejected, deleted, cascaded])
+    # Tombstone dikirim sebelum baris biasa
+    assert [row["id"] for row in rows[len(tombstones):]] == [added]
+    assert unchanged not in [row["id"] for row in rows]
+
+
+@pytest.mark.parametrize("accept_encoding, gzipped", [
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0, *", False),
+    ("identity", False),
+    ("", False),
+])
+def test_accepts_gzip(accept_encoding, gzipped):
+    assert export.accepts_gzip(accept_encoding) is gzipped
+
+
+def test_gzip_response_varies_on_accept_encoding(client, make_component):
+    make_component()
+    plain = client.get("/components/export", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+
+    zipped = client.get("/components/export", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["vary"]
+    # httpx sudah men-decode gzip-nya
+    assert zipped.content == plain.content
+
+
+def test_export_is_rate_limited(client, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission, "_store", admission.MemoryBuckets())
+    monkeypatch.setattr(admission, "_rules", {"export_components": {"ip": (2, 60.0)}})
+    assert [client.get("/components/export").status_code for _ in range(3)] == [200, 200, 429]
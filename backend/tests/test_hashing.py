@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app import hashing
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    # Pool sungguhan (1 proses worker), bukan threadpool mode testing
+    monkeypatch.setattr(hashing, "PASSWORD_WORKERS", 1)
+    yield
+    hashing.shutdown()
+
+
+def test_register_and_login_through_process_pool(client, process_pool):
+    submitted = hashing.stats()["submitted"]
+    user = {"username": "budi", "email": "budi@x.com", "password": "rahasia-budi"}
+    assert client.post("/users/", json=user).status_code == 200
+
+    login = client.post("/token", data={"username": user["email"], "password": user["password"]})
+    assert login.status_code == 200
+    me = client.get("/users/me", headers={"Authorization": f"Bearer {login.json()['access_token']}"})
+    assert me.json()["email"] == user["email"]
+
+    wrong = client.post("/token", data={"username": user["email"], "password": "salah"})
+    assert wrong.status_code == 401
+    # hash saat register + 2x verify saat login
+    assert hashing.stats()["submitted"] - submitted == 3
+
+
+def test_full_queue_rejects_with_503(monkeypatch):
+    monkeypatch.setattr(hashing, "PASSWORD_WORKERS", 0)
+    monkeypatch.setattr(hashing, "PASSWORD_QUEUE_LIMIT", 2)
+    started, release = threading.Semaphore(0), threading.Event()
+
+    def slow(password):
+        started.release()
+        release.wait(5)
+        return password
+
+    async def scenario():
+        running = [asyncio.create_task(hashing._run(slow, "x")) for _ in range(2)]
+        for _ in running:
+            await asyncio.to_thread(started.acquire, True, 5)
+        with pytest.raises(HTTPException) as rejected:
+            await hashing.hash_password("y")
+        release.set()
+        assert await asyncio.gather(*running) == ["x", "x"]
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == str(hashing.RETRY_AFTER_SECONDS)
+    assert hashing.stats()["queue_depth"] == 0
+
+
+def test_full_queue_returns_503_from_register_and_login(client, make_user, monkeypatch):
+    make_user()
+    monkeypatch.setattr(hashing, "_in_flight", hashing.PASSWORD_QUEUE_LIMIT)
+    response = client.post("/token", data={"username": "user1@x.com", "password": "apa saja"})
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    response = client.post("/users/", json={"username": "a", "email": "a@x.com", "password": "p"})
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
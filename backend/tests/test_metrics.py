@@ -0,0 +1,50 @@
+import re
+
+from app import metrics
+from app.cache import response_cache
+
+SAMPLE_RE = re.compile(r"^(\w+)(\{.*\})? (\S+)$")
+
+
+def _scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, labels, value = SAMPLE_RE.match(line).groups()
+            samples[name + (labels or "")] = float(value)
+    return samples
+
+
+def test_metrics_use_route_templates_and_count_statements(client, make_component):
+    ids = [make_component(), make_component()]
+    before = _scrape(client)
+    response_cache.clear()
+    for component_id in ids:
+        assert client.get(f"/components/{component_id}").status_code == 200
+    assert client.get("/tidak-ada/123").status_code == 404
+    after = _scrape(client)
+
+    def delta(key):
+        return after.get(key, 0) - before.get(key, 0)
+
+    route = 'method="GET",route="/components/{id}"'
+    assert delta(f'uicode_http_requests_total{{{route},status="200"}}') == 2
+    assert delta(f'uicode_http_request_duration_seconds_count{{{route}}}') == 2
+    assert delta(f'uicode_http_requests_total{{method="GET",route="{metrics.UNMATCHED_ROUTE}",status="404"}}') == 1
+    # Label route tidak pernah berisi ID mentah (kardinalitas tetap kecil)
+    assert not [key for key in after if any(f"/components/{cid}" in key for cid in ids)]
+    assert not [key for key in after if "/tidak-ada" in key]
+
+    # Event engine: statement SQL dihitung per engine (primary / primary_async) & per request
+    statements = [key for key in after if key.startswith("uicode_db_statements_total{")]
+    assert sum(delta(key) for key in statements) >= 2
+    assert delta(f'uicode_http_request_db_statements_sum{{{route}}}') >= 2
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "rahasia")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer rahasia"}).status_code == 200
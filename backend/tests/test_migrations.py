@@ -0,0 +1,116 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+from app import database, manage, migrations, models, rankings
+from app.main import app
+
+ALL_VERSIONS = [version for version, _, _, _ in migrations.MIGRATIONS]
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    # Database terpisah yang benar-benar kosong (bukan database bersama milik test lain)
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    rankings.register_sqlite_functions(engine)
+    yield engine
+    engine.dispose()
+
+
+def _assert_matches_models(engine):
+    # Skema hasil migrasi memuat semua tabel & kolom yang dipakai models.py
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        assert inspector.has_table(table.name), table.name
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert {column.name for column in table.columns} <= columns, table.name
+
+
+def test_migrate_empty_database_to_latest(fresh_engine):
+    assert migrations.status(fresh_engine) == {
+        "database_version": 0, "code_version": migrations.SCHEMA_VERSION, "pending": ALL_VERSIONS,
+    }
+    assert migrations.migrate(fresh_engine) == ALL_VERSIONS
+    assert migrations.status(fresh_engine)["pending"] == []
+    assert migrations.require(fresh_engine) == migrations.SCHEMA_VERSION
+    _assert_matches_models(fresh_engine)
+    # Jalan ulang tidak melakukan apa-apa
+    assert migrations.migrate(fresh_engine) == []
+
+
+def test_migrate_partially_migrated_database(fresh_engine):
+    assert migrations.migrate(fresh_engine, target=5) == [1, 2, 3, 4, 5]
+    with fresh_engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, hashed_password, role) VALUES (1, 'lama@x.com', 'x', 'USER')"))
+        conn.execute(text(
+            "INSERT INTO components (id, category, html_code, css_code, status, created_at, user_id) "
+            "VALUES (1, 'Button', '<button>Lama</button>', '.btn{}', 'ACCEPTED', '2024-01-01 00:00:00', 1)"
+        ))
+        conn.execute(text("INSERT INTO ratings (id, score, user_id, component_id) VALUES (1, 4, 1, 1)"))
+    assert migrations.status(fresh_engine)["pending"] == ALL_VERSIONS[5:]
+
+    assert migrations.migrate(fresh_engine) == ALL_VERSIONS[5:]
+    _assert_matches_models(fresh_engine)
+    with fresh_engine.connect() as conn:
+        # Data lama tetap ada; kode masih di kolom lama sampai migrate-code-blobs dijalankan
+        row = conn.execute(text("SELECT html_code, html_hash, updated_at FROM components WHERE id = 1")).one()
+        assert row.html_code == "<button>Lama</button>" and row.html_hash is None
+        assert row.updated_at is not None
+        assert conn.execute(text("SELECT score FROM ratings WHERE id = 1")).scalar() == 4
+
+
+def test_adopts_schema_without_version_table(fresh_engine):
+    # Database lama (create_all / database.sql) belum punya schema_version: langkah yang
+    # tabel / kolomnya sudah ada dilewati tanpa error
+    migrations.migrate(fresh_engine, target=8)
+    with fresh_engine.begin() as conn:
+        conn.execute(text("DROP TABLE schema_version"))
+    assert migrations.migrate(fresh_engine) == ALL_VERSIONS
+    _assert_matches_models(fresh_engine)
+
+
+def test_backfills_follow_applied_versions():
+    assert migrations.backfills([2, 5]) == ["rebuild-ratings"]
+    assert migrations.backfills([7, 10, 12, 14]) == []
+    assert migrations.backfills(ALL_VERSIONS[10:]) == ["rebuild-similarity", "migrate-code-blobs"]
+
+
+def test_require_refuses_outdated_schema(fresh_engine, monkeypatch):
+    migrations.migrate(fresh_engine, target=5)
+    with pytest.raises(migrations.SchemaOutdated, match="versi 5"):
+        migrations.require(fresh_engine)
+
+    monkeypatch.setattr(migrations, "SCHEMA_CHECK", "warn")
+    assert migrations.check(fresh_engine) is None
+    monkeypatch.setattr(migrations, "SCHEMA_CHECK", "strict")
+    with pytest.raises(migrations.SchemaOutdated):
+        migrations.check(fresh_engine)
+
+
+def test_app_boot_refuses_outdated_schema(fresh_engine, monkeypatch):
+    migrations.migrate(fresh_engine, target=5)
+    monkeypatch.setattr(migrations, "SCHEMA_CHECK", "strict")
+    monkeypatch.setattr(database, "engine", fresh_engine)
+    with pytest.raises(migrations.SchemaOutdated):
+        with TestClient(app):
+            pass
+
+
+def test_manage_refuses_outdated_schema(fresh_engine, monkeypatch, capsys):
+    migrations.migrate(fresh_engine, target=5)
+    monkeypatch.setattr(manage, "get_engine", lambda: fresh_engine)
+
+    with pytest.raises(SystemExit) as exc:
+        manage.main(["rebuild-facets"])
+    assert exc.value.code == 1
+    assert "python -m app.manage migrate" in capsys.readouterr().err
+
+    # Perintah skema tetap boleh jalan
+    manage.main(["schema-version"])
+    out = capsys.readouterr().out
+    assert f"versi 5, kode: versi {migrations.SCHEMA_VERSION}" in out
+    assert "Belum dijalankan: versi 6" in out
+
+    manage.main(["migrate", "--skip-backfill"])
+    assert f"Skema database sekarang versi {migrations.SCHEMA_VERSION}" in capsys.readouterr().out
+    assert migrations.require(fresh_engine) == migrations.SCHEMA_VERSION
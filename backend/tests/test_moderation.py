@@ -0,0 +1,88 @@
+from collections import Counter
+
+from sqlalchemy import text
+
+from app import models, search
+
+
+def assert_consistent(db):
+    """Counter kategori, refcount blob & index pencarian cocok dengan isi tabel components."""
+    db.expire_all()
+    component = models.Component
+    accepted = db.query(component.id, component.category).filter(component.status == models.Status.ACCEPTED).all()
+
+    counts = {row.category: row.accepted_count for row in db.query(models.CategoryCount) if row.accepted_count}
+    assert counts == dict(Counter(category for _, category in accepted))
+
+    references = Counter()
+    for html_hash, css_hash in db.query(component.html_hash, component.css_hash):
+        references.update(h for h in (html_hash, css_hash) if h)
+    assert {blob.hash: blob.refcount for blob in db.query(models.CodeBlob)} == dict(references)
+
+    indexed = {int(cid) for (cid,) in db.execute(text(f"SELECT component_id FROM {search.SEARCH_TABLE}"))}
+    assert indexed == {cid for cid, _ in accepted}
+
+
+def _bulk(client, admin, action, ids):
+    response = client.post("/admin/components/bulk", json={"action": action, "ids": ids}, headers=admin)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _facets(client):
+    return {item["category"]: item["count"] for item in client.get("/components/facets").json()["categories"]}
+
+
+def test_bulk_accept_reject_delete_keep_everything_consistent(client, db, make_component, admin):
+    shared = "<button>Sama</button>"
+    buttons = [make_component(category="Button", html_code=shared, status="IN_REVIEW") for _ in range(3)]
+    card = make_component(category="Card", html_code=shared, status="IN_REVIEW")
+    assert_consistent(db)
+    # Halaman katalog & facets di-cache sebelum moderasi
+    assert client.get("/components/").json() == []
+    assert _facets(client) == {}
+
+    result = _bulk(client, admin, "ACCEPT", buttons + [card, 99999])
+    assert result["processed"] == 4
+    assert {item["id"]: item["result"] for item in result["results"]}[99999] == "not_found"
+    assert_consistent(db)
+    assert sorted(item["id"] for item in client.get("/components/").json()) == sorted(buttons + [card])
+    assert _facets(client) == {"Button": 3, "Card": 1}
+
+    assert _bulk(client, admin, "REJECT", buttons[:2])["processed"] == 2
+    assert_consistent(db)
+    assert _facets(client) == {"Button": 1, "Card": 1}
+    assert client.get("/components/", params={"search": "sama"}).json()[0]["id"] in (buttons[2], card)
+
+    assert _bulk(client, admin, "DELETE", [buttons[0], buttons[2], card])["processed"] == 3
+    assert_consistent(db)
+    assert client.get("/components/").json() == []
+    assert _facets(client) == {}
+    assert client.get(f"/components/{card}").status_code == 404
+    # Blob kode yang sama masih dipakai buttons[1]
+    assert db.query(models.CodeBlob).count() == 2
+
+
+def test_bulk_moderation_requires_admin(client, make_user, make_component):
+    component_id = make_component(status="IN_REVIEW")
+    _, headers = make_user()
+    response = client.post("/admin/components/bulk", json={"action": "DELETE", "ids": [component_id]}, headers=headers)
+    assert response.status_code == 403
+
+
+def test_delete_user_removes_work_votes_and_keeps_consistent(client, db, make_user, make_component, admin):
+    owner_id, owner = make_user()
+    _, voter = make_user()
+    own = [make_component(category="Card", headers=owner, html_code=f"<i>{i}</i>") for i in range(2)]
+    other = make_component(category="Button", html_code="<i>0</i>")
+    client.post(f"/components/{other}/rate", json={"score": 5}, headers=owner)
+    client.post(f"/components/{own[0]}/rate", json={"score": 4}, headers=voter)
+    assert client.get(f"/components/{other}").json()["review_count"] == 1
+
+    assert client.delete(f"/admin/users/{owner_id}", headers=admin).status_code == 200
+    assert_consistent(db)
+    assert [item["id"] for item in client.get("/components/").json()] == [other]
+    assert client.get(f"/components/{other}").json()["review_count"] == 0
+    assert _facets(client) == {"Button": 1}
+    assert db.query(models.Rating).count() == 0
+    assert client.delete(f"/admin/users/{owner_id}", headers=admin).status_code == 404
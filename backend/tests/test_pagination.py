@@ -0,0 +1,65 @@
+import base64
+import datetime
+import json
+
+import pytest
+
+from app import models
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+
+def _walk(client, url, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **filters}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= limit
+        ids += [item["id"] for item in page]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize("url", ["/components/", "/components/top-rated", "/components/trending"])
+def test_cursor_walk_returns_every_component_once(client, make_component, url):
+    created = [make_component(html_code=f"<b>{i}</b>") for i in range(7)]
+    make_component(status="REJECTED")
+    ids = _walk(client, url, limit=3)
+    assert sorted(ids) == sorted(created)
+    assert len(ids) == len(set(ids))
+
+
+def test_cursor_walk_with_category_filter(client, make_component):
+    buttons = [make_component(category="Button") for _ in range(4)]
+    make_component(category="Card")
+    assert sorted(_walk(client, "/components/", limit=2, category="Button")) == sorted(buttons)
+
+
+@pytest.mark.parametrize("url", ["/components/", "/components/top-rated"])
+def test_equal_sort_keys_keep_a_stable_order(client, db, make_component, url):
+    created = [make_component() for _ in range(6)]
+    # Semua created_at & skor sama: urutan hanya ditentukan oleh id
+    db.query(models.Component).update(
+        {models.Component.created_at: datetime.datetime(2024, 1, 1)}, synchronize_session=False
+    )
+    db.commit()
+    full = [item["id"] for item in client.get(url, params={"limit": 100}).json()]
+    assert sorted(full) == sorted(created)
+    assert _walk(client, url, limit=2) == full
+    assert _walk(client, url, limit=4) == full
+
+
+@pytest.mark.parametrize("cursor", [
+    "bukan-cursor",
+    "W10",                                                  # [] (jumlah kolom salah)
+    encode_cursor(["bukan tanggal", 1]),                    # nilai tidak cocok dengan tipe kolom
+    base64.urlsafe_b64encode(b'{"id": 1}').decode(),        # bukan list
+    base64.urlsafe_b64encode(json.dumps([1] * 9).encode()).decode(),
+])
+def test_invalid_or_tampered_cursor_returns_400(client, make_component, cursor):
+    make_component()
+    assert client.get("/components/", params={"cursor": cursor}).status_code == 400
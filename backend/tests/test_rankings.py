@@ -0,0 +1,41 @@
+def _ids(response):
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()]
+
+
+def test_trending_counts_distinct_voters_not_revotes(client, make_user, make_component):
+    revoted, two_voters, untouched = make_component(), make_component(), make_component()
+    users = [make_user()[1] for _ in range(3)]
+
+    # 1 user mengubah vote-nya 10x vs 2 user berbeda
+    for score in [1, 2, 3, 4, 5] * 2:
+        client.post(f"/components/{revoted}/rate", json={"score": score}, headers=users[0])
+    for headers in users[1:]:
+        client.post(f"/components/{two_voters}/rate", json={"score": 5}, headers=headers)
+
+    assert _ids(client.get("/components/trending")) == [two_voters, revoted, untouched]
+
+
+def test_trending_batch_revote_adds_no_weight(client, make_user, make_component, db):
+    from app import models
+
+    component_id = make_component()
+    _, headers = make_user()
+    votes = {"votes": [{"component_id": component_id, "score": 3}]}
+    client.post("/ratings/batch", json=votes, headers=headers)
+    first = db.get(models.Component, component_id).trend_score
+    db.expire_all()
+    client.post("/ratings/batch", json={"votes": [{"component_id": component_id, "score": 5}]}, headers=headers)
+    component = db.get(models.Component, component_id)
+    assert component.trend_score == first
+    assert (component.rating_sum, component.rating_count) == (5, 1)
+
+
+def test_top_rated_uses_bayesian_score(client, make_user, make_component):
+    single, many = make_component(), make_component()
+    voters = [make_user()[1] for _ in range(6)]
+    client.post(f"/components/{single}/rate", json={"score": 5}, headers=voters[0])
+    for headers in voters:
+        client.post(f"/components/{many}/rate", json={"score": 5}, headers=headers)
+
+    assert _ids(client.get("/components/top-rated"))[:2] == [many, single]
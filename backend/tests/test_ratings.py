@@ -0,0 +1,47 @@
+import pytest
+
+from app import models, rankings
+
+
+def test_rate_unknown_component_returns_404(client, make_user, db):
+    _, headers = make_user()
+    response = client.post("/components/99999/rate", json={"score": 5}, headers=headers)
+    assert response.status_code == 404
+    assert db.query(models.Rating).count() == 0
+
+
+def test_rate_component(client, make_user, make_component):
+    component_id = make_component()
+    _, headers = make_user()
+    assert client.post(f"/components/{component_id}/rate", json={"score": 4}, headers=headers).status_code == 200
+    body = client.get(f"/components/{component_id}").json()
+    assert (body["rating"], body["review_count"]) == (4, 1)
+
+
+def _aggregates(db, component_id):
+    db.expire_all()
+    return tuple(db.query(
+        models.Component.rating_sum, models.Component.rating_count, models.Component.bayes_score
+    ).filter_by(id=component_id).one())
+
+
+def _expected(total, count):
+    bayes = (total + rankings.PRIOR_MEAN * rankings.PRIOR_WEIGHT) / (count + rankings.PRIOR_WEIGHT)
+    return (total, count, pytest.approx(bayes))
+
+
+def test_triggers_keep_aggregates_in_sync(client, db, make_user, make_component, admin):
+    component_id = make_component()
+    first_id, first = make_user()
+    _, second = make_user()
+    client.post(f"/components/{component_id}/rate", json={"score": 5}, headers=first)
+    client.post(f"/components/{component_id}/rate", json={"score": 3}, headers=second)
+    assert _aggregates(db, component_id) == _expected(8, 2)
+
+    # Vote ulang mengganti skor, bukan menambah baris
+    client.post(f"/components/{component_id}/rate", json={"score": 1}, headers=first)
+    assert _aggregates(db, component_id) == _expected(4, 2)
+
+    # Rating milik user yang dihapus ikut keluar dari agregat
+    assert client.delete(f"/admin/users/{first_id}", headers=admin).status_code == 200
+    assert _aggregates(db, component_id) == _expected(3, 1)
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database, migrations, models, rankings
+from app.cache import response_cache
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch, client):
+    # Replica = database terpisah yang kosong (belum menerima data dari primary)
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    rankings.register_sqlite_functions(engine)
+    migrations.migrate(engine)
+    monkeypatch.setattr(database, "REPLICA_URLS", [str(engine.url)])
+    monkeypatch.setattr(database, "ReplicaSessionLocals", [sessionmaker(autocommit=False, autoflush=False, bind=engine)])
+    async_engine = None
+    if database.ASYNC_DB:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(database.to_async_url(str(engine.url)))
+        monkeypatch.setattr(database, "AsyncReplicaSessionLocals", [
+            async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        ])
+    database._pinned.clear()
+    yield engine
+    database._pinned.clear()
+    engine.dispose()
+    if async_engine is not None:
+        async_engine.sync_engine.dispose()
+
+
+def _get(client, url, headers=None):
+    response_cache.clear()
+    return client.get(url, headers=headers)
+
+
+def test_reads_go_to_replica_and_writes_to_primary(client, db, make_user, make_component, replica):
+    component_id = make_component()
+    _, headers = make_user()
+
+    # Baca anonim & baca user yang belum menulis: replica (belum punya komponennya)
+    assert _get(client, "/components/").json() == []
+    assert _get(client, f"/components/{component_id}", headers).status_code == 404
+
+    # Tulis selalu ke primary
+    assert client.post(f"/components/{component_id}/rate", json={"score": 5}, headers=headers).status_code == 200
+    assert db.query(models.Rating).filter_by(component_id=component_id).count() == 1
+    with replica.connect() as conn:
+        assert conn.execute(models.Rating.__table__.select()).first() is None
+
+
+def test_client_is_pinned_to_primary_after_a_write(client, make_user, make_component, replica):
+    component_id = make_component()
+    _, writer = make_user()
+    _, other = make_user()
+    client.post(f"/components/{component_id}/rate", json={"score": 4}, headers=writer)
+
+    # Read-your-writes: token yang baru menulis membaca dari primary selama PRIMARY_PIN_SECONDS
+    pinned = _get(client, f"/components/{component_id}", writer)
+    assert pinned.status_code == 200
+    assert pinned.json()["rating"] == 4
+    assert _get(client, f"/components/{component_id}", other).status_code == 404
+    assert _get(client, f"/components/{component_id}").status_code == 404
+
+
+def test_read_sessionmaker_round_robin_and_pinning(replica, monkeypatch):
+    second = sessionmaker(bind=replica)
+    monkeypatch.setattr(database, "ReplicaSessionLocals", database.ReplicaSessionLocals + [second])
+    picks = {database.read_sessionmaker(use_async=False) for _ in range(4)}
+    assert picks == set(database.ReplicaSessionLocals)
+
+    database.pin_primary("Bearer abc")
+    assert database.read_sessionmaker("Bearer abc", use_async=False) is database.SessionLocal
+    assert database.read_sessionmaker("Bearer xyz", use_async=False) is not database.SessionLocal
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from app import models
+
+
+def _claim(client, headers, limit=None):
+    response = client.post("/admin/review/claim", params={"limit": limit} if limit else None, headers=headers)
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["items"]]
+
+
+def test_admins_get_disjoint_batches(client, make_user, make_component):
+    pending = [make_component(status="IN_REVIEW") for _ in range(5)]
+    _, first = make_user(models.Role.ADMIN)
+    _, second = make_user(models.Role.ADMIN)
+
+    batch_a = _claim(client, first, limit=3)
+    batch_b = _claim(client, second, limit=3)
+    assert batch_a == pending[:3]  # yang paling lama menunggu duluan
+    assert batch_b == pending[3:]
+    # Claim ulang oleh admin yang sama memperpanjang lease-nya sendiri
+    assert _claim(client, first, limit=3) == batch_a
+
+
+def test_foreign_lease_blocks_moderation_with_409(client, make_user, make_component):
+    component_id = make_component(status="IN_REVIEW")
+    _, owner = make_user(models.Role.ADMIN)
+    _, other = make_user(models.Role.ADMIN)
+    _claim(client, owner)
+
+    response = client.patch(f"/admin/components/{component_id}/status", params={"status": "ACCEPTED"}, headers=other)
+    assert response.status_code == 409
+    bulk = client.post("/admin/components/bulk", json={"action": "REJECT", "ids": [component_id]}, headers=other)
+    assert bulk.json()["results"] == [{"id": component_id, "result": "leased"}]
+
+    # Pemilik lease boleh, dan lease hilang begitu statusnya berubah
+    response = client.patch(f"/admin/components/{component_id}/status", params={"status": "ACCEPTED"}, headers=owner)
+    assert response.status_code == 200
+
+
+def test_expired_lease_can_be_reclaimed(client, db, make_user, make_component):
+    component_id = make_component(status="IN_REVIEW")
+    _, owner = make_user(models.Role.ADMIN)
+    _, other = make_user(models.Role.ADMIN)
+    assert _claim(client, owner) == [component_id]
+    assert _claim(client, other) == []
+
+    db.query(models.Component).filter_by(id=component_id).update(
+        {models.Component.review_lease_until: datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    assert _claim(client, other) == [component_id]
+    response = client.patch(f"/admin/components/{component_id}/status", params={"status": "REJECTED"}, headers=owner)
+    assert response.status_code == 409
+
+
+def test_release_returns_components_to_the_queue(client, make_user, make_component):
+    ids = [make_component(status="IN_REVIEW") for _ in range(2)]
+    _, owner = make_user(models.Role.ADMIN)
+    _, other = make_user(models.Role.ADMIN)
+    _claim(client, owner)
+
+    assert client.post("/admin/review/release", json={"ids": [ids[0]]}, headers=owner).json() == {"released": 1}
+    assert _claim(client, other) == [ids[0]]
+    assert client.post("/admin/review/release", headers=owner).json() == {"released": 1}
+    assert _claim(client, other) == ids
+
+
+def test_claim_requires_admin(client, make_user):
+    _, headers = make_user()
+    assert client.post("/admin/review/claim", headers=headers).status_code == 403
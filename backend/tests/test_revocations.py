@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app import auth, models, revocations
+
+MAX_AGE = auth.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+PASSWORD = "passwordbaru"
+
+
+def _login(client, email):
+    response = client.post("/token", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_logout_revokes_token_across_refresh(client, db, make_user):
+    _, headers = make_user()
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+    # Worker lain: peta dimuat dari tabel
+    revocations._min_versions.clear()
+    assert revocations.refresh(db, MAX_AGE) == 1
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+
+def test_refresh_is_read_only_and_prune_removes_expired(db, make_user):
+    user_id, _ = make_user()
+    old = datetime.utcnow() - timedelta(seconds=MAX_AGE + 60)
+    db.add(models.TokenRevocation(user_id=user_id, min_version=1, revoked_at=old))
+    db.commit()
+
+    # Catatan expired diabaikan, tapi tidak dihapus oleh worker
+    assert revocations.refresh(db, MAX_AGE) == 0
+    db.rollback()
+    assert db.query(models.TokenRevocation).count() == 1
+
+    assert revocations.prune(db, MAX_AGE) == 1
+    assert db.query(models.TokenRevocation).count() == 0
+
+
+def test_reused_user_id_is_not_locked_out(client, db, make_user, admin):
+    user_id, old_headers = make_user()
+    assert client.delete(f"/admin/users/{user_id}", headers=admin).status_code == 200
+
+    response = client.post("/users/", json={"username": "baru", "email": "baru@x.com", "password": PASSWORD})
+    assert response.status_code == 200
+    # SQLite memakai ulang ID terbesar yang baru dihapus
+    assert response.json()["id"] == user_id
+
+    headers = _login(client, "baru@x.com")
+    revocations.refresh(db, MAX_AGE)
+    assert client.get("/users/me", headers=headers).json()["email"] == "baru@x.com"
+    # Token user lama (ID sama) tetap ditolak
+    assert client.get("/users/me", headers=old_headers).status_code == 401
@@ -0,0 +1,45 @@
+import pytest
+
+
+def _ids(response):
+    assert response.status_code == 200, response.text
+    return sorted(item["id"] for item in response.json())
+
+
+@pytest.fixture
+def catalog(make_component):
+    return {
+        "neon": make_component(html_code='<button class="neon-btn">Glow</button>', css_code=".neon-btn{color:#0f0}"),
+        "card": make_component(category="Card", html_code='<div class="card">Hello World</div>', css_code=".card{}"),
+        "review": make_component(html_code='<button class="neon-btn">Draft</button>', status="IN_REVIEW"),
+    }
+
+
+def test_search_matches_class_names_and_prefixes(client, catalog):
+    assert _ids(client.get("/components/", params={"search": "neon"})) == [catalog["neon"]]
+    assert _ids(client.get("/components/", params={"search": "hel"})) == [catalog["card"]]
+    # Kata kunci yang sama dengan spasi/huruf besar berbeda tetap sama hasilnya
+    assert _ids(client.get("/components/", params={"search": "  NEON   btn "})) == [catalog["neon"]]
+
+
+def test_search_only_returns_accepted_components(client, catalog):
+    assert catalog["review"] not in _ids(client.get("/components/", params={"search": "draft neon"}))
+
+
+@pytest.mark.parametrize("search", ["!!!", "-- ::", "%"])
+def test_search_without_words_matches_nothing(client, catalog, search):
+    assert client.get("/components/", params={"search": search}).json() == []
+    facets = client.get("/components/facets", params={"search": search}).json()
+    assert facets["matching_total"] == 0
+    assert facets["total"] == 2
+
+
+def test_facets_match_search_results(client, catalog):
+    facets = client.get("/components/facets", params={"search": "neon"}).json()
+    assert facets["matching"] == [{"category": "Button", "count": 1}]
+    assert facets["categories"] == [{"category": "Button", "count": 1}, {"category": "Card", "count": 1}]
+
+
+def test_rejected_component_leaves_search_index(client, catalog, admin):
+    client.patch(f"/admin/components/{catalog['neon']}/status", params={"status": "REJECTED"}, headers=admin)
+    assert _ids(client.get("/components/", params={"search": "neon"})) == []
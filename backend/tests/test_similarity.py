@@ -0,0 +1,93 @@
+from app import similarity
+
+CARD_HTML = """
+<div class="card">
+  <img class="card-img" src="foto.png" alt="Foto">
+  <div class="card-body">
+    <h3 class="card-title">Judul Kartu</h3>
+    <p class="card-text">Deskripsi singkat tentang isi kartu ini.</p>
+    <a class="card-link" href="#">Selengkapnya</a>
+  </div>
+</div>
+"""
+CARD_CSS = """
+.card { width: 320px; border-radius: 12px; background: #ffffff; box-shadow: 0 4px 12px rgba(0,0,0,0.1); }
+.card-img { width: 100%; height: 180px; object-fit: cover; }
+.card-body { padding: 16px; }
+.card-title { font-size: 20px; color: #222222; margin: 0 0 8px; }
+.card-link { color: #3366ff; text-decoration: none; font-weight: 600; }
+"""
+# Copy yang cuma diganti warna, ukuran, spasi & ditambah komentar
+RESTYLED_HTML = CARD_HTML.replace("  ", "\t")
+RESTYLED_CSS = (
+    "/* versi dark */\n"
+    + CARD_CSS.replace("#ffffff", "#1e1e1e").replace("#222222", "#eeeeee").replace("#3366ff", "#ff9900")
+    .replace("320px", "280px").replace("12px", "8px").replace("16px", "24px").replace("; ", ";")
+)
+
+TOGGLE_HTML = '<label class="switch"><input type="checkbox"><span class="slider round"></span></label>'
+TOGGLE_CSS = """
+.switch { position: relative; display: inline-block; }
+.switch input { opacity: 0; }
+.slider { position: absolute; cursor: pointer; transition: .4s; }
+input:checked + .slider { transform: translateX(26px); }
+"""
+
+
+def _similar(client, admin, component_id):
+    response = client.get(f"/admin/components/{component_id}/similar", headers=admin)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_restyled_copy_has_high_estimate():
+    original = similarity.signature(CARD_HTML, CARD_CSS)
+    assert similarity.estimate(original, similarity.signature(CARD_HTML, CARD_CSS)) == 1.0
+    assert similarity.estimate(original, similarity.signature(RESTYLED_HTML, RESTYLED_CSS)) >= 0.9
+    assert similarity.estimate(original, similarity.signature(TOGGLE_HTML, TOGGLE_CSS)) < 0.2
+    assert similarity.signature("", "") is None
+
+
+def test_restyled_copy_shares_an_lsh_bucket():
+    original = similarity.lsh_buckets(similarity.signature(CARD_HTML, CARD_CSS))
+    copy = similarity.lsh_buckets(similarity.signature(RESTYLED_HTML, RESTYLED_CSS))
+    assert len(original) == similarity.LSH_BANDS
+    assert set(original) & set(copy)
+
+    sig = similarity.signature(CARD_HTML, CARD_CSS)
+    assert similarity.unpack(similarity.pack(sig)) == sig
+
+
+def test_near_duplicate_is_flagged_on_submit(client, admin, make_component):
+    original = make_component(category="Card", html_code=CARD_HTML, css_code=CARD_CSS)
+    unrelated = make_component(category="Toggle", html_code=TOGGLE_HTML, css_code=TOGGLE_CSS, status="IN_REVIEW")
+    copy = make_component(category="Card", html_code=RESTYLED_HTML, css_code=RESTYLED_CSS, status="IN_REVIEW")
+
+    matches = _similar(client, admin, copy)
+    assert [match["similar_id"] for match in matches] == [original]
+    assert matches[0]["score"] >= similarity.SIMILARITY_THRESHOLD
+    # Yang lebih lama tidak dicocokkan ke yang lebih baru, dan kode lain tidak ikut ditandai
+    assert _similar(client, admin, original) == []
+    assert _similar(client, admin, unrelated) == []
+
+    claimed = client.post("/admin/review/claim", headers=admin).json()["items"]
+    flagged = {item["id"]: [match["similar_id"] for match in item["similar"]] for item in claimed}
+    assert flagged == {unrelated: [], copy: [original]}
+
+
+def test_deleted_component_drops_out_of_matches(client, admin, make_component):
+    original = make_component(category="Card", html_code=CARD_HTML, css_code=CARD_CSS)
+    copy = make_component(category="Card", html_code=RESTYLED_HTML, css_code=RESTYLED_CSS, status="IN_REVIEW")
+    assert [match["similar_id"] for match in _similar(client, admin, copy)] == [original]
+
+    assert client.delete(f"/admin/components/{original}", headers=admin).status_code == 200
+    assert _similar(client, admin, copy) == []
+    # Submit berikutnya juga tidak lagi menemukan komponen yang sudah dihapus
+    again = make_component(category="Card", html_code=CARD_HTML, css_code=CARD_CSS, status="IN_REVIEW")
+    assert [match["similar_id"] for match in _similar(client, admin, again)] == [copy]
+
+
+def test_similar_endpoint_is_admin_only(client, make_user, make_component):
+    component_id = make_component(category="Card", html_code=CARD_HTML, css_code=CARD_CSS)
+    _, headers = make_user()
+    assert client.get(f"/admin/components/{component_id}/similar", headers=headers).status_code == 403
@@ -0,0 +1,37 @@
+import pytest
+
+from app import auth, models
+from app.cache import user_cache
+
+
+@pytest.fixture(autouse=True)
+def stateful_auth(monkeypatch):
+    # Jalur stateless (default) tidak memakai cache; yang dites jalur lookup user + cache
+    monkeypatch.setattr(auth, "AUTH_STATELESS", False)
+
+
+def _email(db, user_id):
+    return db.query(models.User.email).filter(models.User.id == user_id).scalar()
+
+
+def test_cached_user_is_evicted_on_role_change(client, db, make_user, admin):
+    user_id, headers = make_user()
+    assert client.get("/users/me", headers=headers).json()["role"] == "USER"
+    email = _email(db, user_id)
+    assert user_cache.get(email) is not None
+
+    assert client.patch(f"/admin/users/{user_id}/role?role=ADMIN", headers=admin).status_code == 200
+    assert user_cache.get(email) is None
+    # Token lama membawa role lama: ditolak, bukan dilayani dari cache
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+
+def test_cached_user_is_evicted_on_logout(client, db, make_user):
+    user_id, headers = make_user()
+    client.get("/users/me", headers=headers)
+    email = _email(db, user_id)
+    assert user_cache.get(email) is not None
+
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert user_cache.get(email) is None
+    assert client.get("/users/me", headers=headers).status_code == 401
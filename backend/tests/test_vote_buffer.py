@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+
+from app import models, vote_buffer
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    vote_buffer._pending.clear()
+    yield
+    vote_buffer._pending.clear()
+
+
+def _score(db, user_id, component_id):
+    return db.query(models.Rating.score).filter_by(user_id=user_id, component_id=component_id).scalar()
+
+
+def test_flush_writes_last_vote_and_drops_unknown_components(db, make_user, make_component):
+    component_id = make_component()
+    user_id, _ = make_user()
+    vote_buffer.submit(user_id, [(component_id, 2), (component_id + 100, 5)])
+    vote_buffer.submit(user_id, [(component_id, 4)])
+
+    assert asyncio.run(vote_buffer.flush()) == 2
+    assert _score(db, user_id, component_id) == 4
+    assert db.query(models.Component.rating_sum).filter_by(id=component_id).scalar() == 4
+    assert not vote_buffer._pending
+
+
+def test_cancelled_flush_requeues_and_drain_writes(db, make_user, make_component, monkeypatch):
+    component_id = make_component()
+    user_id, _ = make_user()
+    vote_buffer.submit(user_id, [(component_id, 3)])
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_write(votes):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("koneksi terputus")
+
+    async def cancel_mid_flush():
+        task = asyncio.create_task(vote_buffer.flush())
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    monkeypatch.setattr(vote_buffer, "write_votes", slow_write)
+    asyncio.run(cancel_mid_flush())
+    release.set()
+    assert vote_buffer._pending[(user_id, component_id)][0] == 3
+
+    monkeypatch.undo()
+    vote_buffer.drain()
+    assert not vote_buffer._pending
+    assert _score(db, user_id, component_id) == 3